@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Follow, Notification
+from .models import User, Follow, FollowSuggestion, Notification
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -38,8 +38,15 @@ class FollowAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('recipient', 'message', 'is_read', 'created_at')
-    list_filter = ('is_read', 'created_at')
+    list_display = ('recipient', 'message', 'verb', 'actor_count', 'is_read', 'created_at')
+    list_filter = ('is_read', 'verb', 'created_at')
     search_fields = ('recipient__username', 'message')
-    raw_id_fields = ('recipient',)
+    raw_id_fields = ('recipient', 'actor')
     date_hierarchy = 'created_at'
+
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'suggested', 'score')
+    search_fields = ('user__username', 'suggested__username')
+    raw_id_fields = ('user', 'suggested')
@@ -1,11 +1,15 @@
 from typing import Dict, Any
-from .models import Notification
+
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import unread_count
+
 
 def notifications_context(request) -> Dict[str, Any]:
-    if request.user.is_authenticated:
-        unread = Notification.objects.filter(recipient=request.user, is_read=False).count()
-    else:
-        unread = 0
+    # Ленивое значение: COUNT (и даже загрузка пользователя) — только если шаблон выводит бейдж
+    def count() -> int:
+        return unread_count(request.user) if request.user.is_authenticated else 0
+
     return {
-        'notifications_unread_count': unread,
+        'notifications_unread_count': SimpleLazyObject(count),
     }
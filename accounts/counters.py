@@ -0,0 +1,34 @@
+"""Atomic maintenance of denormalized counter columns."""
+from typing import Any, Iterable, Optional
+
+from django.db.models import F, Model
+
+
+def adjust_counter(model: type[Model], pk: Optional[Any], field: str, delta: int) -> None:
+    """Add ``delta`` to ``model.field`` of one row in a single ``UPDATE``.
+
+    The database does the arithmetic (``SET field = field + delta``), so
+    concurrent requests cannot lose each other's increments.  Decrements never
+    take the counter below zero; ``recount`` repairs any drift.
+    """
+    if pk is None or not delta:
+        return
+    qs = model._default_manager.filter(pk=pk)
+    if delta < 0:
+        qs = qs.filter(**{f'{field}__gte': -delta})
+    qs.update(**{field: F(field) + delta})
+
+
+def protect_fields(instance: Model, kwargs: dict[str, Any], fields: Iterable[str]) -> None:
+    """Leave ``fields`` out of a plain ``save()`` of an existing row.
+
+    Columns kept up to date with single-row ``UPDATE``\ s (counters, change
+    stamps) would otherwise be written back with whatever value the instance
+    was loaded with.  They are still written when named in ``update_fields``.
+    """
+    if kwargs.get('update_fields') is not None or instance._state.adding or kwargs.get('force_insert'):
+        return
+    skip = {*fields, *instance.get_deferred_fields()}
+    kwargs['update_fields'] = [
+        f.name for f in instance._meta.concrete_fields if not f.primary_key and f.attname not in skip and f.name not in skip
+    ]
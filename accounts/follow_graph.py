@@ -0,0 +1,76 @@
+"""Who-follows-whom checks for follow buttons.
+
+A page of users only needs to know which of *those* users the viewer
+follows, so :func:`followed_among` asks about the page's ids
+(``WHERE following_id IN (...)``) instead of loading everything the viewer
+follows.
+
+Optionally (``FOLLOW_SET_MAX_SIZE``) the viewer's followed ids are cached as
+one sorted ``array('q')`` — 8 bytes per id, membership by binary search — and
+the checks need no query at all.  Web workers may not share a cache, so the
+set is not invalidated by deleting a key: the key embeds
+``User.following_changed_at``, which :func:`touch_follow_set` moves in the
+same transaction as the follow or unfollow (:mod:`accounts.signals`).  The
+next request loads the user row anyway and reads the set under a new key.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Follow, User
+
+# 0 — не кешировать; у тех, кто подписан на большее число людей, проверяем запросом
+DEFAULT_FOLLOW_SET_MAX_SIZE = 5000
+FOLLOW_SET_CACHE_TIMEOUT = 3600
+
+
+def follow_set_max_size() -> int:
+    return getattr(settings, 'FOLLOW_SET_MAX_SIZE', DEFAULT_FOLLOW_SET_MAX_SIZE)
+
+
+def _follow_set_key(user: User) -> str:
+    changed_at = user.following_changed_at
+    return f"accounts:following:{user.pk}:{changed_at.isoformat() if changed_at is not None else '-'}"
+
+
+def contains(ids: array, pk: int) -> bool:
+    """Membership in a sorted id array."""
+    i = bisect_left(ids, pk)
+    return i < len(ids) and ids[i] == pk
+
+
+def get_follow_set(user: User) -> Optional[array]:
+    """Sorted ids the user follows, from the cache; ``None`` if not cacheable."""
+    if user.following_count > follow_set_max_size():
+        return None
+    key = _follow_set_key(user)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('q', Follow.objects.filter(follower_id=user.pk).order_by('following_id')
+                    .values_list('following_id', flat=True))
+        cache.set(key, ids, FOLLOW_SET_CACHE_TIMEOUT)
+    return ids
+
+
+def touch_follow_set(*user_ids: Any) -> None:
+    """Record that the users' follows changed; their cached sets stop being used."""
+    User.objects.filter(pk__in=user_ids).update(following_changed_at=timezone.now())
+
+
+def followed_among(user: Any, user_ids: Iterable[int]) -> set[int]:
+    """Those of ``user_ids`` that ``user`` follows; empty for anonymous viewers."""
+    user_ids = set(user_ids)
+    if not user_ids or not user.is_authenticated:
+        return set()
+    ids = get_follow_set(user)
+    if ids is not None:
+        return {pk for pk in user_ids if contains(ids, pk)}
+    return set(
+        Follow.objects.filter(follower_id=user.pk, following_id__in=user_ids).values_list('following_id', flat=True)
+    )
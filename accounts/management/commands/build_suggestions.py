@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.recommendations import (
+    MAX_INTERMEDIATE_DEGREE, SUGGESTIONS_TOP_K, WRITE_BATCH_USERS, build_suggestions, load_graph,
+)
+
+
+class Command(BaseCommand):
+    help = "Rebuild \"people you may know\" follow suggestions from the follow graph"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=SUGGESTIONS_TOP_K, help='Suggestions kept per user')
+        parser.add_argument(
+            '--max-degree', type=int, default=MAX_INTERMEDIATE_DEGREE,
+            help='Ignore people following more than this many users as intermediaries',
+        )
+        parser.add_argument('--batch-users', type=int, default=WRITE_BATCH_USERS, help='Users per write transaction')
+
+    def handle(self, *args, **options):
+        if options['top'] < 1 or options['max_degree'] < 1 or options['batch_users'] < 1:
+            raise CommandError('--top, --max-degree and --batch-users must be > 0')
+        started = time.monotonic()
+        graph = load_graph()
+        self.stdout.write(
+            f"Graph: {len(graph.users)} followers, {len(graph.targets)} edges, "
+            f"{graph.nbytes / 1024:.0f} KiB in {time.monotonic() - started:.1f}s"
+        )
+        users, rows = build_suggestions(options['top'], options['max_degree'], options['batch_users'], graph)
+        self.stdout.write(self.style.SUCCESS(
+            f"Suggestions: {rows} for {users} users in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.notifications import DELIVERY_BATCH_SIZE, deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Turn queued events (new followers, ...) into aggregated notifications in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DELIVERY_BATCH_SIZE, help='Events per batch')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        delivered = 0
+        try:
+            while True:
+                count = deliver_pending(batch_size)
+                delivered += count
+                if not count:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping…")
+        self.stdout.write(self.style.SUCCESS(f"Events delivered: {delivered}"))
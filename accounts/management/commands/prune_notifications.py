@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.notifications import PRUNE_CHUNK_SIZE, prune_notifications
+
+
+class Command(BaseCommand):
+    help = "Delete read notifications older than --days, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Keep read notifications for this many days')
+        parser.add_argument('--chunk-size', type=int, default=PRUNE_CHUNK_SIZE, help='Rows per DELETE')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['chunk_size'] < 1:
+            raise CommandError('--days must be >= 0 and --chunk-size > 0')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted = prune_notifications(cutoff, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted read notifications: {deleted}"))
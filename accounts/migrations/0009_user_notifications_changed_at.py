@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='notifications_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Уведомления изменены'),
+        ),
+    ]
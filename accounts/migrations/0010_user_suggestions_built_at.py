@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_user_notifications_changed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='suggestions_built_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Рекомендации пересчитаны'),
+        ),
+    ]
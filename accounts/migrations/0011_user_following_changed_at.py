@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_user_suggestions_built_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='following_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Подписки изменены'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
+from .counters import protect_fields
+
 class User(AbstractUser):
     """Кастомная модель пользователя"""
     phone = models.CharField(max_length=15, blank=True, null=True, verbose_name="Телефон")
@@ -13,14 +15,38 @@ class User(AbstractUser):
         verbose_name="Аватар", 
         default="https://www.gravatar.com/avatar/?d=mp"
     )
+    # Денормализованные счётчики: обновляются сигналами, чинятся командой recount
+    followers_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Подписчиков")
+    following_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Подписок")
+    post_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Постов")
+    # Отметка «уведомления просмотрены до»: всё, что создано позже, — непрочитанное
+    notifications_seen_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Уведомления просмотрены")
+    # Когда менялись уведомления пользователя: входит в ключ кеша счётчика непрочитанных,
+    # так что доставка из другого процесса (deliver_notifications) видна сразу
+    notifications_changed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Уведомления изменены")
+    # Когда build_suggestions последний раз пересчитал рекомендации: версия кеша виджета
+    suggestions_built_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Рекомендации пересчитаны")
+    # Когда менялись подписки пользователя: входит в ключ кеша множества подписок
+    # (accounts.follow_graph), так что подписка в одном процессе видна всем остальным
+    following_changed_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Подписки изменены")
     
+    # Поля, которые меняются одиночными UPDATE (сигналы, воркеры): обычный save() их не пишет
+    PROTECTED_FIELDS = (
+        'followers_count', 'following_count', 'post_count',
+        'notifications_seen_at', 'notifications_changed_at', 'suggestions_built_at', 'following_changed_at',
+    )
+
+    def save(self, *args, **kwargs):
+        protect_fields(self, kwargs, self.PROTECTED_FIELDS)
+        super().save(*args, **kwargs)
+
     def get_followers_count(self):
         """Количество подписчиков"""
-        return self.followers.count()
+        return self.followers_count
     
     def get_following_count(self):
         """Количество подписок"""
-        return self.following.count()
+        return self.following_count
     
     def is_following(self, user):
         """Проверяет, подписан ли текущий пользователь на другого"""
@@ -51,13 +77,27 @@ class Follow(models.Model):
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
         unique_together = ('follower', 'following')
+        # Списки подписчиков/подписок листаются курсором по (created_at, id)
+        indexes = [
+            models.Index(fields=['following', 'created_at'], name='accounts_follow_followers_idx'),
+            models.Index(fields=['follower', 'created_at'], name='accounts_follow_following_idx'),
+        ]
         
     def __str__(self):
         return f"{self.follower.username} подписан на {self.following.username}"
 
 
 class Notification(models.Model):
-    """Простая система уведомлений для пользователей"""
+    """Простая система уведомлений для пользователей
+
+    Однотипные события (verb) складываются в одно непрочитанное уведомление:
+    «X и ещё 12 подписались на вас» (см. accounts.notifications.deliver_pending).
+    """
+
+    class Verb(models.TextChoices):
+        MESSAGE = '', 'Сообщение'
+        FOLLOW = 'follow', 'Подписка'
+
     recipient = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -68,13 +108,62 @@ class Notification(models.Model):
     # Необязательная ссылка для перехода (например, на профиль подписчика)
     link = models.CharField(max_length=255, blank=True, default='', verbose_name='Ссылка')
     is_read = models.BooleanField(default=False, verbose_name='Прочитано')
+    # При объединении событий created_at сдвигается на время последнего из них
     created_at = models.DateTimeField(default=timezone.now, verbose_name='Создано')
+    verb = models.CharField(max_length=20, choices=Verb.choices, default=Verb.MESSAGE, blank=True, verbose_name='Тип')
+    # Последний из пользователей, чьи действия собраны в уведомлении, и их число
+    actor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Инициатор',
+    )
+    actor_count = models.PositiveIntegerField(default=1, verbose_name='Инициаторов')
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Уведомление'
         verbose_name_plural = 'Уведомления'
+        indexes = [
+            # Непрочитанные пользователя (бейдж, объединение событий), очистка прочитанных
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='accounts_notif_unread_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.recipient.username}: {self.message}"
 
+
+class PendingNotification(models.Model):
+    """An event waiting for ``manage.py deliver_notifications`` to turn it into a :class:`Notification`."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Получатель')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Инициатор')
+    verb = models.CharField(max_length=20, choices=Notification.Verb.choices, verbose_name='Тип')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Событие для уведомления'
+        verbose_name_plural = 'События для уведомлений'
+
+    def __str__(self) -> str:
+        return f"{self.actor_id} → {self.recipient_id}: {self.verb}"
+
+
+
+class FollowSuggestion(models.Model):
+    """A precomputed "people you may know" entry, rebuilt by ``manage.py build_suggestions``.
+
+    ``score`` is how many of the people ``user`` follows follow ``suggested``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions', verbose_name='Пользователь')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name='Рекомендуемый')
+    score = models.PositiveIntegerField(verbose_name='Общих подписок')
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested'], name='accounts_suggestion_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='accounts_suggestion_top_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} → {self.suggested_id} ({self.score})"
@@ -0,0 +1,191 @@
+"""Notification delivery and cached unread counts.
+
+Events such as a new follower are not written as notifications on the
+request path.  :func:`enqueue_notification` records a small
+:class:`~accounts.models.PendingNotification`, skipping repeats of the same
+event within ``DEDUP_WINDOW`` (follow/unfollow/follow).  ``manage.py
+deliver_notifications`` then turns pending events into notifications in
+bulk, folding events of one kind into the recipient's recent unread
+notification: "X and 12 others followed you".
+
+Reading is tracked by a per-user high-water mark,
+``User.notifications_seen_at``: a notification is unread if it is newer than
+the mark and not individually ``is_read``.  Marking everything read is one
+single-row ``UPDATE`` (:func:`mark_all_read`); the unread count is a range
+count on the ``(recipient, is_read, created_at)`` index, cached per user.
+
+Notifications are delivered by a separate process, whose cache the web
+workers may not share, so the count is not invalidated by deleting a cache
+key.  Its key embeds ``User.notifications_changed_at`` and
+``notifications_seen_at`` instead: :func:`touch_notifications` moves the
+former in the database whenever the user's notifications change
+(:mod:`accounts.signals` for single saves and deletes, bulk writes here
+themselves), and the next request, which loads the user row anyway, uses a
+new key.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.urls import reverse
+from django.utils import timezone
+
+from website.queues import take_rows
+
+from .models import Notification, PendingNotification, User
+
+UNREAD_CACHE_TIMEOUT = 300
+# Повтор того же события (отписался и снова подписался) в этом окне не уведомляет
+DEDUP_WINDOW = timedelta(hours=1)
+# События складываются в непрочитанное уведомление не старше этого
+COALESCE_WINDOW = timedelta(days=1)
+DELIVERY_BATCH_SIZE = 500
+PRUNE_CHUNK_SIZE = 1000
+
+
+def _stamp(value: Optional[datetime]) -> str:
+    return value.isoformat() if value is not None else '-'
+
+
+def _unread_key(user: User) -> str:
+    return f'accounts:unread:{user.pk}:{_stamp(user.notifications_changed_at)}:{_stamp(user.notifications_seen_at)}'
+
+
+def unread_notifications(user: User) -> QuerySet[Notification]:
+    unread = Notification.objects.filter(recipient_id=user.pk, is_read=False)
+    if user.notifications_seen_at is not None:
+        unread = unread.filter(created_at__gt=user.notifications_seen_at)
+    return unread
+
+
+def is_unread(notification: Notification, seen_at: Optional[datetime]) -> bool:
+    return not notification.is_read and (seen_at is None or notification.created_at > seen_at)
+
+
+def unread_count(user: User) -> int:
+    key = _unread_key(user)
+    count = cache.get(key)
+    if count is None:
+        count = unread_notifications(user).count()
+        cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def touch_notifications(*user_ids: Any) -> None:
+    """Record that the users' notifications changed; their cached counts stop being used."""
+    User.objects.filter(pk__in=user_ids).update(notifications_changed_at=timezone.now())
+
+
+def mark_all_read(user: User, up_to: Optional[datetime] = None) -> bool:
+    """Move the user's read marker forward to ``up_to`` (default: now).
+
+    One conditional single-row ``UPDATE``; the marker never moves back.
+    Returns whether it moved.  The marker is part of the unread-count key,
+    so nothing needs to be invalidated.
+    """
+    up_to = up_to or timezone.now()
+    moved = User.objects.filter(
+        Q(notifications_seen_at__isnull=True) | Q(notifications_seen_at__lt=up_to), pk=user.pk
+    ).update(notifications_seen_at=up_to)
+    if moved:
+        user.notifications_seen_at = up_to
+    return bool(moved)
+
+
+def enqueue_notification(recipient_id: Any, actor_id: Any, verb: str) -> bool:
+    """Queue an event for delivery; ``False`` if the same one was queued recently."""
+    # cache.add атомарен: из двух одновременных одинаковых событий пройдёт одно
+    if not cache.add(f'accounts:notify:{verb}:{recipient_id}:{actor_id}', 1, int(DEDUP_WINDOW.total_seconds())):
+        return False
+    PendingNotification.objects.create(recipient_id=recipient_id, actor_id=actor_id, verb=verb)
+    return True
+
+
+def describe(verb: str, recipient: User, actor: Optional[User], actor_count: int) -> tuple[str, str]:
+    """Message and link of an aggregated notification."""
+    name = actor.username if actor is not None else 'Кто-то'
+    if verb == Notification.Verb.FOLLOW:
+        if actor_count > 1:
+            message = f"{name} и ещё {actor_count - 1} подписались на вас"
+            return message, reverse('accounts:followers', kwargs={'username': recipient.username})
+        link = reverse('accounts:profile-user', kwargs={'username': name}) if actor is not None else ''
+        return f"{name} подписался на вас", link
+    return name, ''
+
+
+def deliver_pending(limit: int = DELIVERY_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+    """Turn up to ``limit`` pending events into notifications; returns events delivered.
+
+    A fixed number of queries per batch: events, the users involved, the
+    recipients' recent unread notifications, one ``bulk_update``, one
+    ``bulk_create`` and one ``UPDATE`` of the recipients' change marks.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        events = take_rows(PendingNotification.objects.all(), limit)
+        if not events:
+            return 0
+        # Инициаторы каждой группы (получатель, тип) — в порядке событий, без повторов
+        groups: dict[tuple[int, str], list[int]] = defaultdict(list)
+        for event in events:
+            actors = groups[(event.recipient_id, event.verb)]
+            if event.actor_id in actors:
+                actors.remove(event.actor_id)
+            actors.append(event.actor_id)
+        user_ids = {pk for (recipient_id, _), actors in groups.items() for pk in (recipient_id, *actors)}
+        users = User.objects.only('id', 'username', 'notifications_seen_at').in_bulk(user_ids)
+        recent = {
+            (n.recipient_id, n.verb): n
+            for n in Notification.objects.filter(
+                recipient_id__in={r for r, _ in groups},
+                verb__in={v for _, v in groups},
+                is_read=False,
+                created_at__gte=now - COALESCE_WINDOW,
+            ).order_by('created_at')
+        }
+        to_update: list[Notification] = []
+        to_create: list[Notification] = []
+        for (recipient_id, verb), actors in groups.items():
+            recipient = users.get(recipient_id)
+            if recipient is None:
+                continue
+            actor = users.get(actors[-1])
+            notification = recent.get((recipient_id, verb))
+            if notification is not None and not is_unread(notification, recipient.notifications_seen_at):
+                # Уже просмотренное не дополняем — новые подписчики придут отдельным уведомлением
+                notification = None
+            if notification is not None:
+                notification.actor_count += len(actors)
+                to_update.append(notification)
+            else:
+                notification = Notification(recipient_id=recipient_id, verb=verb, actor_count=len(actors))
+                to_create.append(notification)
+            notification.actor = actor
+            notification.created_at = now
+            notification.message, notification.link = describe(verb, recipient, actor, notification.actor_count)
+        Notification.objects.bulk_update(to_update, ['actor', 'actor_count', 'created_at', 'message', 'link'])
+        Notification.objects.bulk_create(to_create)
+        # bulk-операции не шлют сигналов — отметку для бейджей ставим сами
+        touch_notifications(*{recipient_id for recipient_id, _ in groups})
+    return len(events)
+
+
+def prune_notifications(older_than: datetime, chunk_size: int = PRUNE_CHUNK_SIZE) -> int:
+    """Delete read notifications created before ``older_than``, ``chunk_size`` rows per ``DELETE``.
+
+    Short deletes keep locks brief on a busy table; returns rows deleted.
+    """
+    deleted = 0
+    read = Q(is_read=True) | Q(created_at__lte=F('recipient__notifications_seen_at'))
+    old = Notification.objects.filter(read, created_at__lt=older_than)
+    while True:
+        ids = list(old.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        count, _ = Notification.objects.filter(pk__in=ids).delete()
+        deleted += count
@@ -0,0 +1,176 @@
+""""People you may know": friends-of-friends follow suggestions.
+
+``manage.py build_suggestions`` runs offline.  It reads ``Follow`` once,
+ordered by ``(follower, following)``, into a compressed sparse row layout of
+three ``array('q')``: the sorted follower ids, each one's offset into
+``targets``, and all followed ids.  That is 8 bytes per edge plus 16 per
+follower, with no model instances or per-user Python sets.  For each user the
+command counts who is followed by the people they follow, drops those they
+already follow, and keeps the top ``SUGGESTIONS_TOP_K``.  Results replace the
+:class:`~accounts.models.FollowSuggestion` rows batch by batch.
+
+The profile widget reads them via :func:`get_suggestions`.  The command runs
+in its own process, so it cannot invalidate the web workers' cache; instead
+each batch stamps ``User.suggestions_built_at`` in the same transaction as the
+rows, and the widget's cache key embeds the stamp of the (already loaded)
+user.  Anyone the user has followed since is filtered out with the
+follow-set from :mod:`accounts.follow_graph`.
+"""
+from __future__ import annotations
+
+import heapq
+from array import array
+from datetime import datetime
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .follow_graph import followed_among
+from .models import Follow, FollowSuggestion, User
+
+SUGGESTIONS_TOP_K = 20
+SUGGESTIONS_SHOWN = 5
+# Подписки «подписан на всех» почти ничего не говорят о вкусах, а стоят дороже всего
+MAX_INTERMEDIATE_DEGREE = 1000
+GRAPH_CHUNK_SIZE = 5000
+WRITE_BATCH_USERS = 500
+SUGGESTIONS_CACHE_TIMEOUT = 3600
+
+
+@dataclass
+class FollowGraph:
+    """Who follows whom as CSR arrays: ``targets[offsets[i]:offsets[i + 1]]`` are followed by ``users[i]``."""
+    users: array
+    offsets: array
+    targets: array
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.users, self.offsets, self.targets))
+
+    def row(self, user_id: int) -> Optional[tuple[int, int]]:
+        """Bounds of the user's row in ``targets``; ``None`` if they follow nobody."""
+        i = bisect_left(self.users, user_id)
+        if i < len(self.users) and self.users[i] == user_id:
+            return self.offsets[i], self.offsets[i + 1]
+        return None
+
+
+def load_graph(chunk_size: int = GRAPH_CHUNK_SIZE) -> FollowGraph:
+    """Stream every follow edge into a :class:`FollowGraph`."""
+    users, offsets, targets = array('q'), array('q'), array('q')
+    edges = Follow.objects.order_by('follower_id', 'following_id').values_list('follower_id', 'following_id')
+    for follower_id, following_id in edges.iterator(chunk_size=chunk_size):
+        if not users or users[-1] != follower_id:
+            users.append(follower_id)
+            offsets.append(len(targets))
+        targets.append(following_id)
+    offsets.append(len(targets))
+    return FollowGraph(users, offsets, targets)
+
+
+def suggest(
+    graph: FollowGraph, user_id: int, k: int = SUGGESTIONS_TOP_K, max_degree: int = MAX_INTERMEDIATE_DEGREE
+) -> list[tuple[int, int]]:
+    """Top ``k`` ``(suggested id, score)`` for one user, best first."""
+    own = graph.row(user_id)
+    if own is None:
+        return []
+    targets = graph.targets
+    scores: dict[int, int] = {}
+    for p in range(*own):
+        row = graph.row(targets[p])
+        if row is None or row[1] - row[0] > max_degree:
+            continue
+        for q in range(*row):
+            candidate = targets[q]
+            scores[candidate] = scores.get(candidate, 0) + 1
+    scores.pop(user_id, None)
+    for p in range(*own):
+        scores.pop(targets[p], None)
+    # При равенстве — меньший id: результат не зависит от порядка обхода
+    return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def _replace_suggestions(after: int, up_to: Optional[int], rows: list[FollowSuggestion], built_at: datetime) -> None:
+    """Swap the stored suggestions of users with ids in ``(after, up_to]`` for ``rows``."""
+    stale = FollowSuggestion.objects.filter(user_id__gt=after)
+    users = User.objects.filter(pk__gt=after)
+    if up_to is not None:
+        stale = stale.filter(user_id__lte=up_to)
+        users = users.filter(pk__lte=up_to)
+    with transaction.atomic():
+        stale.delete()
+        FollowSuggestion.objects.bulk_create(rows)
+        # Новая версия для кеша виджета — вместе со строками, в одной транзакции
+        users.update(suggestions_built_at=built_at)
+
+
+def build_suggestions(
+    k: int = SUGGESTIONS_TOP_K,
+    max_degree: int = MAX_INTERMEDIATE_DEGREE,
+    batch_users: int = WRITE_BATCH_USERS,
+    graph: Optional[FollowGraph] = None,
+) -> tuple[int, int]:
+    """Recompute every user's suggestions; returns ``(users with suggestions, rows written)``.
+
+    Users are written in id ranges of ``batch_users``, each range in its own
+    short transaction, so the widget never sees a half-empty table and memory
+    holds one batch of rows at a time.  Ranges cover the gaps between users
+    too: users who no longer follow anyone lose their old suggestions.
+    """
+    graph = graph or load_graph()
+    built_at = timezone.now()
+    users = written = 0
+    after = 0
+    batch: list[FollowSuggestion] = []
+    for i, user_id in enumerate(graph.users):
+        top = suggest(graph, user_id, k, max_degree)
+        users += bool(top)
+        batch.extend(FollowSuggestion(user_id=user_id, suggested_id=pk, score=score) for pk, score in top)
+        if (i + 1) % batch_users == 0:
+            _replace_suggestions(after, user_id, batch, built_at)
+            written += len(batch)
+            after, batch = user_id, []
+    _replace_suggestions(after, None, batch, built_at)
+    written += len(batch)
+    return users, written
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    id: int
+    username: str
+    full_name: str
+    avatar: str
+    score: int
+
+
+def get_suggestions(user: Any, limit: int = SUGGESTIONS_SHOWN) -> list[Suggestion]:
+    """The widget's suggestions for ``user``, minus anyone they have followed since the last build."""
+    if not user.is_authenticated or user.suggestions_built_at is None:
+        return []
+    key = f'accounts:suggestions:{user.pk}:{user.suggestions_built_at.isoformat()}'
+    suggestions = cache.get(key)
+    if suggestions is None:
+        rows = (
+            FollowSuggestion.objects.filter(user_id=user.pk)
+            .select_related('suggested').order_by('-score', 'suggested_id')
+        )
+        suggestions = [
+            Suggestion(
+                id=row.suggested_id,
+                username=row.suggested.username,
+                full_name=row.suggested.get_full_name(),
+                avatar=row.suggested.avatar or '',
+                score=row.score,
+            )
+            for row in rows
+        ]
+        cache.set(key, suggestions, SUGGESTIONS_CACHE_TIMEOUT)
+    followed = followed_among(user, [s.id for s in suggestions])
+    return [s for s in suggestions if s.id not in followed][:limit]
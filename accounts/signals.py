@@ -1,18 +1,39 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from django.urls import reverse
-from .models import Follow, Notification
+from .counters import adjust_counter
+from .follow_graph import touch_follow_set
+from .notifications import enqueue_notification, touch_notifications
+from .models import Follow, Notification, User
 
 @receiver(post_save, sender=Follow)
 def create_follow_notification(sender, instance: Follow, created: bool, **kwargs):
-    """Создаём уведомление при новой подписке"""
+    """Ставим в очередь уведомление о новой подписке (доставит manage.py deliver_notifications)"""
     if not created:
         return
-    follower = instance.follower
-    following = instance.following
-    # Для получателя (на кого подписались)
-    Notification.objects.create(
-        recipient=following,
-        message=f"{follower.username} подписался на вас",
-        link=reverse('accounts:profile-user', kwargs={'username': follower.username}),
-    )
+    enqueue_notification(instance.following_id, instance.follower_id, Notification.Verb.FOLLOW)
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counters(sender, instance: Follow, created: bool, **kwargs):
+    if not created:
+        return
+    adjust_counter(User, instance.following_id, 'followers_count', 1)
+    adjust_counter(User, instance.follower_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counters(sender, instance: Follow, **kwargs):
+    adjust_counter(User, instance.following_id, 'followers_count', -1)
+    adjust_counter(User, instance.follower_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_set(sender, instance: Follow, **kwargs):
+    touch_follow_set(instance.follower_id)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalidate_unread_count(sender, instance: Notification, **kwargs):
+    touch_notifications(instance.recipient_id)
@@ -1 +1,271 @@
-"""Accounts tests placeholder."""
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from shop.context_processors import cart_context
+
+from .context_processors import notifications_context
+from .follow_graph import followed_among, get_follow_set
+from .models import Follow, FollowSuggestion, Notification, PendingNotification, User
+from .notifications import deliver_pending, enqueue_notification, mark_all_read, prune_notifications, unread_count
+from .recommendations import build_suggestions, get_suggestions, load_graph, suggest
+from .views import FOLLOWS_PER_PAGE, NOTIFICATIONS_PER_PAGE
+
+
+class FollowNotificationTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.star = User.objects.create_user('star', 's@example.com', 'pw12345!x')
+        self.fans = User.objects.bulk_create([User(username=f'fan{i}') for i in range(15)])
+
+    def follow(self, fan: User) -> None:
+        Follow.objects.create(follower=fan, following=self.star)
+
+    def fresh_star(self) -> User:
+        # Как в новом запросе: пользователь читается из БД заново
+        return User.objects.get(pk=self.star.pk)
+
+    def test_repeated_follow_is_queued_once(self) -> None:
+        for _ in range(3):
+            self.follow(self.fans[0])
+            Follow.objects.filter(follower=self.fans[0], following=self.star).delete()
+        self.assertEqual(PendingNotification.objects.count(), 1)
+        self.assertFalse(enqueue_notification(self.star.pk, self.fans[0].pk, Notification.Verb.FOLLOW))
+
+    def test_followers_are_aggregated_and_counted(self) -> None:
+        self.assertEqual(unread_count(self.fresh_star()), 0)
+        for fan in self.fans[:14]:
+            self.follow(fan)
+
+        # SAVEPOINT/RELEASE, события и их удаление, пользователи, недавние уведомления,
+        # bulk_create, отметка изменений (bulk_update пуст и в БД не ходит)
+        with self.assertNumQueries(8):
+            self.assertEqual(deliver_pending(), 14)
+
+        notification = Notification.objects.get(recipient=self.star)
+        self.assertEqual(notification.actor_count, 14)
+        self.assertEqual(notification.message, 'fan13 и ещё 13 подписались на вас')
+        # Доставка не трогала кеш веб-процесса, но ключ счётчика сменился вместе с отметкой в БД
+        self.assertEqual(unread_count(self.fresh_star()), 1)
+
+        self.follow(self.fans[14])
+        deliver_pending()
+        notification.refresh_from_db()
+        self.assertEqual(notification.message, 'fan14 и ещё 14 подписались на вас')
+        self.assertEqual(unread_count(self.fresh_star()), 1)
+
+    def test_profile_save_keeps_counters_and_stamps(self) -> None:
+        stale = self.fresh_star()
+        self.follow(self.fans[0])
+        deliver_pending()
+        star = self.fresh_star()
+
+        stale.city = 'Киев'
+        stale.save()
+        stale.refresh_from_db()
+        self.assertEqual(stale.city, 'Киев')
+        self.assertEqual(stale.followers_count, 1)
+        self.assertEqual(stale.notifications_changed_at, star.notifications_changed_at)
+        self.assertEqual(unread_count(stale), 1)
+
+    def test_seen_notification_is_not_extended(self) -> None:
+        self.follow(self.fans[0])
+        deliver_pending()
+        star = self.fresh_star()
+        self.assertEqual(unread_count(star), 1)
+        mark_all_read(star)
+        self.assertEqual(unread_count(self.fresh_star()), 0)
+
+        self.follow(self.fans[1])
+        deliver_pending()
+        self.assertEqual(Notification.objects.filter(recipient=self.star).count(), 2)
+        self.assertEqual(unread_count(self.fresh_star()), 1)
+
+
+class NavbarContextTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create(username='reader')
+        self.other = User.objects.create(username='writer')
+        Notification.objects.create(recipient=self.user, actor=self.other, verb=Notification.Verb.FOLLOW, message='writer подписался на вас')
+
+    def context(self) -> dict:
+        request = RequestFactory().get('/')
+        # Как AuthenticationMiddleware: пользователь загружается при первом обращении
+        request.user = SimpleLazyObject(lambda: User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(0):
+            return {**notifications_context(request), **cart_context(request)}
+
+    def test_badges_are_computed_only_when_printed(self) -> None:
+        context = self.context()
+        with self.assertNumQueries(0):
+            self.assertEqual(context['cart_item_count'], 0)
+        # Пользователь и COUNT; дальше — из кеша
+        with self.assertNumQueries(2):
+            self.assertEqual(context['notifications_unread_count'], 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.context()['notifications_unread_count'], 1)
+
+    def test_notification_changes_reset_cached_count(self) -> None:
+        self.assertEqual(self.context()['notifications_unread_count'], 1)
+        Notification.objects.create(recipient=self.user, actor=self.other, verb=Notification.Verb.FOLLOW, message='ещё')
+        self.assertEqual(self.context()['notifications_unread_count'], 2)
+        Notification.objects.filter(recipient=self.user).first().delete()
+        self.assertEqual(self.context()['notifications_unread_count'], 1)
+
+
+class NotificationPageTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create(username='reader')
+        self.actor = User.objects.create(username='writer')
+        start = timezone.now() - timedelta(days=30)
+        Notification.objects.bulk_create([
+            Notification(recipient=self.user, actor=self.actor, message=f'Событие {i}', created_at=start + timedelta(days=i))
+            for i in range(NOTIFICATIONS_PER_PAGE + 5)
+        ])
+        self.newest = Notification.objects.order_by('-created_at').first()
+        self.client.force_login(self.user)
+
+    def seen_at(self) -> datetime:
+        return User.objects.values_list('notifications_seen_at', flat=True).get(pk=self.user.pk)
+
+    def test_first_page_moves_marker_to_newest_shown(self) -> None:
+        url = reverse('accounts:notifications')
+        first = self.client.get(url)
+        page = first.context['page_obj']
+        self.assertEqual(len(page), NOTIFICATIONS_PER_PAGE)
+        self.assertTrue(all(n.unread for n in page))
+        self.assertEqual(self.seen_at(), self.newest.created_at)
+        self.assertEqual(unread_count(User.objects.get(pk=self.user.pk)), 0)
+
+        # Дальние страницы отметку не двигают, но уже показывают прочитанным
+        older = self.client.get(url, {'cursor': page.next_cursor}).context['page_obj']
+        self.assertEqual(len(older), 5)
+        self.assertFalse(any(n.unread for n in older))
+        self.assertEqual(self.seen_at(), self.newest.created_at)
+
+    def test_marker_never_moves_back(self) -> None:
+        self.assertTrue(mark_all_read(self.user, self.newest.created_at))
+        self.assertFalse(mark_all_read(self.user, self.newest.created_at - timedelta(days=1)))
+        self.assertEqual(self.seen_at(), self.newest.created_at)
+
+    def test_prune_treats_notifications_under_marker_as_read(self) -> None:
+        marker = self.newest.created_at - timedelta(days=10)
+        mark_all_read(self.user, marker)
+        under_marker = Notification.objects.filter(created_at__lte=marker).count()
+        # Старше недели, но выше отметки и без флага — непрочитанные, остаются
+        self.assertEqual(prune_notifications(timezone.now() - timedelta(days=1), chunk_size=4), under_marker)
+        self.assertFalse(Notification.objects.filter(created_at__lte=marker).exists())
+        self.assertEqual(Notification.objects.count(), NOTIFICATIONS_PER_PAGE + 5 - under_marker)
+
+class FollowSuggestionTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.users = {name: User.objects.create(username=name) for name in 'abcdef'}
+
+    def follow(self, *pairs: str) -> None:
+        Follow.objects.bulk_create([Follow(follower=self.users[p[0]], following=self.users[p[1]]) for p in pairs])
+
+    def suggested(self, name: str) -> list[tuple[str, int]]:
+        user = User.objects.get(username=name)
+        return [(s.username, s.score) for s in get_suggestions(user)]
+
+    def test_friends_of_friends_ranked_by_mutual_follows(self) -> None:
+        self.follow('ab', 'ae', 'bc', 'bd', 'ec', 'ea')
+        graph = load_graph()
+        u = {name: user.pk for name, user in self.users.items()}
+        self.assertEqual(suggest(graph, u['a']), [(u['c'], 2), (u['d'], 1)])
+        # Уже подписан или сам пользователь — не предлагаем
+        self.assertEqual(suggest(graph, u['e']), [(u['b'], 1)])
+        self.assertEqual(suggest(graph, u['f']), [])
+
+    def test_widget_sees_rebuild_without_cache_invalidation(self) -> None:
+        self.assertEqual(self.suggested('a'), [])
+        self.follow('ab', 'bc')
+        build_suggestions()
+        self.assertEqual(self.suggested('a'), [('c', 1)])
+        stale = User.objects.get(username='a')
+
+        # Пересчёт из другого процесса: кеш этого процесса он не трогает
+        self.follow('ad', 'dc', 'de')
+        build_suggestions()
+        self.assertEqual(self.suggested('a'), [('c', 2), ('e', 1)])
+        self.assertEqual([s.username for s in get_suggestions(stale)], ['c'])
+
+        # Подписался после пересчёта — из виджета пропадает сразу
+        Follow.objects.create(follower=self.users['a'], following=self.users['c'])
+        self.assertEqual(self.suggested('a'), [('e', 1)])
+
+    def test_rebuild_drops_suggestions_of_users_who_follow_nobody(self) -> None:
+        self.follow('ab', 'bc')
+        build_suggestions()
+        Follow.objects.filter(follower=self.users['a']).delete()
+        build_suggestions()
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.users['a']).exists())
+        self.assertEqual(self.suggested('a'), [])
+
+
+class FollowSetTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.viewer, self.a, self.b = (User.objects.create(username=name) for name in ('viewer', 'a', 'b'))
+
+    def fresh_viewer(self) -> User:
+        return User.objects.get(pk=self.viewer.pk)
+
+    def test_follow_in_another_process_is_seen_without_cache_invalidation(self) -> None:
+        Follow.objects.create(follower=self.viewer, following=self.a)
+        viewer = self.fresh_viewer()
+        self.assertEqual(followed_among(viewer, [self.a.pk, self.b.pk]), {self.a.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(list(get_follow_set(viewer)), [self.a.pk])
+
+        Follow.objects.filter(follower=self.viewer, following=self.a).delete()
+        Follow.objects.create(follower=self.viewer, following=self.b)
+        # Кеш никто не сбрасывал: запрос, загрузивший пользователя до изменений, видит старое множество,
+        # а следующий — новое, по отметке из БД
+        self.assertEqual(followed_among(viewer, [self.a.pk, self.b.pk]), {self.a.pk})
+        self.assertEqual(followed_among(self.fresh_viewer(), [self.a.pk, self.b.pk]), {self.b.pk})
+
+    def test_follow_button_toggles_from_database_state(self) -> None:
+        self.client.force_login(self.viewer)
+        url = reverse('accounts:follow-toggle', kwargs={'username': self.a.username})
+        profile = reverse('accounts:profile-user', kwargs={'username': self.a.username})
+        self.client.get(profile)
+
+        self.client.post(url)
+        self.assertTrue(self.client.get(profile).context['is_following'])
+        self.client.post(url)
+        self.assertFalse(self.client.get(profile).context['is_following'])
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follower_list_pages_with_buttons_for_the_page_only(self) -> None:
+        fans = User.objects.bulk_create([User(username=f'fan{i:02}') for i in range(FOLLOWS_PER_PAGE + 5)])
+        Follow.objects.bulk_create([Follow(follower=fan, following=self.a) for fan in fans])
+        # Зритель подписан на двух подписчиков и ещё на b, которого в списке нет
+        for user in (fans[0], fans[-1], self.b):
+            Follow.objects.create(follower=self.viewer, following=user)
+        self.client.force_login(self.viewer)
+
+        url = reverse('accounts:followers', kwargs={'username': self.a.username})
+        first = self.client.get(url).context
+        self.assertEqual(len(first['page_obj']), FOLLOWS_PER_PAGE)
+        self.assertEqual(first['following_ids'], {fans[-1].pk})
+        rest = self.client.get(url, {'cursor': first['page_obj'].next_cursor}).context
+        self.assertEqual([f.follower_id for f in rest['page_obj']], [fan.pk for fan in fans[4::-1]])
+        self.assertEqual(rest['following_ids'], {fans[0].pk})
+
+    @override_settings(FOLLOW_SET_MAX_SIZE=0)
+    def test_large_follow_sets_are_checked_by_query(self) -> None:
+        Follow.objects.create(follower=self.viewer, following=self.a)
+        viewer = self.fresh_viewer()
+        self.assertIsNone(get_follow_set(viewer))
+        with self.assertNumQueries(1):
+            self.assertEqual(followed_among(viewer, [self.a.pk, self.b.pk]), {self.a.pk})
+        self.assertEqual(followed_among(AnonymousUser(), [self.a.pk]), set())
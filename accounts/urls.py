@@ -17,6 +17,7 @@ urlpatterns = [
     path('follow/<str:username>/', views.follow_toggle_view, name='follow-toggle'),
     path('followers/<str:username>/', views.followers_view, name='followers'),
     path('following/<str:username>/', views.following_view, name='following'),
+    path('feed/', views.feed_view, name='feed'),
     path('notifications/', views.notifications_view, name='notifications'),
     path('notifications/mark-read/', views.notifications_mark_read, name='notifications-mark-read'),
 ]
\ No newline at end of file
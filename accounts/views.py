@@ -1,12 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db import transaction
 from django.urls import reverse
 from django.contrib.auth import login, logout
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
-from typing import Optional, Dict, Any, Set, cast
+from typing import Optional, Dict, Any, cast
 from .forms import CustomUserCreationForm
+from .follow_graph import followed_among
 from .models import User, Follow, Notification
+from .recommendations import get_suggestions
+from .notifications import is_unread, mark_all_read
 from blog.models import Post, Comment
+from blog.pagination import get_cursor_page
+from feed.timeline import get_feed_page
 
 def register_view(request: HttpRequest) -> HttpResponse:
     """Представление для регистрации новых пользователей с кастомной моделью User"""
@@ -64,23 +70,15 @@ def profile_view(request: HttpRequest, username: Optional[str] = None) -> HttpRe
     # Получаем комментарии пользователя
     user_comments = Comment.objects.filter(author=user, is_active=True).order_by('-created_at')[:5]
     
-    # Статистика
-    posts_count = user_posts.count()
+    # Статистика (посты и подписки — из денормализованных счётчиков)
+    posts_count = user.post_count
     comments_count = Comment.objects.filter(author=user, is_active=True).count()
     
     # Информация о подписках
     followers_count: int = user.get_followers_count()  # type: ignore[attr-defined]
     following_count: int = user.get_following_count()  # type: ignore[attr-defined]
-    is_following: bool = False
-    following_ids: Set[int] = set()
-
-    if request.user.is_authenticated:
-        # is current user following the profile user (only relevant if viewing others)
-        if not is_own_profile:
-            is_following = user.followers.filter(follower=request.user).exists()  # type: ignore[attr-defined]
-        # build a set of ids current user is following for template checks
-        current_user = cast(User, request.user)
-        following_ids = set(current_user.following.values_list('following__id', flat=True))  # type: ignore[attr-defined]
+    # Подписан ли текущий пользователь на владельца профиля (для чужого профиля)
+    is_following = not is_own_profile and user.pk in followed_among(request.user, [user.pk])
     
     context: Dict[str, Any] = {
         'title': f'Профиль {user.get_full_name() or user.username}',
@@ -93,7 +91,8 @@ def profile_view(request: HttpRequest, username: Optional[str] = None) -> HttpRe
         'followers_count': followers_count,
         'following_count': following_count,
         'is_following': is_following,
-        'following_ids': following_ids,
+        # «Возможно, вы знакомы» — только в своём профиле
+        'suggestions': get_suggestions(user) if is_own_profile else [],
     }
     return render(request, 'accounts/profile.html', context)
 
@@ -115,32 +114,55 @@ def follow_toggle_view(request: HttpRequest, username: str) -> HttpResponse:
         # Больше не показываем всплывающие сообщения, просто редирект
         return redirect('accounts:profile-user', username=username)
     
-    # Проверяем, есть ли уже подписка
-    follow_obj = Follow.objects.filter(follower=request.user, following=user_to_follow).first()
-    
-    if follow_obj:
-        # Если подписка есть - отписываемся
-        follow_obj.delete()
-    else:
-        # Если подписки нет - подписываемся (уведомление создаст сигнал)
-        Follow.objects.create(follower=request.user, following=user_to_follow)
+    # Подписка, счётчики и отметка для кеша подписок (см. accounts.signals) — одной транзакцией
+    with transaction.atomic():
+        follow_obj = Follow.objects.filter(follower=request.user, following=user_to_follow).first()
+        if follow_obj:
+            # Если подписка есть - отписываемся
+            follow_obj.delete()
+        else:
+            # Если подписки нет - подписываемся (уведомление создаст сигнал)
+            Follow.objects.create(follower=request.user, following=user_to_follow)
     
     return redirect('accounts:profile-user', username=username)
 
 
+def feed_view(request: HttpRequest) -> HttpResponse:
+    """Лента постов авторов, на которых подписан пользователь"""
+    if not request.user.is_authenticated:
+        return redirect('accounts:login')
+    page_obj = get_feed_page(request.user, request.GET.get('cursor'))
+    context: Dict[str, Any] = {
+        'title': 'Лента',
+        'posts': page_obj,
+        'page_obj': page_obj,
+    }
+    return render(request, 'accounts/feed.html', context)
+
+
+NOTIFICATIONS_PER_PAGE = 20
+
+
 def notifications_view(request: HttpRequest) -> HttpResponse:
     """Список уведомлений для текущего пользователя"""
     if not request.user.is_authenticated:
         return redirect('accounts:login')
 
-    # Вычитываем список и одновременно отмечаем непрочитанные как прочитанные
-    notifs_qs = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-    # сначала получим список, чтобы отрендерить уже обновлённые статусы
-    notifs = list(notifs_qs)
-    Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+    user = cast(User, request.user)
+    page_obj = get_cursor_page(request, Notification.objects.filter(recipient=user), NOTIFICATIONS_PER_PAGE)
+    # Статус «новое» считаем до того, как сдвинем отметку
+    seen_at = user.notifications_seen_at
+    for n in page_obj:
+        n.unread = is_unread(n, seen_at)
+    if not page_obj.has_previous and page_obj.object_list:
+        # Первая страница показала самые свежие — одна запись в строку пользователя вместо UPDATE
+        # по всем уведомлениям. Отметка — время последнего показанного, а не «сейчас»: пришедшее
+        # в эту секунду останется непрочитанным
+        mark_all_read(user, page_obj.object_list[0].created_at)
     context: Dict[str, Any] = {
         'title': 'Уведомления',
-        'notifications': notifs,
+        'notifications': page_obj,
+        'page_obj': page_obj,
     }
     return render(request, 'accounts/notifications.html', context)
 
@@ -149,25 +171,26 @@ def notifications_mark_read(request: HttpRequest) -> HttpResponse:
     if not request.user.is_authenticated:
         return redirect('accounts:login')
     if request.method == 'POST':
-        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        mark_all_read(cast(User, request.user))
     return redirect('accounts:notifications')
 
 
+FOLLOWS_PER_PAGE = 30
+
+
 def followers_view(request: HttpRequest, username: str) -> HttpResponse:
     """Список подписчиков пользователя"""
     user = get_object_or_404(User, username=username)
-    followers = Follow.objects.filter(following=user).select_related('follower')
-    
-    # ids that current user follows, used in template to render button state
-    following_ids: Set[int] = set()
-    if request.user.is_authenticated:
-        current_user = cast(User, request.user)
-        following_ids = set(current_user.following.values_list('following__id', flat=True))  # type: ignore[attr-defined]
+    page_obj = get_cursor_page(request, Follow.objects.filter(following=user).select_related('follower'), FOLLOWS_PER_PAGE)
+    # Состояние кнопок — только для пользователей этой страницы
+    following_ids = followed_among(request.user, [follow.follower_id for follow in page_obj])
 
     context: Dict[str, Any] = {
         'title': f'Подписчики {user.username}',
         'profile_user': user,
-        'followers': followers,
+        'followers': page_obj,
+        'page_obj': page_obj,
+        'total_count': user.followers_count,
         'page_type': 'followers',
         'following_ids': following_ids,
     }
@@ -177,17 +200,15 @@ def followers_view(request: HttpRequest, username: str) -> HttpResponse:
 def following_view(request: HttpRequest, username: str) -> HttpResponse:
     """Список подписок пользователя"""
     user = get_object_or_404(User, username=username)
-    following = Follow.objects.filter(follower=user).select_related('following')
-    
-    following_ids: Set[int] = set()
-    if request.user.is_authenticated:
-        current_user = cast(User, request.user)
-        following_ids = set(current_user.following.values_list('following__id', flat=True))  # type: ignore[attr-defined]
+    page_obj = get_cursor_page(request, Follow.objects.filter(follower=user).select_related('following'), FOLLOWS_PER_PAGE)
+    following_ids = followed_among(request.user, [follow.following_id for follow in page_obj])
 
     context: Dict[str, Any] = {
         'title': f'Подписки {user.username}',
         'profile_user': user,
-        'following': following,
+        'following': page_obj,
+        'page_obj': page_obj,
+        'total_count': user.following_count,
         'page_type': 'following',
         'following_ids': following_ids,
     }
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self) -> None:
+        # Import signal handlers
+        from . import signals  # noqa: F401
+        return super().ready()
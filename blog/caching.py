@@ -0,0 +1,124 @@
+"""Fragment cache for post listings.
+
+Rendered listing fragments are stored under keys that embed a version number
+for every scope they depend on (the index, a category, a tag, or ``all``).
+Signal handlers in :mod:`blog.signals` bump only the scopes a change touches,
+so stale fragments are never served and unrelated pages stay warm.
+
+Changes also come from other processes (the thumbnail worker,
+``create_thumbnails``, another web worker's admin save), whose cache the web
+workers may not share.  The versions are therefore kept in the database
+(:class:`~blog.models.CacheVersion`), not in the cache.  A request reads them
+once, together with the ``all`` and ``index`` scopes that nearly every page
+needs, and reuses them until it finishes.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from asgiref.local import Local
+
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpRequest
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+
+from .models import CacheVersion
+from .pagination import CURSOR_PARAM, decode_cursor
+
+FRAGMENT_TIMEOUT = 600
+CATEGORIES_CACHE_TIMEOUT = 300
+
+# Области (scopes), по которым версионируются фрагменты
+SCOPE_ALL = 'all'
+SCOPE_INDEX = 'index'
+# Читаются при первом обращении в запросе, что бы ни спросили
+BASE_SCOPES = (SCOPE_ALL, SCOPE_INDEX)
+
+# Версии, прочитанные текущим запросом; вне запроса (команды, воркеры) — None
+_request = Local()
+
+
+def category_scope(category_id: Any) -> str:
+    return f'category:{category_id}'
+
+
+def tag_scope(tag_id: Any) -> str:
+    return f'tag:{tag_id}'
+
+
+def start_request() -> None:
+    """Let the versions read from now on be reused until :func:`finish_request`."""
+    _request.versions = {}
+
+
+def finish_request() -> None:
+    _request.versions = None
+
+
+def get_versions(scopes: Iterable[str]) -> list[int]:
+    """Return current versions of ``scopes``, initialising missing ones.
+
+    Fresh versions start from the current time rather than 1 so that a scope
+    created again can never make an old fragment key valid again.
+    """
+    scopes = list(scopes)
+    known: Optional[dict[str, int]] = getattr(_request, 'versions', None)
+    versions = {} if known is None else known
+    wanted = {*scopes, *BASE_SCOPES} - versions.keys()
+    if wanted:
+        found = dict(CacheVersion.objects.filter(scope__in=wanted).values_list('scope', 'version'))
+        missing = [CacheVersion(scope=scope, version=time.time_ns()) for scope in wanted - found.keys()]
+        if missing:
+            # Параллельный запрос мог создать ту же область — тогда наш ключ просто не совпадёт с его
+            CacheVersion.objects.bulk_create(missing, ignore_conflicts=True)
+            found.update((v.scope, v.version) for v in missing)
+        versions.update(found)
+    return [versions[s] for s in scopes]
+
+
+def bump(*scopes: str) -> None:
+    """Invalidate every fragment that depends on any of ``scopes``, in every process."""
+    scopes = set(scopes)
+    # Области без строки ещё никто не читал — сбрасывать нечего
+    CacheVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+    known: Optional[dict[str, int]] = getattr(_request, 'versions', None)
+    if known is not None:
+        for scope in scopes:
+            known.pop(scope, None)
+
+
+def versioned_key(prefix: str, scopes: Iterable[str], *parts: Any) -> str:
+    """Build a cache key that changes whenever one of ``scopes`` is bumped."""
+    scopes = [SCOPE_ALL, *scopes]
+    raw = '|'.join(str(p) for p in (*scopes, *get_versions(scopes), *parts))
+    return f'blog:{prefix}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cached_listing(
+    request: HttpRequest,
+    template_name: str,
+    scopes: Iterable[str],
+    build_context: Callable[[], dict[str, Any]],
+    *parts: Any,
+) -> SafeString:
+    """Render ``template_name`` once per page/scope version and reuse the HTML.
+
+    ``build_context`` runs only on a miss, so cache hits skip the post query,
+    prefetches and template rendering entirely.  The fragment is rendered
+    without ``request`` because it must not contain per-user markup.
+    """
+    token = request.GET.get(CURSOR_PARAM, '')
+    if decode_cursor(token) is None:
+        # Мусорные курсоры рендерят первую страницу — не плодим под них отдельные ключи
+        token = ''
+    auth_state = 'auth' if request.user.is_authenticated else 'anon'
+    key = versioned_key('fragment', scopes, template_name, token, auth_state, *parts)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(template_name, build_context())
+        cache.set(key, str(html), FRAGMENT_TIMEOUT)
+    return mark_safe(html)
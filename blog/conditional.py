@@ -0,0 +1,87 @@
+"""Conditional GET for detail pages.
+
+A view decorated with :func:`conditional_page` declares a cheap version
+lookup — one indexed row, usually ``updated_at`` — that runs before the view.
+When the client already has that version the response is ``304 Not Modified``
+and no template is rendered.
+
+The shared layout differs per viewer (navbar user, cart and notification
+badges, the CSRF token in forms), so the ``ETag`` also covers those; they
+come from cookies, the cache and the scope versions the request reads anyway
+(:mod:`blog.caching`).  No ``Last-Modified`` is sent: a date cannot cover
+those inputs, and a client revalidating with ``If-Modified-Since`` alone
+would get a ``304`` for a page whose badges or sidebar have changed since.
+"""
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Optional, Sequence
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from accounts.notifications import unread_count
+from shop.cart import get_cart
+
+from .caching import SCOPE_ALL, get_versions
+
+VersionFunc = Callable[..., Optional[Sequence[Any]]]
+
+
+def viewer_state(request: HttpRequest) -> tuple[Any, ...]:
+    """What the layout shows to this viewer; part of every page ETag."""
+    user = request.user
+    authenticated = user.is_authenticated
+    return (
+        user.pk if authenticated else 0,
+        unread_count(user) if authenticated else 0,
+        get_cart(request).count,
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        # Категории в сайдбаре, имена тегов и т.п. — общая версия всех листингов
+        *get_versions([SCOPE_ALL]),
+    )
+
+
+def make_etag(*parts: Any) -> str:
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def conditional_page(version: VersionFunc) -> Callable[[Callable[..., HttpResponse]], Callable[..., HttpResponse]]:
+    """Answer ``GET``/``HEAD`` with ``304`` while ``version(request, ...)`` is unchanged.
+
+    ``version`` gets the view's arguments and returns the parts of the page's
+    version (usually starting with ``updated_at``), or ``None`` to let the
+    view decide (missing object, no access).
+    """
+    def decorator(view: Callable[..., HttpResponse]) -> Callable[..., HttpResponse]:
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            state = version(request, *args, **kwargs)
+            if state is None:
+                return view(request, *args, **kwargs)
+            etag = quote_etag(make_etag(*state, *viewer_state(request)))
+
+            # Без last_modified: If-Modified-Since игнорируется, 304 только по ETag
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response.headers['ETag'] = etag
+            elif response.status_code != 304:
+                return response
+
+            if not request.user.is_authenticated:
+                # Кешировать можно где угодно, но каждый раз сверяясь по ETag
+                patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+            else:
+                patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
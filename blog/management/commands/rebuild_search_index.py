@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.search import REBUILD_BATCH_SIZE, get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index for all posts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='Posts per insert batch')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        batch_size = max(1, options['batch_size'])
+        started = time.monotonic()
+        rows = Post.objects.order_by('pk').values_list('pk', 'title', 'content').iterator(chunk_size=batch_size)
+        # Одна транзакция: поиск не видит наполовину пустой индекс
+        with transaction.atomic():
+            total = backend.rebuild(rows, batch_size=batch_size)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} posts with {type(backend).__name__} in {elapsed:.2f}s"
+        ))
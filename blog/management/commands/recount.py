@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from accounts.models import Follow, User
+from blog.models import Comment, Post
+
+
+def _count_of(queryset, field):
+    """Correlated ``COUNT`` of ``queryset`` rows whose ``field`` points at the outer row."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(n=Count('pk')).values('n'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+# (модель, поле-счётчик, выражение с настоящим значением)
+COUNTERS = [
+    (Post, 'comment_count', lambda: _count_of(Comment.objects.filter(is_active=True), 'post')),
+    (User, 'post_count', lambda: _count_of(Post.objects.all(), 'author')),
+    (User, 'followers_count', lambda: _count_of(Follow.objects.all(), 'following')),
+    (User, 'following_count', lambda: _count_of(Follow.objects.all(), 'follower')),
+]
+
+
+class Command(BaseCommand):
+    help = "Recalculate denormalized counters (post comments, user posts/followers/following)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report rows whose counters drifted')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        for model, field, expression in COUNTERS:
+            label = f"{model._meta.label}.{field}"
+            # Расхождения ищем и чиним одним UPDATE на счётчик, без загрузки строк в Python
+            drifted = model.objects.annotate(actual=expression()).exclude(**{field: F('actual')})
+            if dry_run:
+                self.stdout.write(f"{label}: {drifted.count()} rows drifted")
+                continue
+            with transaction.atomic():
+                fixed = model.objects.filter(pk__in=drifted.values('pk')).update(**{field: expression()})
+            style = self.style.WARNING if fixed else self.style.SUCCESS
+            self.stdout.write(style(f"{label}: repaired {fixed} rows"))
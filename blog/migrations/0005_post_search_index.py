@@ -0,0 +1,60 @@
+from django.db import migrations
+
+SQLITE_TABLE = 'blog_post_fts'
+POSTGRES_TABLE = 'blog_post_search'
+POSTGRES_CONFIG = 'simple'
+
+# То же, что blog.search.normalize(), но на стороне SQL
+NORMALIZE_SQL = "replace(replace(replace(replace(replace({}, 'ё', 'е'), 'Ё', 'Е'), '’', ''''), 'ʼ', ''''), '`', '''')"
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5("
+                    f"title, content, "
+                    f"tokenize=\"unicode61 remove_diacritics 2 tokenchars ''''\", prefix='2 3')"
+                )
+            except Exception:
+                # SQLite собран без FTS5 — поиск откатится на icontains
+                return
+            cursor.execute(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, content) "
+                f"SELECT id, {NORMALIZE_SQL.format('title')}, {NORMALIZE_SQL.format('content')} FROM blog_post"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE {POSTGRES_TABLE} ("
+                f"post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX {POSTGRES_TABLE}_document_gin ON {POSTGRES_TABLE} USING GIN (document)")
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (post_id, document) "
+                f"SELECT id, setweight(to_tsvector(%s, {NORMALIZE_SQL.format('title')}), 'A') || "
+                f"setweight(to_tsvector(%s, {NORMALIZE_SQL.format('content')}), 'B') "
+                f"FROM blog_post",
+                [POSTGRES_CONFIG, POSTGRES_CONFIG],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    table = {'sqlite': SQLITE_TABLE, 'postgresql': POSTGRES_TABLE}.get(connection.vendor)
+    if table:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_alter_post_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:31
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    User = apps.get_model('accounts', 'User')
+
+    Post.objects.update(comment_count=Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk'), is_active=True)
+        .order_by().values('post').annotate(n=Count('pk')).values('n'),
+        output_field=IntegerField(),
+    ), 0))
+    User.objects.update(post_count=Coalesce(Subquery(
+        Post.objects.filter(author=OuterRef('pk'))
+        .order_by().values('author').annotate(n=Count('pk')).values('n'),
+        output_field=IntegerField(),
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_comment_post_active_created_idx'),
+        ('accounts', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feed_fan_out(apps, schema_editor):
+    # Как читала лента до флага: посты авторов с числом подписчиков выше порога подмешивались при чтении
+    limit = getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', 1000)
+    Model = apps.get_model('blog', 'post')
+    Model.objects.filter(author__followers_count__gt=limit).update(feed_fan_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_counters'),
+        ('blog', '0008_post_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='feed_fan_out',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Рассылается в ленты'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('feed_fan_out', False)), fields=['author', 'created_at'], name='blog_post_feed_pull_idx'),
+        ),
+        migrations.RunPython(fill_feed_fan_out, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,10 @@
 from typing import Any
-import io
-import os
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
-from django.core.files.base import ContentFile
-from PIL import Image as PILImage
+from accounts.counters import protect_fields
+from imaging.pipeline import build_thumbnail
+from imaging.queue import enqueue_thumbnail
 
 User = get_user_model()
 
@@ -42,10 +41,17 @@ class Post(models.Model):
     title = models.CharField(max_length=200 , verbose_name="Заголовок")
     content = models.TextField(verbose_name="Зміст")
     created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Дата створення")
+    # Версия страницы поста для ETag; комментарии тоже её обновляют (см. blog.signals)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name="Категорія")
     author = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Автор")
     image = models.URLField(default="https://images.unsplash.com/photo-1432888622747-4eb9a8efeb07?w=800&h=400&fit=crop&crop=center", verbose_name="URL зображення")
     tags = models.ManyToManyField('Tag', related_name='posts', blank=True, verbose_name='Теги')  # type: ignore[type-arg]
+    # Число активных комментариев; поддерживается сигналами (см. blog.signals)
+    comment_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Комментариев")
+    # Копируется ли пост в ленты подписчиков (иначе подмешивается при чтении); решается
+    # один раз при публикации по числу подписчиков автора (см. feed.signals)
+    feed_fan_out = models.BooleanField(default=True, editable=False, verbose_name="Рассылается в ленты")
 
     def __str__(self):
         return self.title
@@ -53,6 +59,12 @@ class Post(models.Model):
     class Meta:
         verbose_name = "Пост"
         verbose_name_plural = "Пости"
+        indexes = [
+            # Посты популярных авторов, которые лента подмешивает при чтении (feed.timeline)
+            models.Index(
+                fields=['author', 'created_at'], condition=models.Q(feed_fan_out=False), name='blog_post_feed_pull_idx',
+            ),
+        ]
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         """Auto-generate unicode-friendly slug for the post title if missing.
@@ -69,6 +81,8 @@ class Post(models.Model):
                 slug_candidate = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug_candidate
+        # Счётчик комментариев меняют только сигналы (F-выражением) — старое значение не записываем
+        protect_fields(self, kwargs, ['comment_count'])
         super().save(*args, **kwargs)
 
 class Tag(models.Model):
@@ -95,6 +109,10 @@ class Comment(models.Model):
         verbose_name = "Коментар"
         verbose_name_plural = "Коментарі"
         ordering = ['-created_at']
+        indexes = [
+            # Страница комментариев поста — диапазонное сканирование по индексу
+            models.Index(fields=['post', 'is_active', 'created_at']),
+        ]
     
 
 class PostImage(models.Model):
@@ -129,37 +147,28 @@ class PostImage(models.Model):
         """Создает миниатюру для изображения поста и сохраняет в поле thumbnail."""
         if not self.image:
             return
-
-        # Открываем оригинальное изображение
-        img = PILImage.open(self.image)
-
-        # Приводим к RGB, если необходимо
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGB")
-
-        # Создаем миниатюру с сохранением пропорций
-        img.thumbnail(size, PILImage.Resampling.LANCZOS)
-
-        # Сохраняем миниатюру в память
-        thumb_io = io.BytesIO()
-        img.save(thumb_io, format="JPEG", quality=90)
-        thumb_io.seek(0)
-
-        # Имя файла миниатюры
-        base_name = os.path.basename(self.image.name)
-        thumb_name = f"thumb_{base_name}"
-        thumb_name = thumb_name.replace('.png', '.jpg').replace('.webp', '.jpg')
-
-        # Записываем в поле thumbnail (без сохранения модели)
-        self.thumbnail.save(thumb_name, ContentFile(thumb_io.read()), save=False)
+        thumb = build_thumbnail(self.image, size)
+        self.thumbnail.save(thumb.name, thumb, save=False)
 
     def save(self, *args: Any, **kwargs: Any) -> None:
-        """Переопределяем save для автоматического создания миниатюры один раз."""
+        """Переопределяем save: миниатюра создаётся фоновым воркером (imaging.queue)."""
         is_new = self.pk is None
         # Сначала сохраняем, чтобы у файла был путь
         super().save(*args, **kwargs)
 
-        # Создаем миниатюру, если есть оригинал и нет миниатюры или файл обновили
+        # Ставим миниатюру в очередь, если есть оригинал и нет миниатюры или файл обновили
         if self.image and (is_new or not self.thumbnail):
-            self.create_thumbnail()
-            super().save(update_fields=["thumbnail"]) 
+            enqueue_thumbnail(self)
+
+
+class CacheVersion(models.Model):
+    """Current version of a fragment-cache scope (see blog.caching); bumped on every change in it."""
+    scope = models.CharField(max_length=100, primary_key=True, verbose_name="Область")
+    version = models.BigIntegerField(verbose_name="Версия")
+
+    class Meta:
+        verbose_name = "Версия кеша"
+        verbose_name_plural = "Версии кеша"
+
+    def __str__(self) -> str:
+        return f"{self.scope}: {self.version}"
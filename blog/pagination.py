@@ -0,0 +1,138 @@
+"""Keyset (cursor) pagination for listings ordered by ``(created_at, id)``.
+
+``django.core.paginator.Paginator`` runs ``COUNT(*)`` and ``OFFSET n`` on every
+page, which gets slower the deeper the reader goes into the archive.  Here pages
+are addressed by the ``(created_at, id)`` of the boundary row instead, so every
+page is a bounded index range scan regardless of its depth.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
+
+CURSOR_PARAM = 'cursor'
+COUNT_CACHE_TIMEOUT = 300
+
+# Направление курсора: к более старым постам или к более новым
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction: str, created_at: datetime, pk: int) -> str:
+    """Pack a boundary row into an opaque url-safe token."""
+    raw = f"{direction}|{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Optional[tuple[str, datetime, int]]:
+    """Unpack a token produced by :func:`encode_cursor`.
+
+    Broken or tampered tokens yield ``None`` (the first page), mirroring how
+    ``Paginator.get_page`` forgives invalid page numbers.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        if direction not in (FORWARD, BACKWARD):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+@dataclass
+class CursorPage:
+    """A page of rows plus the tokens pointing to its neighbours."""
+    object_list: list[Any]
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: str = ''
+    previous_cursor: str = ''
+    total_count: Optional[int] = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __bool__(self) -> bool:
+        return bool(self.object_list)
+
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+def approximate_count(cache_key: str, queryset: QuerySet[Any], timeout: int = COUNT_CACHE_TIMEOUT) -> int:
+    """Return a cached ``COUNT(*)`` so listings don't count on every request.
+
+    The value may lag behind by up to ``timeout`` seconds, which is fine for a
+    "≈ N posts" hint.
+    """
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, timeout)
+    return count
+
+
+def paginate_by_cursor(
+    queryset: QuerySet[Any],
+    token: Optional[str],
+    per_page: int,
+    *,
+    count_key: Optional[str] = None,
+) -> CursorPage:
+    """Slice ``queryset`` newest-first on ``(created_at, id)``.
+
+    ``queryset`` must not be ordered yet; the ordering is part of the cursor
+    contract.  When ``count_key`` is given the page also carries an
+    approximate, cached total.
+    """
+    cursor = decode_cursor(token)
+    page: Optional[CursorPage] = None
+    if cursor is not None:
+        direction, created_at, pk = cursor
+        if direction == FORWARD:
+            older = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            rows = list(queryset.filter(older).order_by('-created_at', '-id')[:per_page + 1])
+            page = CursorPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=True)
+        else:
+            newer = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+            rows = list(queryset.filter(newer).order_by('created_at', 'id')[:per_page + 1])
+            if len(rows) > per_page:
+                page = CursorPage(rows[:per_page][::-1], has_next=True, has_previous=True)
+            # иначе дошли до самых новых постов — отдаём полную первую страницу
+    if page is None:
+        rows = list(queryset.order_by('-created_at', '-id')[:per_page + 1])
+        page = CursorPage(rows[:per_page], has_next=len(rows) > per_page)
+
+    if page.object_list:
+        first, last = page.object_list[0], page.object_list[-1]
+        if page.has_previous:
+            page.previous_cursor = encode_cursor(BACKWARD, first.created_at, first.pk)
+        if page.has_next:
+            page.next_cursor = encode_cursor(FORWARD, last.created_at, last.pk)
+
+    if count_key is not None:
+        page.total_count = approximate_count(count_key, queryset)
+    return page
+
+
+def get_cursor_page(
+    request: Any,
+    queryset: QuerySet[Any],
+    per_page: int,
+    *,
+    count_key: Optional[str] = None,
+) -> CursorPage:
+    """Shortcut reading the token from ``request.GET``."""
+    return paginate_by_cursor(queryset, request.GET.get(CURSOR_PARAM), per_page, count_key=count_key)
@@ -0,0 +1,333 @@
+"""Full-text search over posts.
+
+The index lives in an auxiliary table maintained by :mod:`blog.signals` and the
+``rebuild_search_index`` command:
+
+* SQLite — an FTS5 virtual table ``blog_post_fts`` ranked with BM25;
+* PostgreSQL — ``blog_post_search`` with a GIN-indexed ``tsvector``;
+* anything else — a plain ``icontains`` scan, so search keeps working.
+
+Text is normalised the same way on both sides (``ё`` → ``е``, typographic
+apostrophes → ``'``) and query terms are lightly stemmed and matched by prefix,
+which copes with Ukrainian/Russian inflections without a language dictionary.
+The FTS5 index stores the normalised text, so its snippets are mapped back
+onto the post's own content before they are shown.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import SafeString, mark_safe
+
+from .models import Post
+from .pagination import CursorPage
+
+SQLITE_TABLE = 'blog_post_fts'
+POSTGRES_TABLE = 'blog_post_search'
+POSTGRES_CONFIG = 'simple'
+
+# Маркеры подсветки: не встречаются в обычном тексте, поэтому сниппет можно экранировать целиком
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SNIPPET_WORDS = 24
+# Дальше по релевантности никто не листает; заодно номер страницы не переполнит OFFSET в SQL
+MAX_PAGE = 1000
+REBUILD_BATCH_SIZE = 500
+
+# Замены символ-в-символ: нормализованный текст той же длины, смещения в нём совпадают с оригиналом
+_APOSTROPHES = str.maketrans({'’': "'", 'ʼ': "'", '`': "'", 'ё': 'е', 'Ё': 'Е'})
+_TERM_RE = re.compile(r"\w+(?:'\w+)*")
+# Окончания, которые срезаем у длинных слов запроса (остальное добирает префиксный поиск)
+_ENDINGS = set('аеиіїоуюяєьйы')
+
+
+def normalize(text: str) -> str:
+    """Fold spelling variants that readers use interchangeably."""
+    return text.translate(_APOSTROPHES)
+
+
+def _stem(term: str) -> str:
+    stripped = 0
+    while len(term) > 4 and stripped < 2 and term[-1] in _ENDINGS:
+        term = term[:-1]
+        stripped += 1
+    return term
+
+
+def query_terms(query: str) -> list[str]:
+    """Split a user query into normalised, lightly stemmed lower-case terms."""
+    return [_stem(t) for t in _TERM_RE.findall(normalize(query).lower())]
+
+
+def restore_spelling(snippet: str, original: str) -> str:
+    """Replace the text of a snippet of ``normalize(original)`` with the same span of ``original``.
+
+    The snippet is a span of the normalised text with match markers and,
+    where it was cut, an ellipsis at either end.  If the span cannot be
+    found the snippet is returned unchanged.
+    """
+    text = snippet.replace(MARK_START, '').replace(MARK_END, '')
+    normalized = normalize(original)
+    for head in (0, 1):
+        for tail in (0, 1):
+            core = text[head:len(text) - tail]
+            if (head and not text.startswith('…')) or (tail and not text.endswith('…')) or not core:
+                continue
+            start = normalized.find(core)
+            if start < 0:
+                continue
+            chars: list[str] = []
+            position = -head
+            for char in snippet:
+                if char in (MARK_START, MARK_END):
+                    chars.append(char)
+                    continue
+                inside = 0 <= position < len(core)
+                chars.append(original[start + position] if inside else char)
+                position += 1
+            return ''.join(chars)
+    return snippet
+
+
+def highlight(snippet: str) -> SafeString:
+    """Escape a snippet and turn the match markers into ``<mark>`` tags."""
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+@dataclass
+class SearchHit:
+    post_id: int
+    rank: float
+    snippet: SafeString
+
+
+class BaseSearchBackend:
+    """Interface shared by all search backends."""
+
+    def index_post(self, post_id: int, title: str, content: str) -> None:
+        self.index_many([(post_id, title, content)])
+
+    def index_many(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        raise NotImplementedError
+
+    def remove_post(self, post_id: int) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[SearchHit]:
+        raise NotImplementedError
+
+    def rebuild(self, rows: Iterable[tuple[int, str, str]], batch_size: int = REBUILD_BATCH_SIZE) -> int:
+        """Replace the whole index with ``rows``; return the number indexed."""
+        self.clear()
+        total = 0
+        for batch in _batched(rows, batch_size):
+            self.index_many(batch)
+            total += len(batch)
+        return total
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    def index_many(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        rows = [(pk, normalize(title), normalize(content)) for pk, title, content in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(r[0],) for r in rows])
+            cursor.executemany(f'INSERT INTO {SQLITE_TABLE} (rowid, title, content) VALUES (%s, %s, %s)', rows)
+
+    def remove_post(self, post_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [post_id])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+
+    def rebuild(self, rows: Iterable[tuple[int, str, str]], batch_size: int = REBUILD_BATCH_SIZE) -> int:
+        total = super().rebuild(rows, batch_size)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}) VALUES ('optimize')")
+        return total
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[SearchHit]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Каждое слово — префиксный запрос в кавычках, так пользовательский ввод не трактуется как синтаксис FTS5
+        match = ' '.join('"{}"*'.format(t.replace('"', '')) for t in terms)
+        # Сниппет строится по нормализованной копии в индексе — оригинал берём из blog_post
+        sql = (
+            f'SELECT {SQLITE_TABLE}.rowid, bm25({SQLITE_TABLE}, 10.0, 1.0) AS score, '
+            f"snippet({SQLITE_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}), p.content "
+            f'FROM {SQLITE_TABLE} JOIN blog_post p ON p.id = {SQLITE_TABLE}.rowid WHERE {SQLITE_TABLE} MATCH %s '
+            f'ORDER BY score LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [MARK_START, MARK_END, match, limit, offset])
+            rows = cursor.fetchall()
+        # bm25() возвращает отрицательные значения: чем меньше, тем релевантнее
+        return [
+            SearchHit(pk, -score, highlight(restore_spelling(snippet, content)))
+            for pk, score, snippet, content in rows
+        ]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    def index_many(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        sql = (
+            f'INSERT INTO {POSTGRES_TABLE} (post_id, document) VALUES '
+            f"(%s, setweight(to_tsvector(%s, %s), 'A') || setweight(to_tsvector(%s, %s), 'B')) "
+            f'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document'
+        )
+        params = [
+            (pk, POSTGRES_CONFIG, normalize(title), POSTGRES_CONFIG, normalize(content))
+            for pk, title, content in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def remove_post(self, post_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE post_id = %s', [post_id])
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[SearchHit]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        tsquery = ' & '.join(f"'{t}':*" for t in (t.replace("'", "''") for t in terms))
+        headline_opts = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=8'
+        sql = (
+            f'SELECT s.post_id, ts_rank_cd(s.document, q, 32) AS score, '
+            f'ts_headline(%s, p.content, q, %s) '
+            f'FROM {POSTGRES_TABLE} s JOIN blog_post p ON p.id = s.post_id, to_tsquery(%s, %s) q '
+            f'WHERE s.document @@ q ORDER BY score DESC, s.post_id DESC LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [POSTGRES_CONFIG, headline_opts, POSTGRES_CONFIG, tsquery, limit, offset])
+            rows = cursor.fetchall()
+        return [SearchHit(pk, score, highlight(snippet)) for pk, score, snippet in rows]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed ``icontains`` fallback for databases without full-text support."""
+
+    def index_many(self, rows: Iterable[tuple[int, str, str]]) -> None:
+        pass
+
+    def remove_post(self, post_id: int) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def search(self, query: str, limit: int, offset: int = 0) -> list[SearchHit]:
+        query = query.strip()
+        if not query:
+            return []
+        rows = (
+            Post.objects.filter(Q(title__icontains=query) | Q(content__icontains=query))
+            .order_by('-created_at', '-id')
+            .values_list('id', 'content')[offset:offset + limit]
+        )
+        return [SearchHit(pk, 0.0, highlight(_plain_snippet(content, query))) for pk, content in rows]
+
+
+def _plain_snippet(content: str, query: str, radius: int = 80) -> str:
+    pos = content.lower().find(query.lower())
+    if pos < 0:
+        return content[:radius * 2]
+    start, end = max(0, pos - radius), pos + len(query)
+    return (
+        ('…' if start else '') + content[start:pos]
+        + MARK_START + content[pos:end] + MARK_END
+        + content[end:end + radius] + ('…' if end + radius < len(content) else '')
+    )
+
+
+def _batched(rows: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    batch: list[Any] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _table_exists(name: str) -> bool:
+    try:
+        return name in connection.introspection.table_names(include_views=True)
+    except OperationalError:
+        return False
+
+
+@lru_cache(maxsize=None)
+def _default_backend(vendor: str) -> BaseSearchBackend:
+    if vendor == 'sqlite' and _table_exists(SQLITE_TABLE):
+        return SQLiteFTSBackend()
+    if vendor == 'postgresql' and _table_exists(POSTGRES_TABLE):
+        return PostgresSearchBackend()
+    return SimpleSearchBackend()
+
+
+def get_backend() -> BaseSearchBackend:
+    """Return the backend for the current database.
+
+    ``BLOG_SEARCH_BACKEND`` may name a backend class explicitly.
+    """
+    path: Optional[str] = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return _default_backend(connection.vendor)
+
+
+def search_page(query: str, page_number: Optional[str], per_page: int) -> CursorPage:
+    """Return one page of ranked posts for ``query``.
+
+    Results are ordered by relevance, so pages are addressed by number; the
+    backend is asked for one extra hit instead of counting all matches.  Each
+    post gets ``search_snippet`` and ``search_rank`` attributes.  Page numbers
+    that are not numbers mean the first page; those past ``MAX_PAGE`` the last.
+    """
+    try:
+        page = min(max(1, int(page_number or 1)), MAX_PAGE)
+    except (ValueError, OverflowError):
+        page = 1
+    hits = get_backend().search(query, per_page + 1, (page - 1) * per_page)
+    has_next = len(hits) > per_page
+    hits = hits[:per_page]
+    posts = (
+        Post.objects.select_related('author', 'category')
+        .prefetch_related('tags', 'images')
+        .in_bulk([h.post_id for h in hits])
+    )
+    object_list = []
+    for hit in hits:
+        post = posts.get(hit.post_id)
+        if post is None:
+            continue
+        post.search_snippet = hit.snippet
+        post.search_rank = hit.rank
+        object_list.append(post)
+    return CursorPage(
+        object_list,
+        has_next=has_next,
+        has_previous=page > 1,
+        next_cursor=str(page + 1) if has_next else '',
+        previous_cursor=str(page - 1) if page > 1 else '',
+    )
@@ -0,0 +1,121 @@
+"""Query-minimal building blocks for blog pages."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+
+from .caching import SCOPE_INDEX, versioned_key
+from .models import Comment, Post, Tag
+from .pagination import FORWARD, CursorPage, decode_cursor, encode_cursor
+
+NEIGHBOURS_TIMEOUT = 3600
+COMMENTS_PER_PAGE = 20
+
+# Сколько запросов к БД делает страница поста при холодном кеше:
+# пост (+автор, категория), изображения, теги, первая страница комментариев,
+# соседние посты. Сессия, пользователь, контекст-процессоры, версия поста и версии
+# областей кеша для ETag (blog.conditional) и кешируемый сайдбар категорий сюда не входят;
+# проверяется в blog/tests.py.
+POST_DETAIL_QUERY_BUDGET = 5
+
+
+@dataclass(frozen=True)
+class PostLink:
+    """Just enough of a post to link to it."""
+    id: int
+    slug: str
+    title: str
+    created_at: datetime
+
+
+@dataclass
+class PostDetail:
+    post: Post
+    tags: list[Tag]
+    comments: CursorPage
+    comment_count: int
+    previous_post: Optional[PostLink]
+    next_post: Optional[PostLink]
+
+
+def get_post(**lookup: Any) -> Post:
+    """Fetch a post with everything its page renders, or raise ``Http404``."""
+    return get_object_or_404(
+        Post.objects.select_related('author', 'category').prefetch_related('tags', 'images'), **lookup
+    )
+
+
+def _fetch_neighbours(post: Post) -> tuple[Optional[PostLink], Optional[PostLink]]:
+    """Load the previous and next post with a single ``UNION ALL`` query.
+
+    Each half is a one-row range scan on ``(created_at, id)``.  The ordered,
+    limited halves are wrapped in derived tables because SQLite rejects
+    ``ORDER BY``/``LIMIT`` directly inside compound statements.
+    """
+    fields = ('id', 'slug', 'title', 'created_at')
+    older = Q(created_at__lt=post.created_at) | Q(created_at=post.created_at, id__lt=post.pk)
+    newer = Q(created_at__gt=post.created_at) | Q(created_at=post.created_at, id__gt=post.pk)
+    prev_sql, prev_params = (
+        Post.objects.filter(older).order_by('-created_at', '-id').values_list(*fields)[:1].query.sql_with_params()
+    )
+    next_sql, next_params = (
+        Post.objects.filter(newer).order_by('created_at', 'id').values_list(*fields)[:1].query.sql_with_params()
+    )
+    sql = f'SELECT 0 AS is_next, p.* FROM ({prev_sql}) p UNION ALL SELECT 1 AS is_next, n.* FROM ({next_sql}) n'
+    previous_post = next_post = None
+    # raw() сам приводит значения колонок к типам полей модели (например, created_at к datetime)
+    for row in Post.objects.raw(sql, (*prev_params, *next_params)):
+        link = PostLink(row.pk, row.slug, row.title, row.created_at)
+        if row.is_next:
+            next_post = link
+        else:
+            previous_post = link
+    return previous_post, next_post
+
+
+def get_neighbours(post: Post) -> tuple[Optional[PostLink], Optional[PostLink]]:
+    """Previous/next post links, cached until any post listing changes."""
+    key = versioned_key('neighbours', [SCOPE_INDEX], post.pk)
+    neighbours = cache.get(key)
+    if neighbours is None:
+        neighbours = _fetch_neighbours(post)
+        cache.set(key, neighbours, NEIGHBOURS_TIMEOUT)
+    return neighbours
+
+
+def get_comment_page(post: Post, token: Optional[str] = None, per_page: int = COMMENTS_PER_PAGE) -> CursorPage:
+    """Return active comments oldest-first, ``per_page`` at a time.
+
+    Pages continue after the ``(created_at, id)`` of the last comment shown,
+    which the ``(post, is_active, created_at)`` index serves as a range scan.
+    """
+    comments = Comment.objects.filter(post=post, is_active=True).select_related('author')
+    cursor = decode_cursor(token)
+    if cursor is not None and cursor[0] == FORWARD:
+        _, created_at, pk = cursor
+        comments = comments.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    rows = list(comments.order_by('created_at', 'id')[:per_page + 1])
+    page = CursorPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=cursor is not None)
+    if page.has_next:
+        last = page.object_list[-1]
+        page.next_cursor = encode_cursor(FORWARD, last.created_at, last.pk)
+    return page
+
+
+def build_post_detail(post: Post) -> PostDetail:
+    """Collect everything ``blog/post.html`` needs for an already fetched post."""
+    previous_post, next_post = get_neighbours(post)
+    return PostDetail(
+        post=post,
+        # Теги уже подгружены prefetch_related в get_post() — повторного запроса нет
+        tags=list(post.tags.all()),
+        comments=get_comment_page(post),
+        comment_count=post.comment_count,
+        previous_post=previous_post,
+        next_post=next_post,
+    )
@@ -0,0 +1,180 @@
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.counters import adjust_counter
+from accounts.models import User
+
+from .caching import SCOPE_ALL, SCOPE_INDEX, bump, category_scope, finish_request, start_request, tag_scope
+from .models import Category, Comment, Post, PostImage, Tag
+from .search import get_backend
+
+
+@receiver(request_started)
+def remember_cache_versions(sender, **kwargs):
+    # Версии областей читаются из БД один раз за запрос
+    start_request()
+
+
+@receiver(request_finished)
+def forget_cache_versions(sender, **kwargs):
+    finish_request()
+
+
+def _bump_post(category_ids, tag_ids) -> None:
+    """Сбрасываем главную, категории и теги, в листингах которых виден пост"""
+    bump(
+        SCOPE_INDEX,
+        *(category_scope(c) for c in category_ids if c is not None),
+        *(tag_scope(t) for t in tag_ids),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_category(sender, instance: Post, **kwargs):
+    """Запоминаем прежние категорию и автора: при переносе поста сбрасываем оба листинга и счётчика"""
+    old = None
+    if instance.pk is not None:
+        old = Post.objects.filter(pk=instance.pk).values('category_id', 'author_id').first()
+    instance._old_category_id = old['category_id'] if old else None
+    instance._old_author_id = old['author_id'] if old else None
+
+
+@receiver(post_save, sender=Post)
+def invalidate_on_post_save(sender, instance: Post, created: bool, **kwargs):
+    # У только что созданного поста ещё нет тегов
+    tag_ids = [] if created else list(instance.tags.values_list('pk', flat=True))
+    old_category_id = getattr(instance, '_old_category_id', None)
+    _bump_post({instance.category_id, old_category_id}, tag_ids)
+
+
+@receiver(post_save, sender=Post)
+def update_post_count_on_save(sender, instance: Post, created: bool, **kwargs):
+    old_author_id = getattr(instance, '_old_author_id', None)
+    if created:
+        adjust_counter(User, instance.author_id, 'post_count', 1)
+    elif old_author_id is not None and old_author_id != instance.author_id:
+        adjust_counter(User, old_author_id, 'post_count', -1)
+        adjust_counter(User, instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def update_post_count_on_delete(sender, instance: Post, **kwargs):
+    adjust_counter(User, instance.author_id, 'post_count', -1)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_state(sender, instance: Comment, **kwargs):
+    # Модерация (is_active) и перенос комментария меняют счётчики постов
+    old = None
+    if instance.pk is not None:
+        old = Comment.objects.filter(pk=instance.pk).values('post_id', 'is_active').first()
+    instance._old_counted_post_id = old['post_id'] if old and old['is_active'] else None
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance: Comment, **kwargs):
+    old_post_id = getattr(instance, '_old_counted_post_id', None)
+    new_post_id = instance.post_id if instance.is_active else None
+    if old_post_id != new_post_id:
+        adjust_counter(Post, old_post_id, 'comment_count', -1)
+        adjust_counter(Post, new_post_id, 'comment_count', 1)
+    _touch_posts(old_post_id, instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def update_comment_count_on_delete(sender, instance: Comment, **kwargs):
+    if instance.is_active:
+        adjust_counter(Post, instance.post_id, 'comment_count', -1)
+    _touch_posts(instance.post_id)
+
+
+def _touch_posts(*post_ids) -> None:
+    """Новая версия страницы поста (ETag) при изменении его комментариев"""
+    ids = {pk for pk in post_ids if pk is not None}
+    if ids:
+        Post.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance: Post, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    get_backend().index_post(instance.pk, instance.title, instance.content)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance: Post, **kwargs):
+    get_backend().remove_post(instance.pk)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_tags(sender, instance: Post, **kwargs):
+    # Связи с тегами удаляются раньше самого поста, поэтому запоминаем их заранее
+    instance._deleted_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_on_post_delete(sender, instance: Post, **kwargs):
+    _bump_post({instance.category_id}, getattr(instance, '_deleted_tag_ids', []))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_on_post_tags_change(sender, instance, action: str, reverse: bool, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # При clear() pk_set не передаётся — собираем затронутые связи сами
+        if reverse:
+            instance._cleared_ids = list(instance.posts.values_list('pk', flat=True))
+        else:
+            instance._cleared_ids = list(instance.tags.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    ids = getattr(instance, '_cleared_ids', []) if action == 'post_clear' else list(pk_set or [])
+    if reverse:
+        # tag.posts.add(...): instance — тег, ids — посты
+        categories = Post.objects.filter(pk__in=ids).values_list('category_id', flat=True).distinct()
+        _bump_post(set(categories), [instance.pk])
+    else:
+        _bump_post({instance.category_id}, ids)
+
+
+@receiver(post_save, sender=PostImage)
+@receiver(post_delete, sender=PostImage)
+def invalidate_on_post_image_change(sender, instance: PostImage, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).values('category_id').first()
+    if post is None:
+        # Пост удаляется каскадом — его собственный сигнал всё сбросит
+        return
+    tag_ids = Post.tags.through.objects.filter(post_id=instance.post_id).values_list('tag_id', flat=True)
+    _bump_post({post['category_id']}, list(tag_ids))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_on_tag_change(sender, instance: Tag, **kwargs):
+    # Имена тегов выводятся в карточках на всех листингах
+    bump(SCOPE_ALL)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_on_category_change(sender, instance: Category, **kwargs):
+    # Список категорий в сайдбаре кешируется под той же версией
+    bump(SCOPE_ALL)
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance: User, update_fields=None, **kwargs):
+    instance._old_username = None
+    if instance.pk is not None and (update_fields is None or 'username' in update_fields):
+        instance._old_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_username_change(sender, instance: User, created: bool, **kwargs):
+    # Имя автора выводится в карточках постов на всех листингах
+    old_username = getattr(instance, '_old_username', None)
+    if old_username is not None and old_username != instance.username:
+        bump(SCOPE_ALL)
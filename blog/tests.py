@@ -1 +1,448 @@
-"""Blog tests placeholder."""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from accounts.models import Follow
+from shop.models import Product
+
+from .caching import (
+    BASE_SCOPES, SCOPE_ALL, SCOPE_INDEX, bump, category_scope, finish_request, get_versions, start_request, versioned_key,
+)
+from .models import CacheVersion, Category, Comment, Post, PostImage, Tag
+from .pagination import BACKWARD, FORWARD, CursorPage, decode_cursor, encode_cursor, paginate_by_cursor
+from .search import MAX_PAGE, MARK_END, MARK_START, restore_spelling
+from .services import COMMENTS_PER_PAGE, POST_DETAIL_QUERY_BUDGET, get_comment_page, get_neighbours
+from .views import get_categories
+
+# Сверх бюджета страницы: версия поста и версии областей кеша для ETag (blog.conditional),
+# до рендеринга; дальше версии областей берутся из прочитанных запросом
+VERSION_LOOKUP_QUERIES = 2
+
+
+class PostDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        category = Category.objects.create(slug='news', name='Новости')
+        start = timezone.now() - timedelta(days=1)
+        cls.posts = []
+        for i in range(5):
+            post = Post.objects.create(slug=f'post-{i}', title=f'Пост {i}', content='Текст', category=category, author=author)
+            cls.posts.append(post)
+        # Два поста с одинаковым created_at: порядок между ними задаёт id
+        for i, post in enumerate(cls.posts):
+            post.created_at = start + timedelta(minutes=min(i, 3))
+        Post.objects.bulk_update(cls.posts, ['created_at'])
+        middle = cls.posts[2]
+        middle.tags.add(*Tag.objects.bulk_create([Tag(name='django'), Tag(name='sql')]))
+        PostImage.objects.bulk_create([PostImage(post=middle, image=f'blog/posts/{i}.jpg') for i in range(3)])
+        Comment.objects.bulk_create([Comment(post=middle, author=author, content=f'Комментарий {i}') for i in range(30)])
+
+    def setUp(self) -> None:
+        cache.clear()
+        # Категории в сайдбаре кешируются отдельно и в бюджет страницы не входят
+        get_categories()
+
+    def forget_neighbours(self, post: Post) -> None:
+        cache.delete(versioned_key('neighbours', [SCOPE_INDEX], post.pk))
+
+    def assert_page_queries(self, url: str, post: Post) -> None:
+        self.forget_neighbours(post)
+        with self.assertNumQueries(VERSION_LOOKUP_QUERIES + POST_DETAIL_QUERY_BUDGET):
+            cold = self.client.get(url)
+        self.assertEqual(cold.status_code, 200)
+        self.assertContains(cold, post.title)
+
+        # Соседи взяты из кеша — на один запрос меньше
+        with self.assertNumQueries(VERSION_LOOKUP_QUERIES + POST_DETAIL_QUERY_BUDGET - 1):
+            warm = self.client.get(url)
+        self.assertEqual(warm.content, cold.content)
+
+    def test_detail_by_pk(self) -> None:
+        post = self.posts[2]
+        self.assert_page_queries(reverse('blog:post-detail', kwargs={'pk': post.pk}), post)
+
+    def test_detail_by_slug(self) -> None:
+        post = self.posts[2]
+        self.assert_page_queries(reverse('blog:post-detail-slug', kwargs={'slug': post.slug}), post)
+
+    def test_neighbours_at_both_ends(self) -> None:
+        first, second, *_, before_last, last = self.posts
+        # Как внутри запроса: версии областей уже прочитаны
+        start_request()
+        self.addCleanup(finish_request)
+        get_versions(BASE_SCOPES)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.links(get_neighbours(first)), (None, second.pk))
+        self.assertEqual(self.links(get_neighbours(last)), (before_last.pk, None))
+        # created_at совпадает — сосед определяется по id
+        self.assertEqual(self.links(get_neighbours(before_last)), (self.posts[2].pk, last.pk))
+
+    def test_neighbour_links_carry_slug_and_title(self) -> None:
+        previous_post, next_post = get_neighbours(self.posts[2])
+        self.assertEqual((previous_post.slug, previous_post.title), ('post-1', 'Пост 1'))
+        self.assertEqual((next_post.slug, next_post.title), ('post-3', 'Пост 3'))
+        self.assertEqual(next_post.created_at, self.posts[3].created_at)
+
+    @staticmethod
+    def links(neighbours):
+        return tuple(link.id if link else None for link in neighbours)
+
+
+class ConditionalPostDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        category = Category.objects.create(slug='news', name='Новости')
+        cls.post = Post.objects.create(slug='post', title='Пост', content='Текст', category=category, author=author)
+        cls.product = Product.objects.create(name='Чайник', slug='kettle', price=1)
+        cls.url = reverse('blog:post-detail-slug', kwargs={'slug': cls.post.slug})
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_revalidates_by_etag_only(self) -> None:
+        first = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', first.headers)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        # Дата поста не менялась, но If-Modified-Since без ETag страницу не подтверждает
+        since = http_date(timezone.now().timestamp() + 60)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_cart_badge_changes_etag(self) -> None:
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('shop:cart-add', args=[self.product.pk]))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+
+class SearchPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        category = Category.objects.create(slug='news', name='Новости')
+        for i in range(7):
+            Post.objects.create(slug=f'post-{i}', title=f'Пост {i}', content='Ёжик шёл по лесу', category=category, author=author)
+        long_text = ' '.join(['слово'] * 40 + ['Сім’я ёжика'] + ['слово'] * 40)
+        Post.objects.create(slug='long', title='Длинный', content=long_text, category=category, author=author)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def search(self, page: str):
+        return self.client.get(reverse('blog:search'), {'q': 'ежик', 'page': page})
+
+    def test_bad_page_numbers_do_not_fail(self) -> None:
+        for page in ('abc', '-3', '1.5', '9' * 30, '9' * 5000):
+            with self.subTest(page=page[:10]):
+                response = self.search(page)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('9' * 30).context['page_obj'].previous_cursor, str(MAX_PAGE - 1))
+        self.assertEqual(len(self.search('abc').context['posts'].object_list), 5)
+
+    def test_snippet_keeps_original_spelling(self) -> None:
+        response = self.client.get(reverse('blog:search'), {'q': 'ежик шел'})
+        snippets = [str(post.search_snippet) for post in response.context['posts'].object_list]
+        self.assertIn('<mark>Ёжик</mark> <mark>шёл</mark> по лесу', snippets)
+
+        long_post = self.client.get(reverse('blog:search'), {'q': "сім'я"}).context['posts'].object_list[0]
+        self.assertIn('<mark>Сім’я</mark> ёжика', str(long_post.search_snippet))
+        self.assertTrue(str(long_post.search_snippet).startswith('…'))
+
+    def test_restore_spelling_maps_cut_snippet(self) -> None:
+        original = '…начало. Ёлка’s шёл…'
+        snippet = f'…Ел{MARK_START}ка\'s{MARK_END} шел…'
+        self.assertEqual(restore_spelling(snippet, original), f'…Ёл{MARK_START}ка’s{MARK_END} шёл…')
+        self.assertEqual(restore_spelling('не из текста', original), 'не из текста')
+
+
+class ListingCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        cls.category = Category.objects.create(slug='news', name='Новости')
+        cls.post = Post.objects.create(slug='post', title='Старый заголовок', content='Текст', category=cls.category, author=cls.author)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def index(self) -> str:
+        return self.client.get(reverse('blog:index')).content.decode()
+
+    def test_versions_live_in_the_database(self) -> None:
+        self.assertIn('Старый заголовок', self.index())
+        version = CacheVersion.objects.get(scope=SCOPE_INDEX).version
+        # Правка из другого процесса: сигналов здесь нет, кеш этого процесса никто не трогал
+        Post.objects.filter(pk=self.post.pk).update(title='Новый заголовок')
+        self.assertIn('Старый заголовок', self.index())
+        bump(SCOPE_INDEX)
+        self.assertEqual(CacheVersion.objects.get(scope=SCOPE_INDEX).version, version + 1)
+        self.assertIn('Новый заголовок', self.index())
+
+    def test_versions_are_read_once_per_request(self) -> None:
+        self.index()
+        start_request()
+        self.addCleanup(finish_request)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_versions([SCOPE_INDEX]), get_versions(BASE_SCOPES)[1:])
+            get_versions([SCOPE_ALL])
+        # Сброс внутри запроса виден ему же
+        bump(SCOPE_INDEX)
+        with self.assertNumQueries(1):
+            get_versions([SCOPE_INDEX])
+
+    def test_author_rename_refreshes_listings_and_sidebar(self) -> None:
+        self.assertIn('>author<', self.index())
+        self.author.username = 'writer'
+        self.author.save()
+        page = self.index()
+        self.assertIn('>writer<', page)
+        self.assertNotIn('>author<', page)
+
+        # Вход пишет только last_login — листинги не сбрасываются
+        version = CacheVersion.objects.get(scope=SCOPE_ALL).version
+        self.client.force_login(self.author)
+        self.assertEqual(CacheVersion.objects.get(scope=SCOPE_ALL).version, version)
+
+    def test_category_sidebar_follows_scope_version(self) -> None:
+        self.assertIn('Новости', str(get_categories()['categories']))
+        Category.objects.filter(pk=self.category.pk).update(name='События')
+        bump(SCOPE_ALL)
+        self.assertEqual([c.name for c in get_categories()['categories']], ['События'])
+
+
+class FragmentInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        cls.news = Category.objects.create(slug='news', name='Новости')
+        cls.other = Category.objects.create(slug='other', name='Другое')
+        cls.tag = Tag.objects.create(name='django')
+        cls.post = Post.objects.create(slug='post', title='Старый заголовок', content='Текст', category=cls.news, author=cls.author)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def get(self, url: str) -> str:
+        return self.client.get(url).content.decode()
+
+    def versions(self) -> dict[str, int]:
+        return dict(CacheVersion.objects.values_list('scope', 'version'))
+
+    def test_post_save_bumps_only_its_listings(self) -> None:
+        news_url = reverse('blog:category-posts', args=['news'])
+        self.assertIn('Старый заголовок', self.get(news_url))
+        self.get(reverse('blog:category-posts', args=['other']))
+        before = self.versions()
+
+        self.post.title = 'Новый заголовок'
+        self.post.save()
+        after = self.versions()
+        self.assertIn('Новый заголовок', self.get(news_url))
+        self.assertGreater(after[SCOPE_INDEX], before[SCOPE_INDEX])
+        self.assertGreater(after[category_scope(self.news.pk)], before[category_scope(self.news.pk)])
+        self.assertEqual(after[category_scope(self.other.pk)], before[category_scope(self.other.pk)])
+        self.assertEqual(after[SCOPE_ALL], before[SCOPE_ALL])
+
+    def test_moving_post_refreshes_old_and_new_category(self) -> None:
+        news_url = reverse('blog:category-posts', args=['news'])
+        other_url = reverse('blog:category-posts', args=['other'])
+        self.assertIn('Старый заголовок', self.get(news_url))
+        self.assertNotIn('Старый заголовок', self.get(other_url))
+
+        self.post.category = self.other
+        self.post.save()
+        self.assertNotIn('Старый заголовок', self.get(news_url))
+        self.assertIn('Старый заголовок', self.get(other_url))
+
+    def test_tagging_refreshes_tag_page(self) -> None:
+        tag_url = reverse('blog:tag-posts', args=['django'])
+        self.assertNotIn('Старый заголовок', self.get(tag_url))
+        self.post.tags.add(self.tag)
+        self.assertIn('Старый заголовок', self.get(tag_url))
+        self.tag.posts.clear()
+        self.assertNotIn('Старый заголовок', self.get(tag_url))
+
+    def test_deleted_post_leaves_tag_page(self) -> None:
+        self.post.tags.add(self.tag)
+        tag_url = reverse('blog:tag-posts', args=['django'])
+        self.assertIn('Старый заголовок', self.get(tag_url))
+        self.post.delete()
+        self.assertNotIn('Старый заголовок', self.get(tag_url))
+        self.assertNotIn('Старый заголовок', self.get(reverse('blog:index')))
+
+
+class CommentPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        category = Category.objects.create(slug='news', name='Новости')
+        cls.post = Post.objects.create(slug='post', title='Пост', content='Текст', category=category, author=author)
+        comments = Comment.objects.bulk_create([
+            Comment(post=cls.post, author=author, content=f'Комментарий {i}', is_active=i != 3) for i in range(COMMENTS_PER_PAGE + 5)
+        ])
+        # Все в одну минуту: порядок внутри неё задаёт id
+        created_at = timezone.now() - timedelta(hours=1)
+        for comment in comments:
+            comment.created_at = created_at
+        Comment.objects.bulk_update(comments, ['created_at'])
+        cls.active = [c.pk for c in comments if c.is_active]
+
+    def test_pages_continue_after_last_comment(self) -> None:
+        first = get_comment_page(self.post)
+        self.assertEqual([c.pk for c in first], self.active[:COMMENTS_PER_PAGE])
+        self.assertTrue(first.has_next)
+        second = get_comment_page(self.post, first.next_cursor)
+        self.assertEqual([c.pk for c in second], self.active[COMMENTS_PER_PAGE:])
+        self.assertFalse(second.has_next)
+
+    def test_load_more_endpoint(self) -> None:
+        url = reverse('blog:post-comments', args=[self.post.pk])
+        token = get_comment_page(self.post).next_cursor
+        data = self.client.get(url, {'cursor': token}, headers={'x-requested-with': 'XMLHttpRequest'}).json()
+        self.assertEqual((data['has_next'], data['next_cursor']), (False, ''))
+        self.assertEqual(data['html'].count('comment-item'), len(self.active) - COMMENTS_PER_PAGE)
+        self.assertIn(f'Комментарий {COMMENTS_PER_PAGE + 4}', data['html'])
+        self.assertNotIn('Комментарий 3<', data['html'])
+
+        # Без XHR — голый фрагмент; битый курсор — первая порция
+        html = self.client.get(url, {'cursor': 'garbage'}).content.decode()
+        self.assertEqual(html.count('comment-item'), COMMENTS_PER_PAGE)
+        self.assertEqual(self.client.get(reverse('blog:post-comments', args=[self.post.pk + 1])).status_code, 404)
+
+
+class CounterTests(TestCase):
+    def setUp(self) -> None:
+        User = get_user_model()
+        self.author = User.objects.create_user('author', 'a@example.com', 'pw12345!x')
+        self.reader = User.objects.create_user('reader', 'r@example.com', 'pw12345!x')
+        self.category = Category.objects.create(slug='news', name='Новости')
+        self.post = Post.objects.create(slug='post', title='Пост', content='Текст', category=self.category, author=self.author)
+
+    def comment(self, **kwargs) -> Comment:
+        return Comment.objects.create(post=self.post, author=self.reader, content='Комментарий', **kwargs)
+
+    def test_stale_full_save_keeps_counters(self) -> None:
+        stale_post = Post.objects.get(pk=self.post.pk)
+        stale_author = get_user_model().objects.get(pk=self.author.pk)
+        self.comment()
+        Post.objects.create(slug='second', title='Второй', content='Текст', category=self.category, author=self.author)
+
+        stale_post.title = 'Новый заголовок'
+        stale_post.save()
+        stale_author.first_name = 'Автор'
+        stale_author.save()
+
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.comment_count), ('Новый заголовок', 1))
+        self.assertEqual((self.author.first_name, self.author.post_count), ('Автор', 2))
+
+    def test_counter_is_written_when_named_in_update_fields(self) -> None:
+        self.post.comment_count = 7
+        self.post.save(update_fields=['comment_count'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 7)
+
+    def test_signals_keep_counters(self) -> None:
+        hidden = self.comment(is_active=False)
+        comment = self.comment()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        # Модерация и удаление двигают счётчик, неактивные не считаются
+        hidden.is_active = True
+        hidden.save()
+        comment.delete()
+        Follow.objects.create(follower=self.reader, following=self.author)
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual((self.author.post_count, self.author.followers_count, self.reader.following_count), (1, 1, 1))
+
+    def test_recount_repairs_drift(self) -> None:
+        self.comment()
+        Follow.objects.create(follower=self.reader, following=self.author)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=5)
+        get_user_model().objects.filter(pk=self.author.pk).update(post_count=0, followers_count=9)
+
+        out = StringIO()
+        call_command('recount', dry_run=True, stdout=out)
+        self.assertIn('blog.Post.comment_count: 1 rows drifted', out.getvalue())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 5)
+
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('accounts.User.post_count: repaired 1 rows', out.getvalue())
+        self.assertIn('accounts.User.following_count: repaired 0 rows', out.getvalue())
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.comment_count, self.author.post_count, self.author.followers_count), (1, 1, 1))
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        author = get_user_model().objects.create_user('author', 'a@example.com', 'pw12345!x')
+        category = Category.objects.create(slug='news', name='Новости')
+        posts = [
+            Post.objects.create(slug=f'post-{i}', title=f'Пост {i}', content='Текст', category=category, author=author)
+            for i in range(7)
+        ]
+        # Пары с одинаковым created_at: границу страницы задаёт id
+        start = timezone.now() - timedelta(days=1)
+        for i, post in enumerate(posts):
+            post.created_at = start + timedelta(minutes=i // 2)
+        Post.objects.bulk_update(posts, ['created_at'])
+        cls.newest_first = [p.pk for p in sorted(posts, key=lambda p: (p.created_at, p.pk), reverse=True)]
+
+    def page(self, token: str = '') -> CursorPage:
+        return paginate_by_cursor(Post.objects.all(), token, 3)
+
+    def test_cursor_round_trip(self) -> None:
+        created_at = timezone.now()
+        token = encode_cursor(BACKWARD, created_at, 42)
+        self.assertNotIn('=', token)
+        self.assertEqual(decode_cursor(token), (BACKWARD, created_at, 42))
+
+    def test_broken_cursor_means_first_page(self) -> None:
+        bad_direction = encode_cursor('x', timezone.now(), 1)
+        for token in (None, '', 'garbage', '%%%', bad_direction, encode_cursor(FORWARD, timezone.now(), 1)[:-3]):
+            self.assertIsNone(decode_cursor(token), token)
+        self.assertEqual([p.pk for p in self.page('garbage')], self.newest_first[:3])
+
+    def test_forward_and_backward_paging(self) -> None:
+        first = self.page()
+        self.assertEqual([p.pk for p in first], self.newest_first[:3])
+        self.assertEqual((first.has_previous, first.has_next), (False, True))
+
+        second = self.page(first.next_cursor)
+        self.assertEqual([p.pk for p in second], self.newest_first[3:6])
+        third = self.page(second.next_cursor)
+        self.assertEqual([p.pk for p in third], self.newest_first[6:])
+        self.assertFalse(third.has_next)
+
+        back = self.page(third.previous_cursor)
+        self.assertEqual([p.pk for p in back], self.newest_first[3:6])
+        self.assertEqual((back.has_previous, back.has_next), (True, True))
+        # Шаг назад к самым новым отдаёт полную первую страницу
+        self.assertEqual([p.pk for p in self.page(back.previous_cursor)], self.newest_first[:3])
+
+    def test_listing_follows_cursor(self) -> None:
+        cache.clear()
+        token = self.page().next_cursor
+        page = self.client.get(reverse('blog:index'), {'cursor': token}).content.decode()
+        titles = dict(Post.objects.values_list('pk', 'title'))
+        for pk in self.newest_first[3:6]:
+            self.assertIn(f'>{titles[pk]}</a>', page)
+        self.assertNotIn(f'>{titles[self.newest_first[0]]}</a>', page)
+
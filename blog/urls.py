@@ -12,7 +12,8 @@ urlpatterns = [
     path('favorite-works/', views.favorite_works, name="favorite-works"),
     path('skills/', views.skills, name="skills"),
     path('post/<int:pk>/', views.post_detail, name='post-detail'),
-    re_path(r'^post/(?P<slug>[\w\-\u0100-\uFFFF]+)/$', views.post_detail_by_slug, name='post-detail-slug'),
+    path('post/<int:pk>/comments/', views.post_comments, name='post-comments'),
+    re_path(r'^post/(?P<slug>[\w\-\u0100-\uFFFF]+)/$', views.post_detail, name='post-detail-slug'),
     re_path(r'^category/(?P<slug>[\w\-\u0100-\uFFFF]+)/$', views.category_posts, name='category-posts'),
     re_path(r'^tag/(?P<tag_name>[\w\-\u0100-\uFFFF\s]+)/$', views.tag_posts, name='tag-posts'),
     path('search/', views.search_posts, name='search'),
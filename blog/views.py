@@ -1,10 +1,9 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpRequest, HttpResponse
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.core.cache import cache
  
-from typing import Any, Dict, List, DefaultDict
+from typing import Any, Dict, List, DefaultDict, Optional
 from collections import defaultdict
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import CreateView
@@ -13,24 +12,37 @@ from django.core.files.uploadedfile import UploadedFile
 from django.forms import BaseModelForm
 
 from blog.forms import PostForm, CommentForm
-from .models import Category, Post, Comment, Tag
+from .models import Category, Post, Tag
+from .pagination import get_cursor_page
+from .search import search_page
+from .services import build_post_detail, get_comment_page, get_post
+from .caching import (
+    CATEGORIES_CACHE_TIMEOUT, SCOPE_INDEX, cached_listing, category_scope, get_versions, tag_scope, versioned_key,
+)
+from .conditional import conditional_page
 
 
 def index(request: HttpRequest) -> HttpResponse:
-    posts = (
-        Post.objects.all()
-        .select_related('author', 'category')
-        .prefetch_related('images', 'tags')
-        .order_by('-created_at')
-    )
-    paginator = Paginator(posts, 3)  # Show 3 posts per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    title = "Blog Home"
+
+    def build_listing() -> Dict[str, Any]:
+        posts = (
+            Post.objects.all()
+            .select_related('author', 'category')
+            .prefetch_related('images', 'tags')
+        )
+        # Курсорная пагинация: без OFFSET и без COUNT(*) на каждый запрос
+        page_obj = get_cursor_page(request, posts, 3, count_key=versioned_key('count', [SCOPE_INDEX]))
+        return {
+            'title': title,
+            # Используем пагинированные посты
+            'posts': page_obj,
+            'page_obj': page_obj,
+        }
+
     context = {
-        'title': "Blog Home",
-        # Используем пагинированные посты
-        'posts': page_obj,
-        'page_obj': page_obj,
+        'title': title,
+        'listing_html': cached_listing(request, 'blog/_index_listing.html', [SCOPE_INDEX], build_listing),
     }
     context.update(get_categories())
     return render(request, "blog/index.html", context=context)
@@ -115,12 +127,19 @@ def page_not_found(request: HttpRequest, exception: Exception) -> HttpResponse:
 def server_error(request: HttpRequest) -> HttpResponse:  # 500 handler
     return render(request, 'blog/500.html', status=500)
 
-def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    post_obj = get_object_or_404(
-        Post.objects.select_related('author', 'category').prefetch_related('tags', 'images'), pk=pk
-    )
-    # Получаем комментарии используя обратную связь
-    comments = Comment.objects.filter(post=post_obj, is_active=True).select_related('author').order_by('created_at')
+def post_version(request: HttpRequest, pk: Optional[int] = None, slug: Optional[str] = None) -> Optional[tuple[Any, ...]]:
+    lookup = {'pk': pk} if pk is not None else {'slug': slug}
+    row = Post.objects.filter(**lookup).values_list('updated_at').first()
+    if row is None:
+        return None
+    # Соседние посты, теги и изображения меняются вместе с версией главной
+    return (*row, *get_versions([SCOPE_INDEX]))
+
+
+@conditional_page(post_version)
+def post_detail(request: HttpRequest, pk: Optional[int] = None, slug: Optional[str] = None) -> HttpResponse:
+    """Страница поста: доступна и по id, и по slug"""
+    post_obj = get_post(pk=pk) if pk is not None else get_post(slug=slug)
     
     # Обработка формы комментариев
     comment_form = CommentForm()
@@ -138,78 +157,40 @@ def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
             # Если пользователь не авторизован, перенаправляем на страницу входа
             return redirect('accounts:login')
     
-    # Навигация между постами
-    try:
-        previous_post = Post.objects.filter(created_at__lt=post_obj.created_at).order_by('-created_at').first()
-    except Post.DoesNotExist:
-        previous_post = None
-    
-    try:
-        next_post = Post.objects.filter(created_at__gt=post_obj.created_at).order_by('created_at').first()
-    except Post.DoesNotExist:
-        next_post = None
+    # Комментарии и навигация между постами (соседи кешируются)
+    detail = build_post_detail(post_obj)
     
     context = {
         'title': post_obj.title,
         'post': post_obj,
-        'tags': post_obj.tags.all(),
-        'comments': comments,
+        'tags': detail.tags,
+        'comments': detail.comments,
+        'comment_count': detail.comment_count,
         'comment_form': comment_form,
-        'previous_post': previous_post,
-        'next_post': next_post,
+        'previous_post': detail.previous_post,
+        'next_post': detail.next_post,
     }
     context.update(get_categories())
     return render(request, 'blog/post.html', context)
 
-def post_detail_by_slug(request: HttpRequest, slug: str) -> HttpResponse:
-    post_obj = get_object_or_404(
-        Post.objects.select_related('author', 'category').prefetch_related('tags', 'images'), slug=slug
-    )
-    # Получаем комментарии используя обратную связь
-    comments = Comment.objects.filter(post=post_obj, is_active=True).select_related('author').order_by('created_at')
-    
-    # Обработка формы комментариев
-    comment_form = CommentForm()
-    if request.method == 'POST':
-        if request.user.is_authenticated:
-            comment_form = CommentForm(request.POST)
-            if comment_form.is_valid():
-                comment = comment_form.save(commit=False)
-                comment.post = post_obj
-                comment.author = request.user
-                comment.save()
-                # Перенаправляем на ту же страницу, чтобы избежать повторной отправки формы
-                return redirect('blog:post-detail-slug', slug=slug)
-        else:
-            # Если пользователь не авторизован, перенаправляем на страницу входа
-            return redirect('accounts:login')
-    
-    # Навигация между постами
-    try:
-        previous_post = Post.objects.filter(created_at__lt=post_obj.created_at).order_by('-created_at').first()
-    except Post.DoesNotExist:
-        previous_post = None
-    
-    try:
-        next_post = Post.objects.filter(created_at__gt=post_obj.created_at).order_by('created_at').first()
-    except Post.DoesNotExist:
-        next_post = None
-    
-    context = {
-        'title': post_obj.title,
-        'post': post_obj,
-        'tags': post_obj.tags.all(),
-        'comments': comments,
-        'comment_form': comment_form,
-        'previous_post': previous_post,
-        'next_post': next_post,
-    }
-    context.update(get_categories())
-    return render(request, 'blog/post.html', context)
+
+def post_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    """Следующая порция комментариев для кнопки «Показать ещё»"""
+    post_obj = get_object_or_404(Post.objects.only('pk'), pk=pk)
+    page = get_comment_page(post_obj, request.GET.get('cursor'))
+    html = render_to_string('blog/_comment_items.html', {'comments': page})
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({
+            "ok": True,
+            "html": html,
+            "has_next": page.has_next,
+            "next_cursor": page.next_cursor,
+        })
+    return HttpResponse(html)
 
 
 def get_categories():
-    cache_key = 'blog:categories:splits'
+    cache_key = versioned_key('categories', [])
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
@@ -222,7 +203,7 @@ def get_categories():
         'first_half': first_half,
         'second_half': second_half,
     }
-    cache.set(cache_key, data, 300)
+    cache.set(cache_key, data, CATEGORIES_CACHE_TIMEOUT)
     return data
     
 
@@ -230,23 +211,27 @@ from typing import Dict, Any
 
 def category_posts(request: HttpRequest, slug: str) -> HttpResponse:
     category = get_object_or_404(Category, slug=slug)
-    posts = (
-        Post.objects.filter(category=category)
-        .select_related('author')
-        .prefetch_related('tags', 'images')
-        .order_by('-created_at')
-    )
-    
-    # Пагинация
-    paginator = Paginator(posts, 3)  # 3 поста на странице
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    scopes = [category_scope(category.pk)]
+
+    def build_listing() -> Dict[str, Any]:
+        posts = (
+            Post.objects.filter(category=category)
+            .select_related('author')
+            .prefetch_related('tags', 'images')
+        )
+        
+        # Пагинация
+        page_obj = get_cursor_page(request, posts, 3, count_key=versioned_key('count', scopes))
+        return {
+            'category': category,
+            'posts': page_obj,
+            'page_obj': page_obj,
+        }
     
     context: Dict[str, Any] = {
         'title': f"Posts in {category.name}",
         'category': category,
-        'posts': page_obj,
-        'page_obj': page_obj,
+        'listing_html': cached_listing(request, 'blog/_category_posts_listing.html', scopes, build_listing, slug),
     }
     context.update(get_categories())
     return render(request, 'blog/category_posts.html', context)
@@ -254,52 +239,40 @@ def category_posts(request: HttpRequest, slug: str) -> HttpResponse:
 def tag_posts(request: HttpRequest, tag_name: str) -> HttpResponse:
     """Отображает посты с определенным тегом"""
     tag = get_object_or_404(Tag, name=tag_name)
-    posts = (
-        Post.objects.filter(tags=tag)
-        .select_related('author', 'category')
-        .prefetch_related('tags', 'images')
-        .order_by('-created_at')
-    )
-    paginator = Paginator(posts, 5)  # Show 5 posts per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    scopes = [tag_scope(tag.pk)]
+
+    def build_listing() -> Dict[str, Any]:
+        posts = (
+            Post.objects.filter(tags=tag)
+            .select_related('author', 'category')
+            .prefetch_related('tags', 'images')
+        )
+        page_obj = get_cursor_page(request, posts, 5, count_key=versioned_key('count', scopes))
+        return {
+            'tag': tag,
+            'posts': page_obj,
+            'page_obj': page_obj,
+        }
     
     context: Dict[str, Any] = {
         'title': f"Posts tagged with '{tag.name}'",
         'tag': tag,
-        'posts': page_obj,
-        'page_obj': page_obj,
+        'listing_html': cached_listing(request, 'blog/_tag_posts_listing.html', scopes, build_listing, tag_name),
     }
     context.update(get_categories())
     return render(request, 'blog/tag_posts.html', context)
 
 def search_posts(request: HttpRequest) -> HttpResponse:
-    """Поиск постов по заголовку и содержимому"""
+    """Полнотекстовый поиск постов с ранжированием и подсветкой совпадений"""
     query = request.GET.get('q', '').strip()
-    posts = []
+    page_obj = None
     
     if query:
-        # Регистронезависимый поиск по заголовку и содержимому
-        posts = (
-            Post.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query)
-        )
-        .select_related('author', 'category')
-        .prefetch_related('tags', 'images')
-        .order_by('-created_at')
-        )
-        
-        # Пагинация результатов поиска
-        paginator = Paginator(posts, 5)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        posts = page_obj
-    else:
-        page_obj = None
+        page_obj = search_page(query, request.GET.get('page'), 5)
     
     context: Dict[str, Any] = {
         'title': f"Результаты поиска: '{query}'" if query else "Поиск",
-        'posts': posts,
+        'posts': page_obj or [],
         'page_obj': page_obj,
         'query': query,
     }
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import TimelineEntry
+
+
+@admin.register(TimelineEntry)
+class TimelineEntryAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ("user", "post", "author", "created_at")
+    raw_id_fields = ("user", "post", "author")
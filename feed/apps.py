@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class FeedConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'feed'
+    verbose_name = 'Лента'
+
+    def ready(self) -> None:
+        # Import signal handlers
+        from . import signals  # noqa: F401
+        return super().ready()
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from feed.timeline import FANOUT_BATCH_SIZE, fan_out_pending
+
+
+class Command(BaseCommand):
+    help = "Copy newly published posts into their followers' timelines in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=FANOUT_BATCH_SIZE, help='Posts per batch')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        posts = entries = 0
+        try:
+            while True:
+                count, written = fan_out_pending(batch_size)
+                posts += count
+                entries += written
+                if not count:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping…")
+        self.stdout.write(self.style.SUCCESS(f"Posts fanned out: {posts}, timeline entries: {entries}"))
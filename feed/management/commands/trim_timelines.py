@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from feed.timeline import timeline_length, trim_timelines
+
+
+class Command(BaseCommand):
+    help = 'Обрезает ленты пользователей до FEED_TIMELINE_LENGTH последних записей (запускать по cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, help='Сколько записей оставить (по умолчанию FEED_TIMELINE_LENGTH)')
+
+    def handle(self, *args, **options):
+        length = options['length'] if options['length'] is not None else timeline_length()
+        timelines, deleted = trim_timelines(max(0, length))
+        self.stdout.write(self.style.SUCCESS(f'Обрезано лент: {timelines}, удалено записей: {deleted}'))
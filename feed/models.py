@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class TimelineEntry(models.Model):
+    """A post in a follower's materialized timeline (fan-out on write, see feed.timeline)."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline', verbose_name='Читатель',
+    )
+    post = models.ForeignKey('blog.Post', on_delete=models.CASCADE, related_name='+', verbose_name='Пост')
+    # Денормализация: отписка удаляет записи автора без JOIN с постами
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', verbose_name='Автор',
+    )
+    # Копия post.created_at — по ней лента сортируется и листается
+    created_at = models.DateTimeField(verbose_name='Дата поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='feed_timeline_user_post_uniq'),
+        ]
+        indexes = [
+            # Страница ленты — диапазон по (user, created_at, post)
+            models.Index(fields=['user', 'created_at', 'post'], name='feed_timeline_page_idx'),
+            models.Index(fields=['user', 'author'], name='feed_timeline_author_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.post_id}"
+
+
+class PendingFanOut(models.Model):
+    """A new post waiting for ``manage.py fan_out_posts`` to copy it into followers' timelines."""
+    post = models.ForeignKey('blog.Post', on_delete=models.CASCADE, related_name='+', verbose_name='Пост')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Пост для рассылки в ленты'
+        verbose_name_plural = 'Посты для рассылки в ленты'
+
+    def __str__(self) -> str:
+        return f"{self.post_id}"
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Follow, User
+from blog.models import Post
+
+from .models import PendingFanOut
+from .timeline import backfill_author, fans_out, remove_author
+
+
+@receiver(pre_save, sender=Post)
+def choose_feed_delivery(sender, instance: Post, **kwargs):
+    if instance._state.adding:
+        # Решается один раз: дальнейший рост числа подписчиков не переносит пост между лентой и подмешиванием
+        followers_count = User.objects.filter(pk=instance.author_id).values_list('followers_count', flat=True).first()
+        instance.feed_fan_out = fans_out(followers_count or 0)
+
+
+@receiver(post_save, sender=Post)
+def queue_fan_out(sender, instance: Post, created: bool, **kwargs):
+    if created and instance.feed_fan_out:
+        # В той же транзакции, что и пост; по лентам его разложит manage.py fan_out_posts
+        PendingFanOut.objects.create(post=instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_followed_author(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        user_id, author_id = instance.follower_id, instance.following_id
+        transaction.on_commit(lambda: backfill_author(user_id, author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def drop_unfollowed_author(sender, instance: Follow, **kwargs):
+    remove_author(instance.follower_id, instance.following_id)
@@ -0,0 +1,59 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from accounts.models import Follow, User
+from blog.models import Category, Post
+
+from .models import PendingFanOut, TimelineEntry
+from .timeline import fan_out_pending, get_feed_page
+
+
+@override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+class FeedTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author = User.objects.create_user('author', 'a@example.com', 'pw12345!x')
+        self.reader = User.objects.create_user('reader', 'r@example.com', 'pw12345!x')
+        self.category = Category.objects.create(slug='news', name='Новости')
+
+    def follow(self, user: User) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=user, following=self.author)
+
+    def publish(self, title: str) -> Post:
+        return Post.objects.create(title=title, content='Текст', category=self.category, author=self.author)
+
+    def feed(self, user: User) -> list[str]:
+        return [post.title for post in get_feed_page(user).object_list]
+
+    def test_post_is_fanned_out_by_the_queue(self) -> None:
+        self.follow(self.reader)
+        post = self.publish('Первый')
+        self.assertTrue(post.feed_fan_out)
+        # На запросе только постановка в очередь
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(PendingFanOut.objects.get().post_id, post.pk)
+
+        self.assertEqual(fan_out_pending(), (1, 1))
+        self.assertEqual(self.feed(self.reader), ['Первый'])
+        self.assertEqual(fan_out_pending(), (0, 0))
+
+    def test_delivery_is_fixed_when_the_post_is_published(self) -> None:
+        self.follow(self.reader)
+        pushed = self.publish('Разослан')
+        fan_out_pending()
+
+        # Автор перешёл порог: старый пост остаётся в лентах, новый подмешивается при чтении
+        newcomer = User.objects.create_user('newcomer', 'n@example.com', 'pw12345!x')
+        self.follow(newcomer)
+        pulled = self.publish('Подмешан')
+        self.assertFalse(pulled.feed_fan_out)
+        self.assertFalse(PendingFanOut.objects.exists())
+        self.assertEqual(TimelineEntry.objects.filter(post=pushed).count(), 2)
+
+        for user in (self.reader, newcomer):
+            with self.assertNumQueries(5):
+                self.assertEqual(self.feed(user), ['Подмешан', 'Разослан'])
+
+        Follow.objects.filter(follower=self.reader).delete()
+        self.assertEqual(self.feed(self.reader), [])
@@ -0,0 +1,178 @@
+"""Per-user timelines of posts by followed authors.
+
+Fan-out on write: a new post is copied into the timeline of every follower,
+so reading a feed page is an index range scan on ``(user, created_at, post)``
+instead of a join over everyone the reader follows.  The copying is not done
+on the request path: publishing queues a :class:`~feed.models.PendingFanOut`
+in the post's transaction and ``manage.py fan_out_posts`` writes the entries
+in batches.
+
+Whether a post is copied at all is decided once, when it is published
+(:mod:`feed.signals`): posts of authors with more than
+``FEED_FANOUT_MAX_FOLLOWERS`` followers get ``Post.feed_fan_out = False`` and
+are merged in on read instead.  Readers and writers look at the same flag, so
+a post is in a feed exactly once even after its author crosses the limit.  A
+timeline keeps the newest ``FEED_TIMELINE_LENGTH`` entries;
+``manage.py trim_timelines`` drops the rest.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from accounts.models import Follow
+from blog.models import Post
+from blog.pagination import FORWARD, CursorPage, decode_cursor, encode_cursor
+from website.queues import take_rows
+
+from .models import PendingFanOut, TimelineEntry
+
+DEFAULT_FANOUT_MAX_FOLLOWERS = 1000
+DEFAULT_TIMELINE_LENGTH = 500
+# Сколько последних постов автора попадает в ленту сразу после подписки
+BACKFILL_POSTS = 20
+BATCH_SIZE = 500
+# Постов за один проход manage.py fan_out_posts
+FANOUT_BATCH_SIZE = 50
+FEED_PER_PAGE = 10
+
+
+def fanout_max_followers() -> int:
+    return getattr(settings, 'FEED_FANOUT_MAX_FOLLOWERS', DEFAULT_FANOUT_MAX_FOLLOWERS)
+
+
+def timeline_length() -> int:
+    return getattr(settings, 'FEED_TIMELINE_LENGTH', DEFAULT_TIMELINE_LENGTH)
+
+
+def fans_out(followers_count: int) -> bool:
+    """Whether a post of an author with ``followers_count`` followers is copied into timelines."""
+    return followers_count <= fanout_max_followers()
+
+
+def fan_out_post(post_id: Any) -> int:
+    """Copy a post into its author's followers' timelines; returns entries written."""
+    post = Post.objects.filter(pk=post_id).values('id', 'author_id', 'created_at', 'feed_fan_out').first()
+    if post is None or not post['feed_fan_out']:
+        # Пост популярного автора читатели подмешивают в ленту сами (get_feed_page)
+        return 0
+    follower_ids = Follow.objects.filter(following_id=post['author_id']).values_list('follower_id', flat=True)
+    written = 0
+    batch: list[TimelineEntry] = []
+    for follower_id in follower_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(TimelineEntry(
+            user_id=follower_id, post_id=post['id'], author_id=post['author_id'], created_at=post['created_at'],
+        ))
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def fan_out_pending(limit: int = FANOUT_BATCH_SIZE) -> tuple[int, int]:
+    """Fan out up to ``limit`` queued posts; returns ``(posts, entries written)``.
+
+    Entries and the removal from the queue commit together, so a crashed
+    worker leaves the posts queued; a repeat is harmless (``ignore_conflicts``).
+    """
+    with transaction.atomic():
+        pending = take_rows(PendingFanOut.objects.all(), limit)
+        written = sum(fan_out_post(row.post_id) for row in pending)
+    return len(pending), written
+
+
+def backfill_author(user_id: Any, author_id: Any) -> None:
+    """Put the latest fanned-out posts of a newly followed author into the follower's timeline."""
+    if not Follow.objects.filter(follower_id=user_id, following_id=author_id).exists():
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id, feed_fan_out=True)
+        .order_by('-created_at', '-id').values_list('id', 'created_at')
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, author_id=author_id, created_at=created_at)
+            for pk, created_at in posts[:BACKFILL_POSTS]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id: Any, author_id: Any) -> None:
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim_timeline(user_id: Any, length: Optional[int] = None) -> int:
+    """Drop entries beyond the newest ``length``; returns rows deleted."""
+    length = timeline_length() if length is None else length
+    # Первая запись за границей: она и всё, что старше, удаляется одним DELETE
+    boundary = list(
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by('-created_at', '-post_id')
+        .values_list('created_at', 'post_id')[length:length + 1]
+    )
+    if not boundary:
+        return 0
+    created_at, post_id = boundary[0]
+    older = Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lte=post_id)
+    deleted, _ = TimelineEntry.objects.filter(older, user_id=user_id).delete()
+    return deleted
+
+
+def trim_timelines(length: Optional[int] = None) -> tuple[int, int]:
+    """Trim every timeline longer than ``length``; returns ``(timelines, rows deleted)``."""
+    length = timeline_length() if length is None else length
+    users = (
+        TimelineEntry.objects.order_by().values('user_id')
+        .annotate(n=Count('id')).filter(n__gt=length).values_list('user_id', flat=True)
+    )
+    trimmed = deleted = 0
+    for user_id in list(users):
+        trimmed += 1
+        deleted += trim_timeline(user_id, length)
+    return trimmed, deleted
+
+
+def get_feed_page(user: Any, token: Optional[str] = None, per_page: int = FEED_PER_PAGE) -> CursorPage:
+    """Newest-first page of the user's feed, ``(created_at, post id)`` keyset.
+
+    The materialized timeline is merged with the followed authors' posts that
+    were published with ``feed_fan_out = False``.  Only the "older" direction
+    is supported: a feed is read by loading more.
+    """
+    cursor = decode_cursor(token)
+    entries = TimelineEntry.objects.filter(user=user)
+    pulled = Post.objects.filter(feed_fan_out=False, author__followers__follower=user)
+    if cursor is not None and cursor[0] == FORWARD:
+        _, created_at, pk = cursor
+        entries = entries.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lt=pk))
+        pulled = pulled.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = {
+        post_id: created_at
+        for post_id, created_at in entries.order_by('-created_at', '-post_id')
+        .values_list('post_id', 'created_at')[:per_page + 1]
+    }
+    for post_id, created_at in pulled.order_by('-created_at', '-id').values_list('id', 'created_at')[:per_page + 1]:
+        rows[post_id] = created_at
+    ordered = sorted(rows.items(), key=lambda item: (item[1], item[0]), reverse=True)[:per_page + 1]
+    ids = [post_id for post_id, _ in ordered[:per_page]]
+
+    posts = Post.objects.filter(pk__in=ids).select_related('author', 'category').prefetch_related('images', 'tags')
+    by_id = {post.pk: post for post in posts} if ids else {}
+    page = CursorPage(
+        [by_id[pk] for pk in ids if pk in by_id],
+        has_next=len(ordered) > per_page,
+        has_previous=cursor is not None,
+    )
+    if page.has_next and page.object_list:
+        last = page.object_list[-1]
+        page.next_cursor = encode_cursor(FORWARD, last.created_at, last.pk)
+    return page
@@ -1,34 +1,101 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any
-from django.core.management.base import BaseCommand
-from django.db.models import Q
-from gallery.models import Image
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.caching import SCOPE_ALL, bump
+from imaging.backfill import (
+    DEFAULT_CHECKPOINT,
+    IMAGE_MODELS,
+    BackfillStats,
+    Checkpoint,
+    ThumbnailResult,
+    backfill,
+    pending_queryset,
+)
+from imaging.workers import init_process, pool_initargs
+
 
 class Command(BaseCommand):
-    help = 'Создает миниатюры для всех изображений без миниатюр'
+    help = 'Создает миниатюры для всех изображений без миниатюр (галерея, посты, товары)'
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для обработки (1 — без пула)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Строк на один bulk_update')
+        parser.add_argument('--model', action='append', choices=IMAGE_MODELS, dest='models',
+                            help='Обработать только эту модель (можно повторять)')
+        parser.add_argument('--force', action='store_true', help='Пересоздать и уже существующие миниатюры')
+        parser.add_argument('--renditions', action='store_true', help='Заодно пересоздать адаптивные рендишны')
+        parser.add_argument('--resume', action='store_true', help='Продолжить с последней контрольной точки')
+        parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='Файл контрольной точки')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать, ничего не записывать')
 
     def handle(self, *args: Any, **options: Any) -> None:
-        # Учитываем и NULL, и пустую строку
-        images_without_thumbnails = Image.objects.filter(Q(thumbnail__isnull=True) | Q(thumbnail=''))
-        count = images_without_thumbnails.count()
-        
-        if count == 0:
+        labels = options['models'] or list(IMAGE_MODELS)
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        checkpoint = Checkpoint(options['checkpoint'], resume=options['resume'])
+
+        counts = {
+            label: pending_queryset(apps.get_model(label), options['force'], checkpoint.get(label)).count()
+            for label in labels
+        }
+        total = sum(counts.values())
+        for label, count in counts.items():
+            start = checkpoint.get(label)
+            self.stdout.write(f'{label}: {count} изображений' + (f' (после pk={start})' if start else ''))
+        if options['dry_run'] or total == 0:
+            if total == 0:
+                self.stdout.write(self.style.WARNING('Все изображения уже имеют миниатюры.'))
+            return
+
+        def report(label: str, results: list[ThumbnailResult], stats: BackfillStats) -> None:
+            for r in results:
+                if r.error is not None:
+                    self.stdout.write(self.style.ERROR(f'{label}#{r.pk}: {r.error}'))
+            done = stats.processed + stats.failed
             self.stdout.write(
-                self.style.WARNING('Все изображения уже имеют миниатюры.')
+                f'[{label} {done}/{counts[label]}] {stats.images_per_second:.1f} изобр./с, '
+                f'{stats.megabytes_per_second:.1f} МБ/с'
             )
-            return
-        
-        self.stdout.write(f'Найдено {count} изображений без миниатюр.')
-        
-        for i, image in enumerate(images_without_thumbnails.iterator(), 1):
-            try:
-                image.create_thumbnail()
-                image.save(update_fields=['thumbnail'])
-                self.stdout.write(f'[{i}/{count}] Создана миниатюра для: {image.title}')
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'[{i}/{count}] Ошибка для {image.title}: {e}')
+
+        workers = max(1, options['workers'])
+        started = time.perf_counter()
+        kwargs = dict(
+            checkpoint=checkpoint,
+            batch_size=batch_size,
+            force=options['force'],
+            renditions=options['renditions'],
+            on_batch=report,
+        )
+        if workers == 1:
+            stats = backfill(labels, map, **kwargs)
+        else:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=init_process, initargs=pool_initargs()
+            ) as pool:
+                # chunksize: по несколько задач на процесс за раз — меньше накладных расходов на pickle
+                stats = backfill(
+                    labels, lambda *it: pool.map(*it, chunksize=max(1, batch_size // (workers * 4))), **kwargs
                 )
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Обработано {count} изображений.')
-        )
\ No newline at end of file
+
+        # bulk_update не отправляет сигналы: сбрасываем кеш листингов блога вручную
+        if stats.get('blog.PostImage') and stats['blog.PostImage'].processed:
+            bump(SCOPE_ALL)
+        checkpoint.clear()
+
+        processed = sum(s.processed for s in stats.values())
+        failed = sum(s.failed for s in stats.values())
+        megabytes = sum(s.bytes_read for s in stats.values()) / 1024 / 1024
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано {processed} изображений, ошибок: {failed}, {elapsed:.1f} с, '
+            f'{processed / elapsed:.1f} изобр./с, {megabytes / elapsed:.1f} МБ/с'
+        ))
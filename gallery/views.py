@@ -2,13 +2,19 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
+from typing import Any, Optional
+from blog.conditional import conditional_page
+from imaging.renditions import prefetch_renditions
+
 from .models import Image
 from .forms import ImageUploadForm
 
 def gallery_index(request: HttpRequest) -> HttpResponse:
     """Главная страница галереи"""
-    images = Image.objects.filter(is_public=True).order_by('-uploaded_at')
-    
+    images = list(Image.objects.filter(is_public=True).order_by('-uploaded_at'))
+    # Рендишны всех карточек одним запросом
+    prefetch_renditions(images)
+
     context = {
         'title': 'Галерея изображений',
         'images': images,
@@ -35,6 +41,15 @@ def upload_image(request: HttpRequest) -> HttpResponse:
     }
     return render(request, 'gallery/upload_image.html', context)
 
+def image_version(request: HttpRequest, image_id: int) -> Optional[tuple[Any, ...]]:
+    row = Image.objects.filter(pk=image_id).values_list('updated_at', 'is_public', 'uploaded_by_id').first()
+    if row is None or not (row[1] or row[2] == request.user.pk):
+        # Нет изображения или доступа — ответ (404, редирект) формирует сама вьюха
+        return None
+    return row
+
+
+@conditional_page(image_version)
 def image_detail(request: HttpRequest, image_id: int) -> HttpResponse:
     """Детальный просмотр изображения"""
     image = get_object_or_404(Image, pk=image_id)
@@ -0,0 +1 @@
+"""Image processing shared by blog, gallery and shop."""
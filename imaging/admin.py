@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import ThumbnailJob
+
+
+@admin.register(ThumbnailJob)
+class ThumbnailJobAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ("model", "object_id", "status", "attempts", "run_after", "created_at")
+    list_filter = ("status", "model")
+    search_fields = ("model", "last_error")
+    readonly_fields = ("locked_by", "locked_at", "created_at")
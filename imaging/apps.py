@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ImagingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'imaging'
+
+    def ready(self) -> None:
+        # Подключаем сигналы к моделям blog/gallery/shop
+        from . import signals
+        signals.connect()
+        return super().ready()
@@ -0,0 +1,175 @@
+"""Bulk (re)generation of thumbnails for every model in :data:`IMAGE_MODELS`.
+
+Used by ``manage.py create_thumbnails``.  Rows are read in primary-key order
+in batches; each batch is rendered in a process pool (workers only write
+files, no rows; the pool calls :func:`imaging.workers.render_thumbnail`) and
+written back with one ``bulk_update``.  After every batch
+the last processed primary key is stored in a JSON checkpoint, so an
+interrupted backfill can continue with ``--resume``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ThumbnailJob
+from .renditions import generate_renditions
+from .signals import IMAGE_MODELS
+from .workers import render_thumbnail as render_in_worker
+
+DEFAULT_CHECKPOINT = '.thumbnails-checkpoint.json'
+
+
+@dataclass
+class ThumbnailResult:
+    pk: int
+    thumbnail: str = ''
+    bytes_read: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class BackfillStats:
+    processed: int = 0
+    failed: int = 0
+    bytes_read: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started, 1e-9)
+
+    @property
+    def images_per_second(self) -> float:
+        return self.processed / self.elapsed
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_read / 1024 / 1024 / self.elapsed
+
+
+def render_thumbnail(
+    model_label: str, pk: int, image_name: str, old_thumbnail: str = '', renditions: bool = False
+) -> ThumbnailResult:
+    """Write the thumbnail file of one object (runs in a pool process).
+
+    The row itself is updated by the parent with ``bulk_update``; the
+    replaced thumbnail file, if any, is removed once the new one is written.
+    """
+    model = apps.get_model(model_label)
+    # Модель не читаем из БД: для миниатюры достаточно pk и имён файлов
+    obj = model(pk=pk, image=image_name)
+    try:
+        size = obj.image.size
+        obj.create_thumbnail()
+        if old_thumbnail and old_thumbnail != obj.thumbnail.name:
+            obj.thumbnail.storage.delete(old_thumbnail)
+        if renditions:
+            generate_renditions(obj)
+    except Exception as e:  # noqa: BLE001 — ошибку одного файла отдаём в отчёт
+        return ThumbnailResult(pk, error=f"{type(e).__name__}: {e}")
+    return ThumbnailResult(pk, obj.thumbnail.name, size)
+
+
+def pending_queryset(model: type[models.Model], force: bool = False, after: int = 0) -> models.QuerySet:
+    qs = model._default_manager.exclude(Q(image='') | Q(image__isnull=True))
+    if not force:
+        qs = qs.filter(Q(thumbnail='') | Q(thumbnail__isnull=True))
+    return qs.filter(pk__gt=after).order_by('pk')
+
+
+def iter_batches(qs: models.QuerySet, batch_size: int) -> Iterator[list[tuple[int, str, str]]]:
+    """Yield ``(pk, image, thumbnail)`` batches using keyset pagination on ``pk``."""
+    last = 0
+    while True:
+        batch = list(qs.filter(pk__gt=last).values_list('pk', 'image', 'thumbnail')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def save_results(model: type[models.Model], results: list[ThumbnailResult]) -> None:
+    done = [r for r in results if r.error is None]
+    if not done:
+        return
+    objs = [model(pk=r.pk, thumbnail=r.thumbnail) for r in done]
+    fields = ['thumbnail']
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        # bulk_update не трогает auto_now — обновляем версию страницы (ETag) сами
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields.append('updated_at')
+    with transaction.atomic():
+        model._default_manager.bulk_update(objs, fields)
+        # Задания очереди для этих объектов больше не нужны — в любом статусе: и ожидающие повтора,
+        # и взятые воркером (его complete_job/fail_job по удалённому заданию ничего не сделают)
+        ThumbnailJob.objects.filter(model=model._meta.label, object_id__in=[r.pk for r in done]).delete()
+
+
+class Checkpoint:
+    """Last processed primary key per model, stored as JSON."""
+
+    def __init__(self, path: str, resume: bool = False) -> None:
+        self.path = path
+        self.positions: dict[str, int] = {}
+        if resume and os.path.exists(path):
+            with open(path) as fh:
+                self.positions = {k: int(v) for k, v in json.load(fh).items()}
+
+    def get(self, label: str) -> int:
+        return self.positions.get(label, 0)
+
+    def set(self, label: str, pk: int) -> None:
+        self.positions[label] = pk
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as fh:
+            json.dump(self.positions, fh)
+        # Атомарная замена: прерывание не оставит битый файл
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def backfill(
+    labels: list[str],
+    mapper: Callable[..., Any],
+    checkpoint: Checkpoint,
+    batch_size: int,
+    force: bool = False,
+    renditions: bool = False,
+    on_batch: Optional[Callable[[str, list[ThumbnailResult], BackfillStats], None]] = None,
+) -> dict[str, BackfillStats]:
+    """Regenerate thumbnails of ``labels`` models; ``mapper`` is ``map`` or ``Executor.map``."""
+    stats: dict[str, BackfillStats] = {}
+    for label in labels:
+        model = apps.get_model(label)
+        model_stats = stats[label] = BackfillStats()
+        qs = pending_queryset(model, force, checkpoint.get(label))
+        for batch in iter_batches(qs, batch_size):
+            pks, images, thumbnails = zip(*batch)
+            n = len(batch)
+            results = list(mapper(render_in_worker, [label] * n, pks, images, [t or '' for t in thumbnails], [renditions] * n))
+            save_results(model, results)
+            for r in results:
+                model_stats.bytes_read += r.bytes_read
+                if r.error is None:
+                    model_stats.processed += 1
+                else:
+                    model_stats.failed += 1
+            checkpoint.set(label, batch[-1][0])
+            if on_batch is not None:
+                on_batch(label, results, model_stats)
+    return stats
+
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image as PILImage
+from PIL import ImageOps
+
+from imaging.pipeline import make_thumbnail
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+def legacy_thumbnail(path: str, size: tuple[int, int]) -> bytes:
+    """Прежняя реализация create_thumbnail() из моделей — для сравнения"""
+    import io
+    img = PILImage.open(path)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+    img.thumbnail(size, PILImage.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def upright_thumbnail(path: str, size: tuple[int, int]) -> bytes:
+    """Прежняя реализация, дополненная exif_transpose(): поворот декодирует JPEG целиком"""
+    import io
+    img = ImageOps.exif_transpose(PILImage.open(path))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail(size, PILImage.Resampling.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def full_decode_thumbnail(path: str, size: tuple[int, int]) -> bytes:
+    """Без draft(): JPEG декодируется в полном размере — показывает, что экономит draft()"""
+    import io
+    img = PILImage.open(path)
+    img.load()
+    img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail(size, PILImage.Resampling.LANCZOS, reducing_gap=None)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+
+def pipeline_thumbnail(path: str, size: tuple[int, int]) -> bytes:
+    return make_thumbnail(path, size)
+
+
+# legacy не поворачивает фото по EXIF, но Image.thumbnail() сам вызывает draft() (reducing_gap=2.0
+# по умолчанию) — по CPU он уже близок к pipeline. upright поворачивает, и exif_transpose() декодирует
+# повёрнутые фото целиком; full декодирует целиком все. pipeline — текущий код
+IMPLEMENTATIONS = {
+    'legacy': legacy_thumbnail,
+    'upright': upright_thumbnail,
+    'full': full_decode_thumbnail,
+    'pipeline': pipeline_thumbnail,
+}
+
+
+def _proc_status_kb(field: str) -> Optional[int]:
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _current_rss_kb() -> Optional[int]:
+    return _proc_status_kb('VmRSS')
+
+
+def _reset_peak_rss() -> None:
+    # Linux: сбрасывает VmHWM до текущего RSS (ru_maxrss наследуется через fork/exec и не сбрасывается)
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss_kb() -> Optional[int]:
+    peak = _proc_status_kb('VmHWM')
+    if peak is None and resource is not None:
+        # ru_maxrss в Linux — в килобайтах
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak
+
+
+def _measure(name: str, paths: list[str], size: tuple[int, int], repeat: int) -> tuple[float, float, Optional[int], int]:
+    """Run in a fresh process so the peak RSS belongs to one implementation only."""
+    func = IMPLEMENTATIONS[name]
+    # Прогрев на маленьком изображении: импорт плагинов Pillow не должен попасть в замер
+    warmup = os.path.join(os.path.dirname(paths[0]) or '.', '.bench_warmup.jpg')
+    PILImage.new('RGB', (64, 64)).save(warmup, 'JPEG')
+    try:
+        func(warmup, size)
+    finally:
+        os.remove(warmup)
+    _reset_peak_rss()
+    rss_before = _current_rss_kb() or _peak_rss_kb()
+    cpu, wall = time.process_time(), time.perf_counter()
+    out_bytes = 0
+    for _ in range(repeat):
+        for path in paths:
+            out_bytes += len(func(path, size))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    rss_after = _peak_rss_kb()
+    rss_growth = rss_after - rss_before if rss_after is not None and rss_before is not None else None
+    return cpu, wall, rss_growth, out_bytes
+
+
+def _generate(directory: str, count: int, size: tuple[int, int]) -> list[str]:
+    paths = []
+    for i in range(count):
+        # Фрактал + шум: сжимается примерно как фотография, а не как заливка
+        base = PILImage.effect_mandelbrot(size, (-2.0 + i * 0.01, -1.2, 0.8, 1.2), 64)
+        noise = PILImage.effect_noise(size, 24)
+        img = PILImage.merge('RGB', (base, noise, PILImage.linear_gradient('L').resize(size)))
+        path = os.path.join(directory, f'bench_{i}.jpg')
+        # Каждое второе — «портрет с телефона»: пиксели лежат боком, поворот задан EXIF
+        exif = PILImage.Exif()
+        if i % 2:
+            exif[0x0112] = 6
+        img.save(path, 'JPEG', quality=92, exif=exif.tobytes())
+        paths.append(path)
+    return paths
+
+
+class Command(BaseCommand):
+    help = "Compare CPU time and peak memory of the legacy, full-decode and shared thumbnail pipelines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Image files (default: generated JPEG photos)')
+        parser.add_argument('--generate', type=int, default=5, help='How many images to generate without paths')
+        parser.add_argument('--source-size', default='4000x3000', help='Size of generated images, WxH')
+        parser.add_argument('--size', type=int, default=400, help='Thumbnail bounding box')
+        parser.add_argument('--repeat', type=int, default=3, help='Passes over the image set')
+
+    def handle(self, *args, **options):
+        size = (options['size'], options['size'])
+        repeat = max(1, options['repeat'])
+        try:
+            source_size = tuple(int(v) for v in options['source_size'].lower().split('x'))
+        except ValueError:
+            raise CommandError('--source-size must look like 4000x3000')
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = options['paths'] or _generate(tmp, max(1, options['generate']), source_size)
+            total = len(paths) * repeat
+            self.stdout.write(f"{len(paths)} images × {repeat} passes, thumbnail {size[0]}px")
+            context = multiprocessing.get_context('spawn')
+            results = {}
+            for name in IMPLEMENTATIONS:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    results[name] = pool.submit(_measure, name, paths, size, repeat).result()
+
+        for name, (cpu, wall, rss, out_bytes) in results.items():
+            rss_text = f"{rss / 1024:.1f} MB" if rss is not None else 'n/a'
+            self.stdout.write(
+                f"{name:>9}: CPU {cpu / total * 1000:7.1f} ms/image, wall {wall / total * 1000:7.1f} ms/image, "
+                f"peak RSS +{rss_text}, output {out_bytes / total / 1024:.1f} KB/image"
+            )
+        pipeline_cpu = results['pipeline'][0]
+        if pipeline_cpu:
+            for name in ('legacy', 'upright', 'full'):
+                self.stdout.write(self.style.SUCCESS(f"CPU speed-up vs {name}: ×{results[name][0] / pipeline_cpu:.2f}"))
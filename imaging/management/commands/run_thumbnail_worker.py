@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+
+from imaging.queue import claim_jobs, complete_job, fail_job
+from imaging.workers import init_process, pool_initargs, process_job
+
+
+class Command(BaseCommand):
+    help = "Generate queued thumbnails in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=20, help='Jobs claimed per round')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        batch_size = max(1, options['batch_size'])
+        done = failed = 0
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(f"Thumbnail worker started with {processes} processes")
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=context, initializer=init_process, initargs=pool_initargs()
+        ) as pool:
+            try:
+                while True:
+                    jobs = claim_jobs(batch_size)
+                    if not jobs:
+                        if options['once']:
+                            break
+                        time.sleep(options['sleep'])
+                        continue
+                    errors = pool.map(process_job, [j.model for j in jobs], [j.object_id for j in jobs])
+                    finished = 0
+                    try:
+                        for job, error in zip(jobs, errors):
+                            if error is None:
+                                complete_job(job)
+                                done += 1
+                            else:
+                                fail_job(job, error)
+                                failed += 1
+                                self.stderr.write(self.style.ERROR(f"{job.model}#{job.object_id}: {error}"))
+                            finished += 1
+                    except BrokenProcessPool as e:
+                        # Процесс пула умер (segfault в декодере, OOM): взятые задания вернём в очередь
+                        # с отсрочкой, иначе они до STALE_AFTER висели бы «Выполняется»
+                        for job in jobs[finished:]:
+                            fail_job(job, f"BrokenProcessPool: {e}")
+                        raise CommandError(
+                            f"Worker process died, {len(jobs) - finished} jobs returned to the queue"
+                        ) from e
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping…")
+        self.stdout.write(self.style.SUCCESS(f"Thumbnails created: {done}, failed: {failed}"))
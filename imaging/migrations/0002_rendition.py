@@ -0,0 +1,36 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('format', models.CharField(max_length=10, verbose_name='Формат')),
+                ('file', models.ImageField(upload_to='renditions/%Y/%m/', verbose_name='Файл')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер, байт')),
+            ],
+            options={
+                'verbose_name': 'Рендишн изображения',
+                'verbose_name_plural': 'Рендишны изображений',
+                'ordering': ['width'],
+                'indexes': [models.Index(fields=['model', 'object_id'], name='imaging_ren_model_2837be_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='rendition',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id', 'width', 'format'), name='imaging_rendition_unique'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ThumbnailJob(models.Model):
+    """Задание на генерацию миниатюры, которое выполняет run_thumbnail_worker"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ожидает"
+        RUNNING = "running", "Выполняется"
+        FAILED = "failed", "Ошибка"
+
+    # app_label.ModelName модели с полями image/thumbnail (например, "gallery.Image")
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID объекта")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Не раньше")
+    locked_by = models.CharField(max_length=64, blank=True, verbose_name="Обработчик")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Взято в работу")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+
+    class Meta:
+        verbose_name = "Задание миниатюры"
+        verbose_name_plural = "Задания миниатюр"
+        constraints = [
+            # Повторная постановка того же объекта не плодит дубликаты
+            models.UniqueConstraint(fields=['model', 'object_id'], name='imaging_thumbnailjob_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id} ({self.status})"
+
+
+class Rendition(models.Model):
+    """Уменьшенная копия изображения заданной ширины и формата (для srcset)"""
+    model = models.CharField(max_length=100, verbose_name="Модель")
+    object_id = models.PositiveBigIntegerField(verbose_name="ID объекта")
+    width = models.PositiveIntegerField(verbose_name="Ширина")
+    height = models.PositiveIntegerField(verbose_name="Высота")
+    format = models.CharField(max_length=10, verbose_name="Формат")
+    file = models.ImageField(upload_to='renditions/%Y/%m/', verbose_name="Файл")
+    size = models.PositiveIntegerField(default=0, verbose_name="Размер, байт")
+
+    class Meta:
+        verbose_name = "Рендишн изображения"
+        verbose_name_plural = "Рендишны изображений"
+        ordering = ['width']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id', 'width', 'format'], name='imaging_rendition_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['model', 'object_id']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model}#{self.object_id} {self.width}w {self.format}"
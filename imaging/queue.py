@@ -0,0 +1,120 @@
+"""Background thumbnail generation.
+
+Model ``save()`` methods call :func:`enqueue_thumbnail` instead of resizing
+inside the request; a job builds the thumbnail and the responsive renditions
+(:mod:`imaging.renditions`).  The backend is chosen by ``THUMBNAIL_QUEUE_BACKEND``:
+
+* :class:`DatabaseQueue` (default) stores a :class:`~imaging.models.ThumbnailJob`
+  row in the same transaction as the upload; ``manage.py run_thumbnail_worker``
+  claims and processes jobs in a process pool;
+* :class:`ImmediateQueue` generates the thumbnail right after commit, which is
+  handy for development without a worker.
+
+Until a thumbnail exists templates fall back to the original image.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from website.queues import claim_rows, release_failed
+
+from .models import ThumbnailJob
+from .renditions import generate_renditions
+
+DEFAULT_BACKEND = 'imaging.queue.DatabaseQueue'
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+# Задание «Выполняется» дольше этого срока считаем брошенным упавшим воркером
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _label(instance: models.Model) -> str:
+    return instance._meta.label
+
+
+def generate_thumbnail(model_label: str, object_id: int) -> bool:
+    """Create the thumbnail and responsive renditions of one object.
+
+    Returns ``False`` if there is nothing to do.
+    """
+    model = apps.get_model(model_label)
+    obj = model._default_manager.filter(pk=object_id).first()
+    if obj is None or not obj.image:
+        return False
+    obj.create_thumbnail()
+    # save() с update_fields: сработают сигналы (например, сброс кеша листингов)
+    obj.save(update_fields=['thumbnail'])
+    generate_renditions(obj)
+    if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+        # Рендишны появились после сохранения — новая версия страницы для ETag
+        model._default_manager.filter(pk=obj.pk).update(updated_at=timezone.now())
+    return True
+
+
+class DatabaseQueue:
+    def enqueue(self, instance: models.Model) -> None:
+        ThumbnailJob.objects.update_or_create(
+            model=_label(instance),
+            object_id=instance.pk,
+            defaults={
+                'status': ThumbnailJob.Status.PENDING,
+                'attempts': 0,
+                'last_error': '',
+                'run_after': timezone.now(),
+                'locked_by': '',
+                'locked_at': None,
+            },
+        )
+
+
+class ImmediateQueue:
+    def enqueue(self, instance: models.Model) -> None:
+        label, pk = _label(instance), instance.pk
+        transaction.on_commit(lambda: generate_thumbnail(label, pk))
+
+
+def get_queue() -> Any:
+    return import_string(getattr(settings, 'THUMBNAIL_QUEUE_BACKEND', DEFAULT_BACKEND))()
+
+
+def enqueue_thumbnail(instance: models.Model) -> None:
+    """Schedule thumbnail generation for a saved object with ``image``/``thumbnail`` fields."""
+    get_queue().enqueue(instance)
+
+
+def claim_jobs(limit: int) -> list[ThumbnailJob]:
+    """Atomically take up to ``limit`` due jobs for this worker, see :func:`website.queues.claim_rows`."""
+    return claim_rows(
+        ThumbnailJob.objects.all(), limit,
+        pending=ThumbnailJob.Status.PENDING, running=ThumbnailJob.Status.RUNNING, stale_after=STALE_AFTER,
+    )
+
+
+def complete_job(job: ThumbnailJob) -> None:
+    # Только если задание не перепоставили, пока оно выполнялось
+    ThumbnailJob.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+
+
+def fail_job(job: ThumbnailJob, error: str) -> None:
+    """Schedule a retry with exponential backoff, or give up after ``MAX_ATTEMPTS``."""
+    release_failed(
+        job, error,
+        pending=ThumbnailJob.Status.PENDING, failed=ThumbnailJob.Status.FAILED,
+        max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY,
+    )
+
+
+def process_job(model_label: str, object_id: int) -> Optional[str]:
+    """Process-pool entry point: return an error message, or ``None`` on success."""
+    try:
+        generate_thumbnail(model_label, object_id)
+    except Exception as e:  # noqa: BLE001 — любую ошибку записываем в задание
+        return f"{type(e).__name__}: {e}"
+    return None
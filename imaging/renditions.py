@@ -0,0 +1,145 @@
+"""Responsive renditions: several widths of an image in AVIF, WebP and JPEG.
+
+The worker calls :func:`generate_renditions` after the thumbnail; templates
+emit ``<picture>``/``srcset`` markup through ``{% responsive_image %}`` (see
+``imaging/templatetags/responsive_images.py``).  Widths and formats come from
+the ``IMAGE_RENDITION_WIDTHS`` and ``IMAGE_RENDITION_FORMATS`` settings;
+formats the installed Pillow cannot encode are skipped with a warning in the
+log.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import warnings
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import models, transaction
+from PIL import Image as PILImage
+from PIL import features
+
+from .models import Rendition
+from .pipeline import encode, normalize_mode, open_image
+
+DEFAULT_WIDTHS = (320, 640, 960, 1280)
+# Порядок важен: браузер берёт первый поддерживаемый <source>, JPEG — запасной вариант для <img>
+DEFAULT_FORMATS = ('avif', 'webp', 'jpeg')
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+SAVE_OPTIONS: dict[str, dict[str, Any]] = {
+    'avif': {'quality': 60, 'speed': 6},
+    'webp': {'quality': 80, 'method': 4},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+FALLBACK_FORMAT = 'jpeg'
+# Имена кодеков для PIL.features.check()
+FEATURES = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+
+logger = logging.getLogger(__name__)
+
+
+def rendition_widths() -> list[int]:
+    return sorted(getattr(settings, 'IMAGE_RENDITION_WIDTHS', DEFAULT_WIDTHS))
+
+
+@lru_cache(maxsize=None)
+def can_encode(fmt: str) -> bool:
+    """Whether the installed Pillow was built with an encoder for ``fmt``; logs once if not."""
+    with warnings.catch_warnings():
+        # Pillow до 11.2 не знает признака «avif» и предупреждает об этом — это тоже «не умеет»
+        warnings.simplefilter('ignore')
+        available = bool(features.check(FEATURES[fmt]))
+    if not available:
+        logger.warning('Pillow %s cannot encode %s; its renditions are skipped', PILImage.__version__, fmt.upper())
+    return available
+
+
+def rendition_formats() -> list[str]:
+    return [
+        f for f in getattr(settings, 'IMAGE_RENDITION_FORMATS', DEFAULT_FORMATS) if f in MIME_TYPES and can_encode(f)
+    ]
+
+
+def _encode(img: PILImage.Image, fmt: str) -> bytes:
+    if fmt == 'jpeg':
+        # JPEG без альфа-канала: прозрачность накладываем на фон
+        img = normalize_mode(img)
+    return encode(img, fmt.upper(), **SAVE_OPTIONS[fmt])
+
+
+def generate_renditions(instance: models.Model, field: str = 'image') -> list[Rendition]:
+    """(Re)build every configured width/format of ``instance.<field>``.
+
+    Widths wider than the original are skipped (no upscaling); if all of them
+    are, the original width is used.  Each width is resized from the next
+    larger one, so the full-size image is resampled only once.
+    """
+    source = getattr(instance, field)
+    if not source:
+        return []
+    label = instance._meta.label
+    source.open('rb')
+    try:
+        # Высота не ограничивает масштаб JPEG-декодирования, важна только ширина
+        img = normalize_mode(open_image(source, (max(rendition_widths()), 0)), keep_alpha=True)
+    finally:
+        source.close()
+
+    widths = [w for w in rendition_widths() if w < img.width] or [img.width]
+    base = os.path.splitext(os.path.basename(source.name))[0]
+    renditions: list[Rendition] = []
+    current = img
+    for width in sorted(widths, reverse=True):
+        height = max(1, round(current.height * width / current.width))
+        current = current.resize((width, height), PILImage.Resampling.LANCZOS) if width != current.width else current
+        for fmt in rendition_formats():
+            data = _encode(current, fmt)
+            rendition = Rendition(model=label, object_id=instance.pk, width=width, height=height, format=fmt, size=len(data))
+            rendition.file.save(f"{base}_{width}w.{EXTENSIONS[fmt]}", ContentFile(data), save=False)
+            renditions.append(rendition)
+
+    # Старые строки читаем до транзакции: на SQLite транзакция, начатая с SELECT, при записи
+    # не ждёт блокировку параллельного воркера, а сразу падает с «database is locked»
+    stale = list(Rendition.objects.filter(model=label, object_id=instance.pk))
+    with transaction.atomic():
+        Rendition.objects.filter(pk__in=[r.pk for r in stale]).delete()
+        Rendition.objects.bulk_create(renditions)
+    for rendition in stale:
+        rendition.file.delete(save=False)
+    return renditions
+
+
+def delete_renditions(instance: models.Model) -> None:
+    """Remove rendition rows and files of ``instance``."""
+    stale = list(Rendition.objects.filter(model=instance._meta.label, object_id=instance.pk))
+    for rendition in stale:
+        rendition.file.delete(save=False)
+    Rendition.objects.filter(pk__in=[r.pk for r in stale]).delete()
+
+
+def prefetch_renditions(objects: Iterable[models.Model]) -> None:
+    """Attach renditions to ``objects`` with one query per model.
+
+    ``{% responsive_image %}`` reads the ``_renditions`` attribute, so listing
+    pages avoid one query per image.
+    """
+    by_model: dict[str, dict[Any, models.Model]] = defaultdict(dict)
+    for obj in objects:
+        by_model[obj._meta.label][obj.pk] = obj
+        obj._renditions = []
+    for label, objs in by_model.items():
+        for rendition in Rendition.objects.filter(model=label, object_id__in=list(objs)):
+            objs[rendition.object_id]._renditions.append(rendition)
+
+
+def get_renditions(obj: models.Model) -> list[Rendition]:
+    renditions = getattr(obj, '_renditions', None)
+    if renditions is None:
+        renditions = list(Rendition.objects.filter(model=obj._meta.label, object_id=obj.pk))
+        obj._renditions = renditions
+    return renditions
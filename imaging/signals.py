@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.db.models.signals import post_delete
+
+from .models import ThumbnailJob
+from .renditions import delete_renditions
+
+# Модели с полями image/thumbnail, которые обслуживает очередь миниатюр
+IMAGE_MODELS = ('blog.PostImage', 'gallery.Image', 'shop.Product')
+
+
+def cleanup_image_artifacts(sender, instance, **kwargs):
+    """Удаляем рендишны и незавершённые задания удалённого изображения"""
+    delete_renditions(instance)
+    ThumbnailJob.objects.filter(model=instance._meta.label, object_id=instance.pk).delete()
+
+
+def connect() -> None:
+    for label in IMAGE_MODELS:
+        post_delete.connect(
+            cleanup_image_artifacts, sender=apps.get_model(label), dispatch_uid=f'imaging-cleanup-{label}'
+        )
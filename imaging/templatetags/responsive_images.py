@@ -0,0 +1,62 @@
+from typing import Any
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import SafeString
+
+from imaging.renditions import FALLBACK_FORMAT, MIME_TYPES, get_renditions, rendition_formats
+
+register = template.Library()
+
+# Ширина JPEG для src у браузеров без поддержки srcset
+FALLBACK_SRC_WIDTH = 640
+
+
+def _srcset(renditions: list[Any]) -> str:
+    return ', '.join(f"{r.file.url} {r.width}w" for r in renditions)
+
+
+@register.simple_tag
+def responsive_image(obj: Any, sizes: str = '100vw', alt: str = '', css_class: str = '', **attrs: Any) -> SafeString:
+    """Render ``<picture>`` with AVIF/WebP sources and a JPEG ``<img>`` fallback.
+
+    Usage::
+
+        {% load responsive_images %}
+        {% responsive_image image sizes="(min-width: 992px) 25vw, 100vw" alt=image.title css_class="card-img-top" %}
+
+    Until the worker has produced renditions, a plain ``<img>`` with the
+    thumbnail (or the original) is emitted instead.
+    """
+    img_attrs = {'alt': alt, 'loading': 'lazy', 'decoding': 'async', **attrs}
+    if css_class:
+        img_attrs['class'] = css_class
+
+    by_format: dict[str, list[Any]] = {}
+    for rendition in get_renditions(obj):
+        by_format.setdefault(rendition.format, []).append(rendition)
+    fallback = sorted(by_format.get(FALLBACK_FORMAT, []), key=lambda r: r.width)
+    if not fallback:
+        thumbnail = getattr(obj, 'thumbnail', None)
+        source = thumbnail if thumbnail else getattr(obj, 'image', None)
+        if not source:
+            return SafeString('')
+        return format_html('<img src="{}"{}>', source.url, flatatt(img_attrs))
+
+    src = next((r for r in fallback if r.width >= FALLBACK_SRC_WIDTH), fallback[-1])
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[fmt], _srcset(sorted(by_format[fmt], key=lambda r: r.width)), sizes)
+            for fmt in rendition_formats()
+            if fmt != FALLBACK_FORMAT and fmt in by_format
+        ),
+    )
+    img_attrs.setdefault('width', src.width)
+    img_attrs.setdefault('height', src.height)
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        sources, src.file.url, _srcset(fallback), sizes, flatatt(img_attrs),
+    )
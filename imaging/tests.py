@@ -0,0 +1,113 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image as PILImage
+
+from gallery.models import Image
+
+from .models import Rendition, ThumbnailJob
+from .queue import process_job
+from .renditions import can_encode, rendition_formats
+
+
+def make_jpeg(size: tuple[int, int] = (640, 480)) -> ContentFile:
+    buf = io.BytesIO()
+    PILImage.new('RGB', size, (200, 30, 30)).save(buf, 'JPEG')
+    return ContentFile(buf.getvalue())
+
+
+class MediaRootMixin:
+    def setUp(self) -> None:
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user('owner', 'o@example.com', 'pw12345!x')
+
+    def make_image(self, title: str = 'photo') -> Image:
+        image = Image(title=title, uploaded_by=self.user)
+        image.image.save(f'{title}.jpg', make_jpeg(), save=False)
+        image.save()
+        return image
+
+
+# Процессы пула читают данные из БД: нужны закоммиченные строки, отсюда TransactionTestCase
+@override_settings(THUMBNAIL_QUEUE_BACKEND='imaging.queue.DatabaseQueue')
+class ThumbnailWorkerTests(MediaRootMixin, TransactionTestCase):
+    def test_jobs_run_through_process_pool(self) -> None:
+        images = [self.make_image(f'photo{i}') for i in range(3)]
+        self.assertEqual(ThumbnailJob.objects.count(), 3)
+
+        call_command('run_thumbnail_worker', processes=2, once=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        for image in images:
+            image.refresh_from_db()
+            self.assertTrue(image.thumbnail)
+            self.assertTrue(image.thumbnail.storage.exists(image.thumbnail.name))
+
+    def test_missing_file_is_retried_later(self) -> None:
+        image = self.make_image()
+        image.image.storage.delete(image.image.name)
+
+        call_command('run_thumbnail_worker', processes=1, once=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(job.status, ThumbnailJob.Status.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertTrue(job.last_error)
+        self.assertEqual(job.locked_by, '')
+
+
+class CreateThumbnailsTests(MediaRootMixin, TransactionTestCase):
+    def test_backfill_in_process_pool_clears_queued_jobs(self) -> None:
+        images = [self.make_image(f'photo{i}') for i in range(3)]
+        # Одно задание как будто уже взято воркером, другое ждёт повтора после ошибки
+        ThumbnailJob.objects.filter(object_id=images[0].pk).update(status=ThumbnailJob.Status.RUNNING, locked_by='w1')
+        ThumbnailJob.objects.filter(object_id=images[1].pk).update(attempts=2, last_error='boom')
+        checkpoint = f'{tempfile.mkdtemp()}/checkpoint.json'
+        self.addCleanup(shutil.rmtree, checkpoint.rsplit('/', 1)[0], ignore_errors=True)
+
+        call_command(
+            'create_thumbnails', workers=2, models=['gallery.Image'], checkpoint=checkpoint, stdout=io.StringIO()
+        )
+
+        self.assertFalse(ThumbnailJob.objects.exists())
+        for image in images:
+            image.refresh_from_db()
+            self.assertTrue(image.thumbnail.storage.exists(image.thumbnail.name))
+
+
+class RenditionFormatTests(MediaRootMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        can_encode.cache_clear()
+        self.addCleanup(can_encode.cache_clear)
+
+    def test_formats_without_encoder_are_skipped(self) -> None:
+        def check(feature: str) -> bool:
+            return feature != 'avif'
+
+        image = self.make_image()
+        with mock.patch('imaging.renditions.features.check', side_effect=check) as checked:
+            with self.assertLogs('imaging.renditions', 'WARNING') as logs:
+                self.assertEqual(rendition_formats(), ['webp', 'jpeg'])
+                self.assertIsNone(process_job('gallery.Image', image.pk))
+            self.assertEqual(checked.call_count, 3)
+        # Предупреждение одно на процесс, а не на каждое задание
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('AVIF', logs.output[0])
+
+        image.refresh_from_db()
+        self.assertTrue(image.thumbnail)
+        self.assertEqual(
+            set(Rendition.objects.filter(object_id=image.pk).values_list('format', flat=True)), {'webp', 'jpeg'}
+        )
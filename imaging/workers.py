@@ -0,0 +1,47 @@
+"""Entry points for process pools started with ``spawn``.
+
+A spawned child imports the module of the pool's initializer and of every
+task function by name, before anything has called ``django.setup()``.  This
+module therefore imports nothing from the apps at load time: the functions
+below import the real work lazily, once :func:`init_process` has set Django up.
+"""
+from __future__ import annotations
+
+from typing import Any, Optional
+
+import django
+
+
+def pool_initargs() -> tuple[str, str]:
+    """``initargs`` so that children use this process's database and media root.
+
+    They are the configured ones, except under the test runner, which
+    switches both.
+    """
+    from django.conf import settings
+    from django.db import connection
+
+    return str(connection.settings_dict['NAME']), str(settings.MEDIA_ROOT)
+
+
+def init_process(database_name: str, media_root: str) -> None:
+    # Процессы запускаются через spawn: чистый интерпретатор без унаследованных соединений с БД
+    from django.conf import settings
+
+    settings.DATABASES['default']['NAME'] = database_name
+    settings.MEDIA_ROOT = media_root
+    django.setup()
+
+
+def process_job(model_label: str, object_id: int) -> Optional[str]:
+    """Run one queued thumbnail job, see :func:`imaging.queue.process_job`."""
+    from .queue import process_job as run
+
+    return run(model_label, object_id)
+
+
+def render_thumbnail(*args: Any) -> Any:
+    """Write one backfilled thumbnail, see :func:`imaging.backfill.render_thumbnail`."""
+    from .backfill import render_thumbnail as run
+
+    return run(*args)
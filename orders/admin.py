@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem, ShippingAddress, Payment
+from .models import Order, OrderItem, ShippingAddress, Payment, StockReservation
 
 
 class OrderItemInline(admin.TabularInline):  # type: ignore[type-arg]
@@ -7,11 +7,23 @@ class OrderItemInline(admin.TabularInline):  # type: ignore[type-arg]
     extra = 0
 
 
+class StockReservationInline(admin.TabularInline):  # type: ignore[type-arg]
+    model = StockReservation
+    extra = 0
+    # Резервы меняются только через shop.inventory — вместе с остатками
+    readonly_fields = ("product", "quantity", "status", "expires_at", "created_at", "closed_at")
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None) -> bool:  # type: ignore[override]
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
-    list_display = ("id", "email", "status", "created_at")
+    list_display = ("id", "email", "status", "total_amount", "created_at")
     list_filter = ("status", "created_at")
-    inlines = [OrderItemInline]
+    readonly_fields = ("total_amount",)
+    inlines = [OrderItemInline, StockReservationInline]
 
 
 @admin.register(ShippingAddress)
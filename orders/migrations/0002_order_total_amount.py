@@ -0,0 +1,37 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:42
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_totals(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    items_sum = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .order_by().values('order')
+        .annotate(s=Sum(F('price') * F('quantity'), output_field=money))
+        .values('s')
+    )
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(items_sum, output_field=money), Value(Decimal(0)), output_field=money)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0'), editable=False, max_digits=12, verbose_name='Сумма'),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,30 @@
 from __future__ import annotations
 
 from decimal import Decimal
+from typing import Any
 from django.conf import settings
 from django.db import models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from shop.models import Product
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _line_total(prefix: str = '') -> Any:
+    return Sum(F(f'{prefix}price') * F(f'{prefix}quantity'), output_field=MONEY)
+
+
+class OrderQuerySet(models.QuerySet):  # type: ignore[type-arg]
+    def with_totals(self) -> 'OrderQuerySet':
+        """Annotate ``items_total``: Σ price × quantity of the items, computed by the database.
+
+        Useful for reports and for checking ``total_amount``; pages should
+        read the stored column instead.
+        """
+        return self.annotate(items_total=Coalesce(_line_total('items__'), Value(Decimal(0)), output_field=MONEY))
+
 
 class Order(models.Model):
     class Status(models.TextChoices):
@@ -20,28 +39,39 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.NEW, verbose_name=_("Статус"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Создан"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Обновлен"))
+    # Сумма позиций; поддерживается сигналами OrderItem и place_order(), сверяется with_totals()
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal(0), db_index=True, editable=False, verbose_name=_("Сумма"))
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-created_at", "-id"]
         verbose_name = _("Заказ")
         verbose_name_plural = _("Заказы")
+        indexes = [
+            # История заказов пользователя — диапазонное сканирование по индексу
+            models.Index(fields=['user', 'created_at']),
+        ]
 
     def __str__(self) -> str:
         return f"Заказ #{self.pk}"
 
     @property
     def total(self) -> Decimal:
-        items = getattr(self, 'items', None)
-        iterable: list[object]
-        if items is not None:
-            iterable = list(items.all())  # force to list for stable typing
-        else:
-            iterable = []
-        total = Decimal(0)
-        for it in iterable:
-            subtotal = getattr(it, 'subtotal', Decimal(0))
-            total += subtotal  # type: ignore[operator]
-        return total
+        return self.total_amount
+
+    @classmethod
+    def refresh_total(cls, order_id: Any) -> None:
+        """Recompute ``total_amount`` of one order in a single ``UPDATE``."""
+        items_sum = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by().values('order')
+            .annotate(s=_line_total())
+            .values('s')
+        )
+        cls.objects.filter(pk=order_id).update(
+            total_amount=Coalesce(Subquery(items_sum, output_field=MONEY), Value(Decimal(0)), output_field=MONEY)
+        )
 
 
 class OrderItem(models.Model):
@@ -101,3 +131,37 @@ class Payment(models.Model):
 
     def __str__(self) -> str:
         return f"Payment #{self.pk} ({self.status})"
+
+
+class StockReservation(models.Model):
+    """Stock held for an order; the ledger of every change made by checkout.
+
+    ``Product.stock`` is decremented when the reservation is created and
+    given back when it is released (order canceled or unpaid past
+    ``expires_at``); committed reservations stay sold.
+    """
+
+    class Status(models.TextChoices):
+        ACTIVE = "active", _("Активен")
+        COMMITTED = "committed", _("Списан")
+        RELEASED = "released", _("Снят")
+
+    order = models.ForeignKey(Order, related_name="reservations", on_delete=models.CASCADE, verbose_name=_("Заказ"))
+    product = models.ForeignKey(Product, related_name="reservations", on_delete=models.PROTECT, verbose_name=_("Товар"))
+    quantity = models.PositiveIntegerField(verbose_name=_("Количество"))
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE, verbose_name=_("Статус"))
+    # Пусто — резерв держится до отмены или оплаты заказа (наложенный платёж)
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Истекает"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Создан"))
+    closed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Закрыт"))
+
+    class Meta:
+        verbose_name = _("Резерв товара")
+        verbose_name_plural = _("Резервы товаров")
+        indexes = [
+            # Поиск просроченных резервов: status='active' AND expires_at < now
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_id} x{self.quantity} ({self.status})"
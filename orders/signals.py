@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shop.inventory import commit_reservations, release_reservations
+
+from .models import Order, OrderItem, Payment
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_total(sender, instance: OrderItem, **kwargs):
+    # bulk_create сигналов не шлёт — place_order() сам записывает сумму при создании заказа
+    Order.refresh_total(instance.order_id)
+
+
+@receiver(post_save, sender=Order)
+def settle_reservations(sender, instance: Order, **kwargs):
+    # Оба вызова идемпотентны: трогают только активные резервы
+    if instance.status == Order.Status.CANCELED:
+        release_reservations([instance.pk])
+    elif instance.status != Order.Status.NEW:
+        commit_reservations([instance.pk])
+
+
+@receiver(post_save, sender=Payment)
+def commit_paid_reservations(sender, instance: Payment, **kwargs):
+    if instance.status == Payment.Status.PAID:
+        commit_reservations([instance.order_id])
@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+
+from accounts.notifications import unread_count
+from shop.models import Product
+
+from .models import Order, OrderItem, Payment, ShippingAddress
+from .views import ORDER_DETAIL_QUERY_BUDGET, ORDER_LIST_QUERY_BUDGET, ORDERS_PER_PAGE, order_detail, order_list
+
+ORDERS = 60
+ITEMS_PER_ORDER = 8
+
+
+class OrderViewQueryTests(TestCase):
+    """Query budgets of the order pages must not grow with orders or items."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        User = get_user_model()
+        cls.customer = User.objects.create_user('customer', 'c@example.com', 'pw12345!x')
+        cls.other = User.objects.create_user('other', 'o@example.com', 'pw12345!x')
+        products = Product.objects.bulk_create([
+            Product(name=f'Товар {i}', slug=f'product-{i}', price=Decimal(i + 1)) for i in range(ITEMS_PER_ORDER)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(user=cls.customer, email='c@example.com', total_amount=Decimal(36)) for _ in range(ORDERS)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for order in orders for product in products
+        ])
+        ShippingAddress.objects.bulk_create([
+            ShippingAddress(order=order, full_name='Покупатель', city='Киев', address_line1='ул. 1') for order in orders
+        ])
+        Payment.objects.bulk_create([Payment(order=order, amount=Decimal(36)) for order in orders])
+        cls.order = orders[-1]
+
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        # Бейдж уведомлений в шапке берётся из кеша — прогреваем, чтобы считать только запросы страницы
+        unread_count(self.customer)
+
+    def get(self, view, *args, user=None, **params):
+        request = self.factory.get('/', params)
+        request.user = user or self.customer
+        return view(request, *args)
+
+    def test_order_list_pages(self) -> None:
+        with self.assertNumQueries(ORDER_LIST_QUERY_BUDGET):
+            first = self.get(order_list)
+        self.assertEqual(first.status_code, 200)
+        self.assertContains(first, 'Заказ #', count=ORDERS_PER_PAGE)
+
+        cursor = first.content.decode().split('?cursor=')[1].split('"')[0]
+        with self.assertNumQueries(ORDER_LIST_QUERY_BUDGET):
+            second = self.get(order_list, cursor=cursor)
+        self.assertContains(second, 'Заказ #', count=ORDERS_PER_PAGE)
+
+    def test_order_detail(self) -> None:
+        with self.assertNumQueries(ORDER_DETAIL_QUERY_BUDGET):
+            response = self.get(order_detail, self.order.pk)
+        self.assertEqual(response.status_code, 200)
+        for i in range(ITEMS_PER_ORDER):
+            self.assertContains(response, f'Товар {i}<')
+        self.assertContains(response, 'Покупатель')
+
+    def test_other_customers_order_is_not_found(self) -> None:
+        with self.assertRaises(Http404):
+            self.get(order_detail, self.order.pk, user=self.other)
+
+
+class OrderTotalTests(TestCase):
+    def setUp(self) -> None:
+        self.kettle = Product.objects.create(name='Чайник', slug='kettle', price=Decimal('10.50'))
+        self.mug = Product.objects.create(name='Кружка', slug='mug', price=Decimal('3.00'))
+        self.order = Order.objects.create(email='c@example.com')
+
+    def totals(self) -> dict[int, tuple[Decimal, Decimal]]:
+        return {o.pk: (o.total_amount, o.items_total) for o in Order.objects.with_totals()}
+
+    def test_item_changes_keep_stored_total(self) -> None:
+        empty = Order.objects.create(email='e@example.com')
+        item = OrderItem.objects.create(order=self.order, product=self.kettle, quantity=2, price=self.kettle.price)
+        OrderItem.objects.create(order=self.order, product=self.mug, quantity=3, price=self.mug.price)
+        self.assertEqual(self.totals(), {
+            self.order.pk: (Decimal('30.00'), Decimal('30.00')),
+            empty.pk: (Decimal(0), Decimal(0)),
+        })
+
+        item.quantity = 1
+        item.save()
+        self.assertEqual(self.totals()[self.order.pk], (Decimal('19.50'), Decimal('19.50')))
+        item.delete()
+        self.assertEqual(self.totals()[self.order.pk], (Decimal('9.00'), Decimal('9.00')))
+
+    def test_with_totals_reveals_drift(self) -> None:
+        # bulk_create сигналов не шлёт — расхождение видно по items_total
+        OrderItem.objects.bulk_create([OrderItem(order=self.order, product=self.kettle, quantity=1, price=self.kettle.price)])
+        self.assertEqual(self.totals()[self.order.pk], (Decimal(0), Decimal('10.50')))
+        Order.refresh_total(self.order.pk)
+        self.assertEqual(self.totals()[self.order.pk], (Decimal('10.50'), Decimal('10.50')))
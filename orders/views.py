@@ -1,16 +1,33 @@
 from django.contrib.auth.decorators import login_required
+from django.db.models import Prefetch
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpRequest, HttpResponse
-from .models import Order
+from blog.pagination import get_cursor_page
+from .models import Order, OrderItem
+
+ORDERS_PER_PAGE = 20
+
+# Запросы самого представления — без сессии, пользователя и бейджа уведомлений (он из кеша), см. orders/tests.py;
+# не зависят от числа заказов и позиций:
+# список — одна страница заказов; карточка — заказ с доставкой и оплатой (JOIN), позиции с товарами (JOIN)
+ORDER_LIST_QUERY_BUDGET = 1
+ORDER_DETAIL_QUERY_BUDGET = 2
 
 
 @login_required
 def order_list(request: HttpRequest) -> HttpResponse:
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'orders/order_list.html', {"orders": orders})
+    # Страницы по (created_at, id) — диапазон индекса (user, created_at) без OFFSET и COUNT(*)
+    page = get_cursor_page(request, Order.objects.filter(user=request.user), ORDERS_PER_PAGE)
+    return render(request, 'orders/order_list.html', {"orders": page, "page_obj": page})
 
 
 @login_required
 def order_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    order = get_object_or_404(Order, pk=pk, user=request.user)
+    order = get_object_or_404(
+        Order.objects.select_related('shipping', 'payment').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk'))
+        ),
+        pk=pk,
+        user=request.user,
+    )
     return render(request, 'orders/order_detail.html', {"order": order})
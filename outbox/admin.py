@@ -0,0 +1,18 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ("subject", "to", "status", "attempts", "run_after", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject", "to", "last_error")
+    readonly_fields = ("locked_by", "locked_at", "created_at", "sent_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Отправить повторно")
+    def retry_now(self, request, queryset):
+        queryset.exclude(status=OutgoingEmail.Status.SENT).update(
+            status=OutgoingEmail.Status.PENDING, attempts=0, run_after=timezone.now(), locked_by='', locked_at=None
+        )
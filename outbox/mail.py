@@ -0,0 +1,101 @@
+"""Outbound mail queue (transactional outbox).
+
+Views call :func:`enqueue_mail` instead of ``send_mail``: the message is stored
+as an :class:`~outbox.models.OutgoingEmail` row, ideally in the same
+transaction as the data it describes, so an order is never confirmed by mail
+without existing and SMTP latency never lands on a response.
+``manage.py send_outbox`` claims due messages in batches and sends each batch
+over one reused connection of ``EMAIL_BACKEND``, retrying failures with
+exponential backoff.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from website.queues import claim_rows, release_failed
+
+from .models import OutgoingEmail
+
+MAX_ATTEMPTS = 6
+RETRY_DELAY = timedelta(minutes=1)
+# Письмо «Отправляется» дольше этого срока считаем брошенным упавшим воркером
+STALE_AFTER = timedelta(minutes=15)
+
+
+def enqueue_mail(subject: str, body: str, to: Iterable[str], from_email: Optional[str] = None) -> OutgoingEmail:
+    """Queue a plain-text message for ``manage.py send_outbox``."""
+    return OutgoingEmail.objects.create(
+        subject=subject[:255], body=body, from_email=from_email or '', to=', '.join(to)
+    )
+
+
+def claim_messages(limit: int) -> list[OutgoingEmail]:
+    """Atomically take up to ``limit`` due messages for this worker, see :func:`website.queues.claim_rows`."""
+    return claim_rows(
+        OutgoingEmail.objects.all(), limit,
+        pending=OutgoingEmail.Status.PENDING, running=OutgoingEmail.Status.SENDING, stale_after=STALE_AFTER,
+    )
+
+
+def mark_sent(messages: list[OutgoingEmail]) -> None:
+    if messages:
+        # Только свои: письмо, перехваченное другим воркером после STALE_AFTER, отмечает он
+        tokens = {m.locked_by for m in messages}
+        OutgoingEmail.objects.filter(pk__in=[m.pk for m in messages], locked_by__in=tokens).update(
+            status=OutgoingEmail.Status.SENT, sent_at=timezone.now(), locked_by='', locked_at=None, last_error=''
+        )
+
+
+def mark_failed(message: OutgoingEmail, error: str) -> None:
+    """Schedule a retry with exponential backoff, or give up after ``MAX_ATTEMPTS``."""
+    release_failed(
+        message, error,
+        pending=OutgoingEmail.Status.PENDING, failed=OutgoingEmail.Status.FAILED,
+        max_attempts=MAX_ATTEMPTS, retry_delay=RETRY_DELAY,
+    )
+
+
+@dataclass
+class BatchResult:
+    sent: int = 0
+    failed: int = 0
+
+
+def send_batch(messages: list[OutgoingEmail], backend: Optional[str] = None) -> BatchResult:
+    """Send ``messages`` over a single connection and record the outcome of each."""
+    result = BatchResult()
+    if not messages:
+        return result
+    sent: list[OutgoingEmail] = []
+    connection = get_connection(backend)
+    try:
+        connection.open()
+    except Exception as e:  # noqa: BLE001 — сервер недоступен: весь пакет уходит на повтор
+        for message in messages:
+            mark_failed(message, f"{type(e).__name__}: {e}")
+        result.failed = len(messages)
+        return result
+    try:
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, message.from_email or None, message.recipients, connection=connection
+            )
+            try:
+                email.send()
+            except Exception as e:  # noqa: BLE001 — ошибку письма записываем, остальные отправляем
+                mark_failed(message, f"{type(e).__name__}: {e}")
+                result.failed += 1
+            else:
+                sent.append(message)
+    finally:
+        connection.close()
+        # Отметка одним UPDATE на пакет: при падении воркера посреди пакета часть писем
+        # уйдёт повторно (доставка «хотя бы один раз»)
+        mark_sent(sent)
+    result.sent = len(sent)
+    return result
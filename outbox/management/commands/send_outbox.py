@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.mail import claim_messages, send_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued outgoing email in batches over one connection per batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages sent per connection')
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the outbox is drained')
+        parser.add_argument(
+            '--backend',
+            help='Email backend to use instead of EMAIL_BACKEND, '
+                 'e.g. django.core.mail.backends.console.EmailBackend',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        sent = failed = 0
+        try:
+            while True:
+                messages = claim_messages(batch_size)
+                if not messages:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                result = send_batch(messages, options['backend'])
+                sent += result.sent
+                failed += result.failed
+                if result.failed:
+                    self.stderr.write(self.style.ERROR(f"{result.failed} of {len(messages)} messages failed, will retry"))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping…")
+        self.stdout.write(self.style.SUCCESS(f"Emails sent: {sent}, failed: {failed}"))
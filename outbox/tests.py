@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .mail import MAX_ATTEMPTS, RETRY_DELAY, STALE_AFTER, claim_messages, enqueue_mail, send_batch
+from .models import OutgoingEmail
+
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+class BouncingBackend(EmailBackend):
+    """locmem, but the transport refuses messages to ``bounce@`` addresses."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.to:
+                raise ConnectionError('550 mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class UnreachableBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('connection refused')
+
+
+@override_settings(EMAIL_BACKEND=LOCMEM)
+class OutboxTests(TestCase):
+    def enqueue(self, *recipients: str) -> list[OutgoingEmail]:
+        return [enqueue_mail(f'Письмо {to}', 'Текст', [to]) for to in recipients]
+
+    def state(self, message: OutgoingEmail) -> tuple[str, int]:
+        message.refresh_from_db()
+        return message.status, message.attempts
+
+    def make_due(self, *messages: OutgoingEmail) -> None:
+        OutgoingEmail.objects.filter(pk__in=[m.pk for m in messages]).update(run_after=timezone.now())
+
+    def test_batch_is_sent(self) -> None:
+        first, second = self.enqueue('a@example.com', 'b@example.com')
+        result = send_batch(claim_messages(10))
+
+        self.assertEqual((result.sent, result.failed), (2, 0))
+        self.assertEqual([m.to for m in mail.outbox], [['a@example.com'], ['b@example.com']])
+        self.assertEqual(self.state(first), (OutgoingEmail.Status.SENT, 1))
+        self.assertIsNotNone(first.sent_at)
+        self.assertEqual(first.locked_by, '')
+        self.assertEqual(claim_messages(10), [])
+
+    def test_transport_error_is_retried_with_backoff(self) -> None:
+        ok, bounced = self.enqueue('a@example.com', 'bounce@example.com')
+        before = timezone.now()
+        result = send_batch(claim_messages(10), 'outbox.tests.BouncingBackend')
+
+        # Ошибка одного письма не мешает остальным в пакете
+        self.assertEqual((result.sent, result.failed), (1, 1))
+        self.assertEqual(self.state(ok), (OutgoingEmail.Status.SENT, 1))
+        self.assertEqual(self.state(bounced), (OutgoingEmail.Status.PENDING, 1))
+        self.assertIn('550 mailbox unavailable', bounced.last_error)
+        self.assertGreaterEqual(bounced.run_after, before + RETRY_DELAY)
+        # До срока повтора письмо не берётся
+        self.assertEqual(claim_messages(10), [])
+
+        self.make_due(bounced)
+        before = timezone.now()
+        send_batch(claim_messages(10), 'outbox.tests.BouncingBackend')
+        self.assertEqual(self.state(bounced), (OutgoingEmail.Status.PENDING, 2))
+        self.assertGreaterEqual(bounced.run_after, before + RETRY_DELAY * 2)
+
+        self.make_due(bounced)
+        send_batch(claim_messages(10))
+        self.assertEqual(self.state(bounced), (OutgoingEmail.Status.SENT, 3))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_unreachable_server_retries_whole_batch(self) -> None:
+        messages = self.enqueue('a@example.com', 'b@example.com')
+        result = send_batch(claim_messages(10), 'outbox.tests.UnreachableBackend')
+
+        self.assertEqual((result.sent, result.failed), (0, 2))
+        for message in messages:
+            self.assertEqual(self.state(message), (OutgoingEmail.Status.PENDING, 1))
+            self.assertIn('ConnectionRefusedError', message.last_error)
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        message, = self.enqueue('bounce@example.com')
+        OutgoingEmail.objects.filter(pk=message.pk).update(attempts=MAX_ATTEMPTS - 1)
+        send_batch(claim_messages(10), 'outbox.tests.BouncingBackend')
+
+        self.assertEqual(self.state(message), (OutgoingEmail.Status.FAILED, MAX_ATTEMPTS))
+        self.make_due(message)
+        self.assertEqual(claim_messages(10), [])
+
+    def test_overlapping_claims_do_not_send_twice(self) -> None:
+        self.enqueue(*(f'user{i}@example.com' for i in range(5)))
+        first = claim_messages(3)
+        second = claim_messages(10)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertNotEqual(first[0].locked_by, second[0].locked_by)
+
+        send_batch(second)
+        send_batch(first)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'user{i}@example.com' for i in range(5)])
+        self.assertEqual(claim_messages(10), [])
+
+    def test_late_result_of_stale_claim_is_ignored(self) -> None:
+        message, = self.enqueue('a@example.com')
+        abandoned, = claim_messages(10)
+        OutgoingEmail.objects.filter(pk=message.pk).update(locked_at=timezone.now() - STALE_AFTER - timedelta(seconds=1))
+        reclaimed, = claim_messages(10)
+        self.assertEqual(reclaimed.attempts, 2)
+
+        # Брошенный воркер очнулся и отчитался — письмо остаётся за новым владельцем
+        send_batch([abandoned], 'outbox.tests.BouncingBackend')
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.locked_by), (OutgoingEmail.Status.SENDING, reclaimed.locked_by))
+
+        send_batch([reclaimed])
+        self.assertEqual(self.state(message), (OutgoingEmail.Status.SENT, 2))
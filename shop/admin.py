@@ -1,13 +1,49 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from .forms import StockAdjustmentForm
+from .inventory import adjust_stock
 from .models import Product
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
-    list_display = ("name", "price", "is_active", "created_at")
+    list_display = ("name", "price", "stock", "is_active", "created_at")
     prepopulated_fields = {"slug": ("name",)}
     list_filter = ("is_active",)
     search_fields = ("name",)
+    actions = ["adjust_stock_action"]
+
+    def get_readonly_fields(self, request, obj=None):  # type: ignore[override]
+        # Остаток существующего товара меняется только действием «Изменить остаток»:
+        # форма, открытая до чужого заказа, иначе записала бы устаревшее значение
+        if obj is not None:
+            return (*super().get_readonly_fields(request, obj), "stock")
+        return super().get_readonly_fields(request, obj)
+
+    @admin.action(description="Изменить остаток")
+    def adjust_stock_action(self, request, queryset):
+        if "apply" in request.POST:
+            form = StockAdjustmentForm(request.POST)
+            if form.is_valid():
+                selected = list(queryset.values_list("pk", flat=True))
+                changed = adjust_stock(selected, form.cleaned_data["delta"])
+                message = f"Остаток изменён у товаров: {changed}"
+                if changed < len(selected):
+                    message += f", пропущено {len(selected) - changed} (списание больше остатка)"
+                self.message_user(request, message)
+                return None
+        else:
+            form = StockAdjustmentForm()
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Изменить остаток",
+            "opts": self.model._meta,
+            "form": form,
+            "queryset": queryset,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, "admin/shop/product/adjust_stock.html", context)
 
 
  # Order models are managed in orders/admin.py
@@ -0,0 +1,181 @@
+"""Shopping cart pricing on top of a cached product map.
+
+Where the cart is kept between requests is up to :mod:`shop.cart_stores`;
+views get the request's cart with :func:`get_cart`.
+
+Cart pages and the AJAX cart endpoints only need a product's name, price,
+availability and thumbnail.  These are cached per product as a small
+:class:`ProductInfo` under keys that embed a catalogue version; saving or
+deleting any ``Product`` bumps the version (see :mod:`shop.signals`), so
+cart mutations touch the database only on a cache miss.
+
+The bump reaches only the cache of the process that saved the product unless
+``CACHES`` points at a shared backend, so entries live for a short
+:data:`PRODUCT_CACHE_TIMEOUT` only and the checkout confirmation page prices
+the cart with ``summary(fresh=True)`` straight from the database.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from .cart_stores import get_cart_store
+from .models import Product
+
+# Без общего кеша (LocMem) версия сбрасывается только в процессе, сохранившем товар:
+# остальные процессы показывают старую цену не дольше этого срока
+PRODUCT_CACHE_TIMEOUT = 60
+PRODUCTS_VERSION_KEY = 'shop:products:version'
+# Отметка «товара нет в БД»: несуществующие id тоже не должны каждый раз идти в базу
+_MISSING = 'missing'
+
+
+@dataclass(frozen=True)
+class ProductInfo:
+    id: int
+    name: str
+    slug: str
+    price: Decimal
+    is_active: bool
+    thumbnail_url: str
+
+
+@dataclass
+class CartLine:
+    product: ProductInfo
+    qty: int
+    subtotal: Decimal
+
+
+@dataclass
+class CartSummary:
+    lines: list[CartLine]
+    total: Decimal
+    count: int
+
+    def line(self, product_id: int) -> Optional[CartLine]:
+        return next((line for line in self.lines if line.product.id == product_id), None)
+
+
+def products_version() -> int:
+    version = cache.get(PRODUCTS_VERSION_KEY)
+    if version is None:
+        # Начинаем с текущего времени, а не с 1: вытесненная версия не оживит старые записи
+        version = time.time_ns()
+        cache.set(PRODUCTS_VERSION_KEY, version, None)
+    return version
+
+
+def bump_products() -> None:
+    """Invalidate every cached :class:`ProductInfo`."""
+    try:
+        cache.incr(PRODUCTS_VERSION_KEY)
+    except ValueError:
+        cache.set(PRODUCTS_VERSION_KEY, time.time_ns(), None)
+
+
+def _info_from_product(product: Product) -> ProductInfo:
+    return ProductInfo(
+        id=product.pk,
+        name=product.name,
+        slug=product.slug,
+        price=product.price,
+        is_active=product.is_active,
+        thumbnail_url=product.thumbnail.url if product.thumbnail else '',
+    )
+
+
+def get_product_infos(product_ids: Iterable[int], *, fresh: bool = False) -> dict[int, ProductInfo]:
+    """Return :class:`ProductInfo` of existing products among ``product_ids``.
+
+    One ``get_many`` from the cache; missing entries are loaded with a single
+    query over the needed columns only (no ``description``).  ``fresh`` skips
+    the cache read and loads every product, refreshing the cached entries.
+    """
+    version = products_version()
+    keys = {pk: f'shop:product:{version}:{pk}' for pk in set(product_ids)}
+    if not keys:
+        return {}
+    found = {} if fresh else cache.get_many(list(keys.values()))
+    infos: dict[int, ProductInfo] = {}
+    missing: list[int] = []
+    for pk, key in keys.items():
+        if key not in found:
+            missing.append(pk)
+        elif found[key] != _MISSING:
+            infos[pk] = found[key]
+    if missing:
+        rows = Product.objects.filter(pk__in=missing).only('id', 'name', 'slug', 'price', 'is_active', 'thumbnail')
+        loaded = {p.pk: _info_from_product(p) for p in rows}
+        cache.set_many({keys[pk]: loaded.get(pk, _MISSING) for pk in missing}, PRODUCT_CACHE_TIMEOUT)
+        infos.update(loaded)
+    return infos
+
+
+class CartService:
+    """Change and price a cart; ``modified`` tells the middleware to store it."""
+
+    def __init__(self, items: Optional[dict[int, int]] = None) -> None:
+        self.items: dict[int, int] = dict(items or {})
+        self.modified = False
+
+    def save(self) -> None:
+        self.modified = True
+
+    def add(self, product_id: int, qty: int = 1) -> bool:
+        """Add ``qty`` of an active product; ``False`` if it is unavailable."""
+        info = get_product_infos([product_id]).get(product_id)
+        if info is None or not info.is_active:
+            return False
+        self.items[product_id] = self.items.get(product_id, 0) + max(1, qty)
+        self.save()
+        return True
+
+    def update(self, product_id: int, qty: int) -> None:
+        if qty <= 0:
+            self.items.pop(product_id, None)
+        else:
+            self.items[product_id] = qty
+        self.save()
+
+    def remove(self, product_id: int) -> None:
+        self.items.pop(product_id, None)
+        self.save()
+
+    def clear(self) -> None:
+        self.items = {}
+        self.save()
+
+    @property
+    def count(self) -> int:
+        return sum(self.items.values())
+
+    def summary(self, *, fresh: bool = False) -> CartSummary:
+        """Price the cart; unavailable products are left out.
+
+        ``fresh`` takes prices from the database, see :func:`get_product_infos`.
+        """
+        infos = get_product_infos(self.items, fresh=fresh)
+        lines: list[CartLine] = []
+        total = Decimal(0)
+        for product_id, qty in self.items.items():
+            info = infos.get(product_id)
+            if info is None or not info.is_active:
+                continue
+            subtotal = info.price * qty
+            total += subtotal
+            lines.append(CartLine(info, qty, subtotal))
+        return CartSummary(lines, total, sum(line.qty for line in lines))
+
+
+def get_cart(request: HttpRequest) -> CartService:
+    """The request's cart, loaded from the configured store once per request."""
+    cart = getattr(request, '_cart', None)
+    if cart is None:
+        cart = request._cart = CartService(get_cart_store().load(request))  # type: ignore[attr-defined]
+    return cart
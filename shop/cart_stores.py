@@ -0,0 +1,143 @@
+"""Where carts live between requests.
+
+The backend is chosen by the ``CART_STORE`` setting:
+
+* :class:`SessionCartStore` — ``request.session`` as before; every cart change
+  is a session ``UPDATE`` with the database session backend;
+* :class:`CookieCartStore` (default) — the cart itself in a compact signed
+  cookie (``"12:1,7:3"``); no server-side writes at all;
+* :class:`CacheCartStore` — the cart in the cache under a random id kept in a
+  signed cookie, or under the user id once logged in.  Needs a cache shared by
+  all workers (Redis, Memcached) in production.
+
+:class:`shop.middleware.CartMiddleware` persists a changed cart once per
+response; :func:`merge_on_login` runs on ``user_logged_in``.
+"""
+from __future__ import annotations
+
+import secrets
+from functools import lru_cache
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.utils.module_loading import import_string
+
+DEFAULT_STORE = 'shop.cart_stores.CookieCartStore'
+CART_SESSION_KEY = 'cart_items'
+CART_COOKIE_NAME = 'cart'
+CART_ID_COOKIE_NAME = 'cart_id'
+CART_COOKIE_SALT = 'shop.cart'
+CART_MAX_AGE = 60 * 60 * 24 * 30
+# Ограничение размера: подписанная cookie должна укладываться в 4 КБ
+MAX_LINES = 100
+MAX_QTY = 999
+
+
+def merge_items(*carts: dict[int, int]) -> dict[int, int]:
+    """Sum quantities of several carts."""
+    merged: dict[int, int] = {}
+    for cart in carts:
+        for product_id, qty in cart.items():
+            merged[product_id] = min(MAX_QTY, merged.get(product_id, 0) + qty)
+    return merged
+
+
+def clean_items(raw: Any) -> dict[int, int]:
+    """Coerce stored data to ``{product_id: qty}``; garbage yields an empty cart."""
+    try:
+        items = {int(k): int(v) for k, v in dict(raw or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+    return {k: min(v, MAX_QTY) for k, v in list(items.items())[:MAX_LINES] if v > 0}
+
+
+class BaseCartStore:
+    def load(self, request: HttpRequest) -> dict[int, int]:
+        raise NotImplementedError
+
+    def save(self, request: HttpRequest, response: HttpResponse, items: dict[int, int]) -> None:
+        raise NotImplementedError
+
+    def merge_on_login(self, request: HttpRequest, user: Any) -> None:
+        """Combine the anonymous cart with one stored for ``user``, if the backend keeps such."""
+
+
+class SessionCartStore(BaseCartStore):
+    def load(self, request: HttpRequest) -> dict[int, int]:
+        return clean_items(request.session.get(CART_SESSION_KEY))
+
+    def save(self, request: HttpRequest, response: HttpResponse, items: dict[int, int]) -> None:
+        # Ключи — строки: сессия сериализуется в JSON
+        request.session[CART_SESSION_KEY] = {str(k): v for k, v in items.items()}
+
+
+class CookieCartStore(BaseCartStore):
+    def load(self, request: HttpRequest) -> dict[int, int]:
+        value = request.get_signed_cookie(CART_COOKIE_NAME, default='', salt=CART_COOKIE_SALT, max_age=CART_MAX_AGE)
+        if not value:
+            return {}
+        return clean_items(pair.split(':', 1) for pair in value.split(','))
+
+    def save(self, request: HttpRequest, response: HttpResponse, items: dict[int, int]) -> None:
+        if not items:
+            response.delete_cookie(CART_COOKIE_NAME, samesite='Lax')
+            return
+        value = ','.join(f'{k}:{v}' for k, v in clean_items(items).items())
+        response.set_signed_cookie(
+            CART_COOKIE_NAME, value, salt=CART_COOKIE_SALT, max_age=CART_MAX_AGE,
+            httponly=True, samesite='Lax', secure=request.is_secure(),
+        )
+
+
+class CacheCartStore(BaseCartStore):
+    def _anonymous_id(self, request: HttpRequest) -> Optional[str]:
+        return request.get_signed_cookie(CART_ID_COOKIE_NAME, default=None, salt=CART_COOKIE_SALT) or None
+
+    def _key(self, request: HttpRequest) -> Optional[str]:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'shop:cart:user:{user.pk}'
+        cart_id = self._anonymous_id(request)
+        return f'shop:cart:anon:{cart_id}' if cart_id else None
+
+    def load(self, request: HttpRequest) -> dict[int, int]:
+        key = self._key(request)
+        return clean_items(cache.get(key)) if key else {}
+
+    def save(self, request: HttpRequest, response: HttpResponse, items: dict[int, int]) -> None:
+        key = self._key(request)
+        if key is None:
+            if not items:
+                return
+            cart_id = secrets.token_urlsafe(16)
+            response.set_signed_cookie(
+                CART_ID_COOKIE_NAME, cart_id, salt=CART_COOKIE_SALT, max_age=CART_MAX_AGE,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+            key = f'shop:cart:anon:{cart_id}'
+        if items:
+            cache.set(key, items, CART_MAX_AGE)
+        else:
+            cache.delete(key)
+
+    def merge_on_login(self, request: HttpRequest, user: Any) -> None:
+        cart_id = self._anonymous_id(request)
+        if not cart_id:
+            return
+        anon_key, user_key = f'shop:cart:anon:{cart_id}', f'shop:cart:user:{user.pk}'
+        found = cache.get_many([anon_key, user_key])
+        anonymous = clean_items(found.get(anon_key))
+        if anonymous:
+            cache.set(user_key, merge_items(clean_items(found.get(user_key)), anonymous), CART_MAX_AGE)
+            cache.delete(anon_key)
+
+
+@lru_cache(maxsize=None)
+def _load_store(path: str) -> BaseCartStore:
+    return import_string(path)()
+
+
+def get_cart_store() -> BaseCartStore:
+    return _load_store(getattr(settings, 'CART_STORE', DEFAULT_STORE))
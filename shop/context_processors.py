@@ -1,14 +1,12 @@
 from typing import Dict, Any
 
-CART_SESSION_KEY = 'cart_items'
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart
 
 
 def cart_context(request) -> Dict[str, Any]:
-    cart = request.session.get(CART_SESSION_KEY, {}) or {}
-    try:
-        count = sum(int(qty) for qty in cart.values())
-    except Exception:
-        count = 0
+    # Корзина читается, только если шаблон действительно показывает счётчик
     return {
-        'cart_item_count': count,
+        'cart_item_count': SimpleLazyObject(lambda: get_cart(request).count),
     }
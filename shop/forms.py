@@ -0,0 +1,19 @@
+from django import forms
+
+
+class ProductFilterForm(forms.Form):
+    """Фильтры каталога из GET-параметров"""
+    q = forms.CharField(required=False, max_length=100, label='Поиск')
+    min_price = forms.DecimalField(required=False, min_value=0, decimal_places=2, label='Цена от')
+    max_price = forms.DecimalField(required=False, min_value=0, decimal_places=2, label='Цена до')
+
+
+class StockAdjustmentForm(forms.Form):
+    """Приход или списание для выбранных в админке товаров"""
+    delta = forms.IntegerField(label='Изменение остатка', help_text='Приход — положительное число, списание — отрицательное')
+
+    def clean_delta(self) -> int:
+        delta = self.cleaned_data['delta']
+        if delta == 0:
+            raise forms.ValidationError('Укажите ненулевое количество')
+        return delta
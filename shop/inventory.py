@@ -0,0 +1,136 @@
+"""Stock reservations without read-modify-write races.
+
+Stock never goes through Python arithmetic: checkout takes it with one
+conditional ``UPDATE ... SET stock = stock - n WHERE stock >= n`` for all
+lines at once and fails if any row did not match, releases add it back with
+``stock = stock + n``.  Each change is recorded as an
+:class:`~orders.models.StockReservation`.  Products with ``stock`` left empty
+are not tracked.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from orders.models import Order, StockReservation
+
+from .models import Product
+
+# Сколько держим товар за неоплаченным заказом с оплатой картой
+RESERVATION_TTL = timedelta(minutes=30)
+
+
+class OutOfStock(Exception):
+    """Not enough stock left for one of the lines."""
+
+
+def _per_product(quantities: dict[int, int]) -> Case:
+    return Case(
+        *(When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(
+    order: Order, lines: dict[int, int], products: Iterable[Product], expires_at: Optional[Any] = None
+) -> list[StockReservation]:
+    """Take stock for ``lines`` (``{product_id: qty}``) and record the reservations.
+
+    Must run inside the checkout transaction: on :class:`OutOfStock` nothing
+    has been taken.  Two queries regardless of the number of lines.
+    """
+    tracked = {p.pk: lines[p.pk] for p in products if p.stock is not None}
+    if not tracked:
+        return []
+    need = _per_product(tracked)
+    # Условие и вычитание — в одном UPDATE: параллельный заказ не может прочитать
+    # тот же остаток и тоже его потратить
+    taken = Product.objects.filter(pk__in=tracked, stock__gte=need).update(stock=F('stock') - need)
+    if taken != len(tracked):
+        raise OutOfStock
+    reservations = [
+        StockReservation(order=order, product_id=pk, quantity=qty, expires_at=expires_at)
+        for pk, qty in tracked.items()
+    ]
+    StockReservation.objects.bulk_create(reservations)
+    return reservations
+
+
+def release_reservations(order_ids: Iterable[Any]) -> int:
+    """Give back the stock of active reservations of ``order_ids``; returns units released.
+
+    Safe to call repeatedly and concurrently: only reservations this call
+    switched from active to released are returned to stock.
+    """
+    with transaction.atomic():
+        rows = list(
+            StockReservation.objects.select_for_update()
+            .filter(order_id__in=list(order_ids), status=StockReservation.Status.ACTIVE)
+            .values_list('pk', 'product_id', 'quantity')
+        )
+        if not rows:
+            return 0
+        released = StockReservation.objects.filter(
+            pk__in=[pk for pk, _, _ in rows], status=StockReservation.Status.ACTIVE
+        ).update(status=StockReservation.Status.RELEASED, closed_at=timezone.now())
+        if released != len(rows):
+            # Кто-то успел закрыть часть резервов между чтением и UPDATE — откатываемся
+            # и оставляем возврат ему (на SQLite/PostgreSQL с блокировкой строк не случается)
+            transaction.set_rollback(True)
+            return 0
+        quantities: dict[int, int] = defaultdict(int)
+        for _, product_id, qty in rows:
+            quantities[product_id] += qty
+        give_back = _per_product(quantities)
+        Product.objects.filter(pk__in=quantities, stock__isnull=False).update(stock=F('stock') + give_back)
+    return sum(quantities.values())
+
+
+def commit_reservations(order_ids: Iterable[Any]) -> int:
+    """Mark active reservations as sold; the stock is already taken."""
+    return StockReservation.objects.filter(
+        order_id__in=list(order_ids), status=StockReservation.Status.ACTIVE
+    ).update(status=StockReservation.Status.COMMITTED, closed_at=timezone.now())
+
+
+def adjust_stock(product_ids: Iterable[Any], delta: int) -> int:
+    """Add ``delta`` units to each product (negative to write off); returns products changed.
+
+    One ``UPDATE ... SET stock = stock + delta``.  A write-off never takes
+    stock below zero: such products are skipped.  Untracked products start
+    being tracked at ``delta``.
+    """
+    products = Product.objects.filter(pk__in=list(product_ids))
+    if delta < 0:
+        products = products.filter(stock__gte=-delta)
+    return products.update(stock=Coalesce(F('stock'), 0) + delta, updated_at=timezone.now())
+
+
+def release_expired(now: Optional[Any] = None) -> tuple[int, int]:
+    """Cancel new orders whose reservations expired and return their stock.
+
+    Returns ``(orders canceled, units released)``.
+    """
+    now = now or timezone.now()
+    order_ids = list(
+        StockReservation.objects.filter(status=StockReservation.Status.ACTIVE, expires_at__lt=now)
+        .values_list('order_id', flat=True).distinct()
+    )
+    if not order_ids:
+        return 0, 0
+    with transaction.atomic():
+        # Оплаченный тем временем заказ не отменяем — у него резервы уже списаны
+        canceled = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids, status=Order.Status.NEW)
+            .values_list('pk', flat=True)
+        )
+        Order.objects.filter(pk__in=canceled).update(status=Order.Status.CANCELED, updated_at=now)
+        units = release_reservations(canceled)
+    return len(canceled), units
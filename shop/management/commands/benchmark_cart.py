@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import Product
+
+STORES = {
+    'session': 'shop.cart_stores.SessionCartStore',
+    'cookie': 'shop.cart_stores.CookieCartStore',
+    'cache': 'shop.cart_stores.CacheCartStore',
+}
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def _browse(client: Client, products: list[Product]) -> int:
+    """Типичная сессия покупателя: каталог, карточки, добавление, изменение, удаление. Возвращает число запросов"""
+    ajax = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+    requests = 0
+    for product in products:
+        client.get(reverse('shop:product-list'))
+        client.get(reverse('shop:product-detail', args=[product.slug]))
+        client.post(reverse('shop:cart-add', args=[product.pk]), {'qty': 1})
+        requests += 3
+    for product in products:
+        client.post(reverse('shop:cart-update', args=[product.pk]), {'qty': 2}, **ajax)
+        client.get(reverse('shop:cart'))
+        requests += 2
+    client.post(reverse('shop:cart-remove', args=[products[0].pk]), **ajax)
+    client.get(reverse('shop:cart'))
+    return requests + 2
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает хранилища корзины (CART_STORE) по числу записей в БД за типичную сессию покупателя'
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument('--products', type=int, default=5, help='Сколько товаров положить в корзину')
+        parser.add_argument('--store', action='append', choices=STORES, dest='stores',
+                            help='Проверить только это хранилище (можно повторять)')
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(is_active=True).order_by('pk')[:max(1, options['products'])])
+        if not products:
+            raise CommandError('Нет активных товаров: сначала выполните manage.py seed_shop')
+        self.stdout.write(f"{len(products)} товаров в корзине")
+        for name in options['stores'] or list(STORES):
+            # Всё, что запишет прогон (сессии, заказы не создаются), откатываем
+            with override_settings(CART_STORE=STORES[name], ALLOWED_HOSTS=['*']), transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    requests = _browse(Client(), products)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            sql = [q['sql'].lstrip().upper() for q in ctx.captured_queries]
+            writes = sum(1 for q in sql if q.startswith(WRITE_PREFIXES))
+            self.stdout.write(
+                f"{name:>8}: {requests} запросов, {len(sql)} SQL, из них записей {writes}, "
+                f"{elapsed / requests * 1000:.1f} мс/запрос"
+            )
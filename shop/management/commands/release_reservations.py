@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Отменяет неоплаченные заказы с истёкшим резервом и возвращает товар на склад (запускать по cron)'
+
+    def handle(self, *args, **options):
+        orders, units = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Отменено заказов: {orders}, возвращено на склад: {units} шт.'))
@@ -0,0 +1,100 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.db.models import Sum
+
+from orders.models import Order, StockReservation
+from shop.models import Product
+from shop.services import CheckoutError, place_order
+
+# SQLite отвечает «database is locked», когда две транзакции одновременно
+# пытаются писать, — такой заказ просто повторяем
+MAX_RETRIES = 50
+
+
+@dataclass
+class Outcome:
+    order_id: int = 0
+    rejected: bool = False
+    retries: int = 0
+    error: str = ''
+
+
+def _checkout(product_id: int, qty: int) -> Outcome:
+    outcome = Outcome()
+    try:
+        while True:
+            try:
+                placed = place_order({product_id: qty})
+            except CheckoutError:
+                outcome.rejected = True
+                return outcome
+            except OperationalError as e:
+                if outcome.retries >= MAX_RETRIES:
+                    outcome.error = str(e)
+                    return outcome
+                outcome.retries += 1
+                time.sleep(0.005 * outcome.retries)
+                continue
+            outcome.order_id = placed.order.pk
+            return outcome
+    finally:
+        # У каждого потока своё соединение Django
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Параллельные оформления заказа одного товара: проверяет, что остаток не уходит в минус. '
+            'Нужна файловая SQLite или PostgreSQL (не :memory:)')
+
+    def add_arguments(self, parser) -> None:  # type: ignore[override]
+        parser.add_argument('--threads', type=int, default=8, help='Параллельных покупателей')
+        parser.add_argument('--orders', type=int, default=100, help='Сколько заказов попытаться оформить')
+        parser.add_argument('--stock', type=int, default=30, help='Начальный остаток тестового товара')
+        parser.add_argument('--qty', type=int, default=1, help='Штук в одном заказе')
+        parser.add_argument('--keep', action='store_true', help='Не удалять тестовый товар и заказы')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('In-memory SQLite не разделяется между потоками — укажите файловую БД')
+        stock, qty = options['stock'], max(1, options['qty'])
+        product = Product.objects.create(
+            name='Stress test', slug=f'stress-{uuid.uuid4().hex[:12]}', price=Decimal('1.00'), stock=stock,
+        )
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['threads'])) as pool:
+            outcomes = list(pool.map(lambda _: _checkout(product.pk, qty), range(options['orders'])))
+        elapsed = time.perf_counter() - started
+        connections.close_all()
+
+        try:
+            placed = [o.order_id for o in outcomes if o.order_id]
+            product.refresh_from_db()
+            reserved = StockReservation.objects.filter(product=product).aggregate(s=Sum('quantity'))['s'] or 0
+            self.stdout.write(
+                f"{len(outcomes)} попыток за {elapsed:.2f} с: оформлено {len(placed)}, "
+                f"отказ по остатку {sum(o.rejected for o in outcomes)}, "
+                f"ошибок {sum(bool(o.error) for o in outcomes)}, повторов {sum(o.retries for o in outcomes)}"
+            )
+            self.stdout.write(f"Остаток: {stock} → {product.stock}, в резервах {reserved}")
+            problems = []
+            if product.stock is None or product.stock < 0:
+                problems.append('остаток отрицательный')
+            if product.stock != stock - len(placed) * qty:
+                problems.append('остаток не сходится с числом заказов')
+            if reserved != len(placed) * qty:
+                problems.append('резервы не сходятся с числом заказов')
+            if len(placed) * qty > stock:
+                problems.append('продано больше, чем было на складе')
+            if problems:
+                raise CommandError('; '.join(problems))
+            self.stdout.write(self.style.SUCCESS('Перепродаж нет, остаток и резервы сходятся'))
+        finally:
+            if not options['keep']:
+                Order.objects.filter(pk__in=[o.order_id for o in outcomes if o.order_id]).delete()
+                product.delete()
@@ -0,0 +1,20 @@
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+
+from .cart_stores import get_cart_store
+
+
+class CartMiddleware:
+    """Store the request's cart once, after the view, and only if it changed."""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        response = self.get_response(request)
+        # Корзину, которую никто не загрузил, не читаем и не пишем
+        cart = request.__dict__.get('_cart')
+        if cart is not None and cart.modified:
+            get_cart_store().save(request, response, cart.items)
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:47
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    batch = []
+    for product in Product.objects.only('id', 'description').iterator(chunk_size=500):
+        product.excerpt = Truncator(product.description).chars(120)
+        batch.append(product)
+        if len(batch) >= 500:
+            Product.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_remove_orderitem_order_remove_orderitem_product_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=120),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'created_at'], name='shop_product_active_created'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
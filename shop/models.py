@@ -1,23 +1,40 @@
 from django.db import models
-import io
-import os
-from django.core.files.base import ContentFile
-from PIL import Image as PILImage
+from django.utils.text import Truncator
+from imaging.pipeline import build_thumbnail
+from imaging.queue import enqueue_thumbnail
+from accounts.counters import protect_fields
 from typing import Any
 
+EXCERPT_LENGTH = 120
+
+
+def make_excerpt(text: str) -> str:
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=220, unique=True)
     description = models.TextField(blank=True)
+    # Обрезанное описание для каталога: список не загружает description целиком
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='shop/products/%Y/%m/%d/', blank=True, null=True)
     thumbnail = models.ImageField(upload_to='shop/products/thumbnails/%Y/%m/%d/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Остаток на складе; пусто — остаток не учитывается. Меняется только атомарными
+    # UPDATE из shop.inventory, резервы — orders.StockReservation
+    stock = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Версия страницы товара для ETag
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Каталог: is_active=True, сортировка по created_at
+            models.Index(fields=['is_active', 'created_at'], name='shop_product_active_created'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -25,22 +42,22 @@ class Product(models.Model):
     def create_thumbnail(self, size: tuple[int, int] = (300, 300)) -> None:
         if not self.image:
             return
-        img = PILImage.open(self.image)
-        if img.mode in ("RGBA", "LA", "P"):
-            img = img.convert("RGB")
-        img.thumbnail(size, PILImage.Resampling.LANCZOS)
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=90)
-        buf.seek(0)
-        base = os.path.basename(self.image.name)
-        name = f"thumb_{base}".replace('.png', '.jpg').replace('.webp', '.jpg')
-        self.thumbnail.save(name, ContentFile(buf.read()), save=False)
+        thumb = build_thumbnail(self.image, size)
+        self.thumbnail.save(thumb.name, thumb, save=False)
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         is_new = self.pk is None
+        self.excerpt = make_excerpt(self.description)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'description' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        else:
+            # Остаток пишем только если его назвали явно: объект, прочитанный до оформления
+            # чужого заказа, иначе вернул бы старое значение и затёр резерв
+            protect_fields(self, kwargs, ['stock'])
         super().save(*args, **kwargs)
         if self.image and (is_new or not self.thumbnail):
-            self.create_thumbnail()
-            super().save(update_fields=["thumbnail"])  
+            # Миниатюру создаст фоновый воркер (imaging.queue)
+            enqueue_thumbnail(self)
 
  
@@ -0,0 +1,119 @@
+"""Checkout: turn a cart into an order in a fixed number of queries."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order, OrderItem, Payment, ShippingAddress
+from outbox.mail import enqueue_mail
+
+from .inventory import RESERVATION_TTL, OutOfStock, reserve_stock
+from .models import Product
+
+# Запросы к БД при оформлении заказа — не зависят от числа позиций в корзине:
+# товары (с блокировкой), заказ, списание остатков и резервы (если остаток учитывается),
+# позиции (bulk_create), адрес доставки, платёж, письмо-подтверждение в outbox.
+# BEGIN/COMMIT транзакции сюда не входят.
+CHECKOUT_QUERY_BUDGET = 8
+
+
+class CheckoutError(Exception):
+    """The cart cannot be turned into an order."""
+
+
+@dataclass
+class ShippingData:
+    full_name: str
+    city: str
+    address_line1: str
+    address_line2: str = ''
+    postal_code: str = ''
+    country: str = ''
+    phone: str = ''
+
+
+@dataclass
+class PlacedOrder:
+    order: Order
+    items: list[OrderItem]
+    total: Decimal
+
+
+def place_order(
+    cart: dict[int, int],
+    *,
+    user: Any = None,
+    email: str = '',
+    shipping: Optional[ShippingData] = None,
+    payment_method: str = Payment.Method.COD,
+    expected_total: Optional[Decimal] = None,
+) -> PlacedOrder:
+    """Create the order, its items, stock reservations, shipping address, payment and confirmation email atomically.
+
+    Product rows are locked with ``SELECT ... FOR UPDATE`` (a no-op on SQLite)
+    in primary-key order, so prices cannot change between reading and
+    writing and concurrent checkouts cannot deadlock.  Stock is taken by
+    :func:`shop.inventory.reserve_stock` with a conditional ``UPDATE``; if
+    any line is short the whole order is rolled back.  Items are inserted
+    with one ``bulk_create`` and the total is computed in memory.  The email
+    only goes to the outbox (``manage.py send_outbox`` delivers it), in the
+    same transaction as the order.
+
+    ``expected_total`` is the total the customer confirmed; if the prices
+    read under the lock add up to anything else, nothing is written.
+    """
+    lines = {int(pk): int(qty) for pk, qty in cart.items() if int(qty) > 0}
+    if not lines:
+        raise CheckoutError('Корзина пуста')
+    with transaction.atomic():
+        products = list(
+            Product.objects.select_for_update().filter(id__in=lines, is_active=True).order_by('pk')
+        )
+        if not products:
+            raise CheckoutError('Товары из корзины больше недоступны')
+        for p in products:
+            if p.stock is not None and p.stock < lines[p.pk]:
+                raise CheckoutError(f'Недостаточно товара «{p.name}»: осталось {p.stock} шт.')
+        total = sum((p.price * lines[p.pk] for p in products), Decimal(0))
+        if expected_total is not None and total != expected_total:
+            raise CheckoutError('Цены изменились, пока оформлялся заказ. Проверьте сумму и подтвердите ещё раз.')
+        order = Order.objects.create(user=user, email=email, total_amount=total)
+        # Наложенный платёж держит резерв до отмены заказа, оплата картой — ограниченное время
+        expires_at = timezone.now() + RESERVATION_TTL if payment_method == Payment.Method.CARD else None
+        try:
+            reserve_stock(order, lines, products, expires_at)
+        except OutOfStock:
+            # Остаток успели раскупить после чтения — выход из atomic() откатит заказ
+            raise CheckoutError('Товар закончился, пока оформлялся заказ. Проверьте корзину.') from None
+        items = [OrderItem(order=order, product=p, quantity=lines[p.pk], price=p.price) for p in products]
+        # bulk_create не шлёт сигналы — total_amount уже записан при создании заказа
+        OrderItem.objects.bulk_create(items)
+        if shipping is not None:
+            ShippingAddress.objects.create(order=order, **shipping.__dict__)
+        Payment.objects.create(order=order, method=payment_method, status=Payment.Status.PENDING, amount=total)
+        placed = PlacedOrder(order, items, total)
+        if email:
+            subject, body = order_confirmation(placed)
+            enqueue_mail(subject, body, [email])
+    # Позиции уже в памяти: кладём их туда же, куда prefetch_related, — order.items.all()
+    # не пойдёт в БД повторно
+    prefetched = order.items.all()
+    prefetched._result_cache = items
+    prefetched._prefetch_done = True
+    order._prefetched_objects_cache = {'items': prefetched}
+    return placed
+
+
+def order_confirmation(placed: PlacedOrder) -> tuple[str, str]:
+    """Subject and plain-text body of the confirmation email."""
+    lines = [f"{placed.order}", "", "Состав:"]
+    for item in placed.items:
+        # product подставлен при создании позиций — запросов нет
+        lines.append(f" - {item.product.name} x{item.quantity} = {item.subtotal} ₴")
+    lines.append("")
+    lines.append(f"Итого: {placed.total} ₴")
+    return f"Ваш {placed.order}", "\n".join(lines)
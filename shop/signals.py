@@ -0,0 +1,23 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cart import bump_products
+from .cart_stores import get_cart_store
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance: Product, **kwargs):
+    # Цена, название, доступность или миниатюра могли измениться — сбрасываем кеш корзины
+    bump_products()
+
+
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is None:
+        return
+    get_cart_store().merge_on_login(request, user)
+    # Корзина, загруженная до входа, могла смотреть на анонимный ключ
+    request.__dict__.pop('_cart', None)
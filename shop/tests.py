@@ -1 +1,208 @@
-"""Shop tests placeholder."""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from orders.models import Order
+
+from .cart import get_product_infos
+from .cart_stores import CART_COOKIE_NAME, MAX_QTY, clean_items, merge_items
+from .models import Product
+from .services import place_order
+from .views import PRODUCTS_PER_PAGE
+
+
+class StockWriteTests(TestCase):
+    def setUp(self) -> None:
+        self.product = Product.objects.create(name='Чайник', slug='kettle', price=Decimal('10.00'), stock=5)
+
+    def test_saving_stale_object_keeps_reserved_stock(self) -> None:
+        stale = Product.objects.get(pk=self.product.pk)
+        place_order({self.product.pk: 2}, email='')
+        stale.name = 'Чайник 2.0'
+        stale.save()
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertEqual(self.product.name, 'Чайник 2.0')
+
+    def test_stock_is_written_when_named_in_update_fields(self) -> None:
+        self.product.stock = 42
+        self.product.save(update_fields=['stock'])
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 42)
+
+
+class ProductAdminStockTests(TestCase):
+    def setUp(self) -> None:
+        admin = get_user_model().objects.create_superuser('admin', 'a@example.com', 'pw12345!x')
+        self.client.force_login(admin)
+        self.tracked = Product.objects.create(name='Чайник', slug='kettle', price=Decimal('10.00'), stock=5)
+        self.untracked = Product.objects.create(name='Кружка', slug='mug', price=Decimal('3.00'))
+        self.changelist = reverse('admin:shop_product_changelist')
+
+    def adjust(self, delta: int, *products: Product):
+        return self.client.post(self.changelist, {
+            'action': 'adjust_stock_action',
+            '_selected_action': [p.pk for p in products],
+            'apply': '1',
+            'delta': delta,
+        })
+
+    def test_change_form_does_not_write_stock(self) -> None:
+        url = reverse('admin:shop_product_change', args=[self.tracked.pk])
+        response = self.client.post(url, {
+            'name': 'Чайник', 'slug': 'kettle', 'description': '', 'price': '12.00', 'is_active': 'on', 'stock': 100,
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.tracked.refresh_from_db()
+        self.assertEqual(self.tracked.price, Decimal('12.00'))
+        self.assertEqual(self.tracked.stock, 5)
+
+    def test_action_asks_for_amount(self) -> None:
+        response = self.client.post(self.changelist, {
+            'action': 'adjust_stock_action', '_selected_action': [self.tracked.pk],
+        })
+        self.assertContains(response, 'name="delta"')
+
+    def test_action_adds_and_writes_off_atomically(self) -> None:
+        self.adjust(3, self.tracked, self.untracked)
+        self.tracked.refresh_from_db()
+        self.untracked.refresh_from_db()
+        self.assertEqual((self.tracked.stock, self.untracked.stock), (8, 3))
+
+        self.adjust(-5, self.tracked, self.untracked)
+        self.tracked.refresh_from_db()
+        self.untracked.refresh_from_db()
+        # Списание больше остатка пропускается, а не уводит остаток в минус
+        self.assertEqual((self.tracked.stock, self.untracked.stock), (3, 3))
+
+
+class StalePriceCheckoutTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.product = Product.objects.create(name='Чайник', slug='kettle', price=Decimal('10.00'))
+        self.client.post(reverse('shop:cart-add', args=[self.product.pk]), {'qty': 2})
+        # Цена меняется в другом процессе: сброс версии до кеша этого процесса не доходит
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('15.00'))
+
+    def checkout(self, total: str):
+        return self.client.post(reverse('shop:checkout'), {
+            'email': 'buyer@example.com', 'total': total, 'payment_method': 'cod',
+        })
+
+    def test_confirmation_page_reads_prices_from_database(self) -> None:
+        self.assertContains(self.client.get(reverse('shop:cart')), '20,00 ₴')
+        response = self.client.get(reverse('shop:checkout'))
+        self.assertContains(response, '30,00 ₴')
+        self.assertContains(response, 'name="total" value="30.00"')
+        # Заодно обновлён и кеш корзины
+        self.assertEqual(get_product_infos([self.product.pk])[self.product.pk].price, Decimal('15.00'))
+
+    def test_order_is_placed_for_confirmed_total(self) -> None:
+        self.client.get(reverse('shop:checkout'))
+        response = self.checkout('30.00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get().total_amount, Decimal('30.00'))
+
+    def test_order_is_refused_if_price_changed_after_confirmation(self) -> None:
+        response = self.checkout('20.00')
+        self.assertRedirects(response, reverse('shop:checkout'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertContains(self.client.get(reverse('shop:checkout')), 'Цены изменились')
+
+
+class CartStoreTests(TestCase):
+    STORES = ['shop.cart_stores.SessionCartStore', 'shop.cart_stores.CookieCartStore', 'shop.cart_stores.CacheCartStore']
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.kettle = Product.objects.create(name='Чайник', slug='kettle', price=Decimal('10.00'))
+        self.mug = Product.objects.create(name='Кружка', slug='mug', price=Decimal('3.00'))
+        self.user = get_user_model().objects.create_user('buyer', 'b@example.com', 'pw12345!x')
+
+    def add(self, product: Product, qty: int) -> None:
+        self.client.post(reverse('shop:cart-add', args=[product.pk]), {'qty': qty})
+
+    def test_cart_survives_between_requests(self) -> None:
+        for store in self.STORES:
+            with self.subTest(store=store), self.settings(CART_STORE=store):
+                self.client = self.client_class()
+                self.add(self.kettle, 2)
+                self.add(self.mug, 1)
+                self.client.post(reverse('shop:cart-update', args=[self.mug.pk]), {'qty': 3})
+                self.assertContains(self.client.get(reverse('shop:cart')), '29,00 ₴')
+                self.client.post(reverse('shop:cart-clear'))
+                self.assertNotContains(self.client.get(reverse('shop:cart')), 'Чайник')
+
+    def test_unchanged_cart_is_not_written(self) -> None:
+        self.add(self.kettle, 1)
+        response = self.client.get(reverse('shop:cart'))
+        self.assertNotIn(CART_COOKIE_NAME, response.cookies)
+
+    def test_tampered_cookie_means_empty_cart(self) -> None:
+        self.add(self.kettle, 1)
+        # Количество подменено без подписи
+        signed = self.client.cookies[CART_COOKIE_NAME].value
+        self.client.cookies[CART_COOKIE_NAME] = signed.replace(f'{self.kettle.pk}:1:', f'{self.kettle.pk}:50:', 1)
+        self.assertNotEqual(self.client.cookies[CART_COOKIE_NAME].value, signed)
+        self.assertNotContains(self.client.get(reverse('shop:cart')), 'Чайник')
+
+    @override_settings(CART_STORE='shop.cart_stores.CacheCartStore')
+    def test_cache_store_merges_anonymous_cart_on_login(self) -> None:
+        # Корзина пользователя с прошлого визита
+        self.client.force_login(self.user)
+        self.add(self.kettle, 1)
+        self.client.logout()
+
+        self.add(self.kettle, 2)
+        self.add(self.mug, 1)
+        self.client.post(reverse('accounts:login'), {'username': 'buyer', 'password': 'pw12345!x'})
+        self.assertEqual(cache.get(f'shop:cart:user:{self.user.pk}'), {self.kettle.pk: 3, self.mug.pk: 1})
+        self.assertContains(self.client.get(reverse('shop:cart')), '33,00 ₴')
+
+    def test_clean_items_limits_garbage(self) -> None:
+        self.assertEqual(clean_items({'1': '2', '3': '0', '4': 5000}), {1: 2, 4: MAX_QTY})
+        self.assertEqual(clean_items([('x', 1)]), {})
+        self.assertEqual(merge_items({1: 2}, {1: MAX_QTY, 2: 1}), {1: MAX_QTY, 2: 1})
+
+
+class CatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Product.objects.bulk_create([
+            Product(name=f'Чайник {i}', slug=f'kettle-{i}', price=Decimal(10 + i), description='Металлический') for i in range(14)
+        ] + [
+            Product(name='Кружка', slug='mug', price=Decimal('3.00'), description='Керамическая'),
+            Product(name='Скрытый чайник', slug='hidden', price=Decimal('12.00'), is_active=False),
+        ])
+
+    def names(self, **params) -> list[str]:
+        response = self.client.get(reverse('shop:product-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [p.name for p in response.context['products']]
+
+    def test_filters_combine(self) -> None:
+        self.assertEqual(sorted(self.names(q='Керамич')), ['Кружка'])
+        self.assertEqual(sorted(self.names(q='Чайник', min_price='12', max_price='13.50')), ['Чайник 2', 'Чайник 3'])
+
+    def test_invalid_filters_are_ignored(self) -> None:
+        # Битая цена отбрасывается, остальные фильтры работают
+        self.assertEqual(sorted(self.names(min_price='дёшево', max_price='11')), ['Кружка', 'Чайник 0', 'Чайник 1'])
+        response = self.client.get(reverse('shop:product-list'), {'min_price': '-5', 'max_price': '1e999', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), PRODUCTS_PER_PAGE)
+        self.assertContains(response, 'is-invalid')
+
+    def test_pages_keep_filters(self) -> None:
+        first = self.client.get(reverse('shop:product-list'), {'q': 'Чайник'})
+        page = first.context['page_obj']
+        self.assertEqual(len(page), PRODUCTS_PER_PAGE)
+        self.assertContains(first, f'?q=%D0%A7%D0%B0%D0%B9%D0%BD%D0%B8%D0%BA&amp;cursor={page.next_cursor}')
+        rest = self.names(q='Чайник', cursor=page.next_cursor)
+        self.assertEqual(len(rest), 2)
+        self.assertNotIn('Скрытый чайник', rest)
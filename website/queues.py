@@ -0,0 +1,82 @@
+"""Claiming rows of the database-backed work queues.
+
+Two kinds of queue tables are drained by management commands:
+
+* jobs with a retry schedule (:class:`imaging.models.ThumbnailJob`,
+  :class:`outbox.models.OutgoingEmail`) have ``status``, ``attempts``,
+  ``run_after``, ``locked_by`` and ``locked_at`` columns.  :func:`claim_rows`
+  takes due rows with a conditional ``UPDATE`` stamped with a unique token,
+  so concurrent workers never get the same row even on SQLite, which has no
+  ``SELECT ... FOR UPDATE SKIP LOCKED``; :func:`release_failed` schedules a
+  retry with exponential backoff;
+* plain event queues (:class:`accounts.models.PendingNotification`,
+  :class:`feed.models.PendingFanOut`) are consumed with :func:`take_rows`,
+  which deletes the rows in the caller's transaction.
+"""
+from __future__ import annotations
+
+import uuid
+from datetime import timedelta
+from typing import Any, TypeVar
+
+from django.db import models, transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+M = TypeVar('M', bound=models.Model)
+
+
+def claim_rows(queryset: QuerySet[M], limit: int, *, pending: str, running: str, stale_after: timedelta) -> list[M]:
+    """Atomically take up to ``limit`` due rows of ``queryset`` for this worker.
+
+    Due rows are ``pending`` ones whose ``run_after`` has passed and
+    ``running`` ones locked longer than ``stale_after`` ago (their worker
+    died).  Claiming counts as an attempt.
+    """
+    now = timezone.now()
+    due = Q(status=pending, run_after__lte=now) | Q(status=running, locked_at__lt=now - stale_after)
+    token = uuid.uuid4().hex
+    candidates = list(queryset.filter(due).order_by('run_after', 'id').values_list('pk', flat=True)[:limit])
+    if not candidates:
+        return []
+    # due повторяется в UPDATE: строки, которые успел забрать другой воркер, не перехватываем
+    queryset.filter(due, pk__in=candidates).update(
+        status=running, locked_by=token, locked_at=now, attempts=F('attempts') + 1
+    )
+    return list(queryset.filter(locked_by=token, status=running).order_by('id'))
+
+
+def release_failed(
+    row: models.Model,
+    error: str,
+    *,
+    pending: str,
+    failed: str,
+    max_attempts: int,
+    retry_delay: timedelta,
+) -> None:
+    """Schedule a retry of a claimed row with exponential backoff, or give up after ``max_attempts``."""
+    if row.attempts >= max_attempts:  # type: ignore[attr-defined]
+        changes: dict[str, Any] = {'status': failed}
+    else:
+        changes = {
+            'status': pending,
+            'run_after': timezone.now() + retry_delay * (2 ** (row.attempts - 1)),  # type: ignore[attr-defined]
+        }
+    # Только если строку не перехватили, пока она обрабатывалась
+    type(row)._default_manager.filter(pk=row.pk, locked_by=row.locked_by).update(  # type: ignore[attr-defined]
+        last_error=error[:2000], locked_by='', locked_at=None, **changes
+    )
+
+
+def take_rows(queryset: QuerySet[M], limit: int) -> list[M]:
+    """Take up to ``limit`` oldest rows; they are deleted in the caller's transaction."""
+    rows = list(queryset.order_by('id')[:limit])
+    if not rows:
+        return []
+    deleted, _ = queryset.model._default_manager.filter(pk__in=[r.pk for r in rows]).delete()
+    if deleted != len(rows):
+        # Часть строк забрал параллельный воркер — откатываемся и пробуем позже
+        transaction.set_rollback(True)
+        return []
+    return rows
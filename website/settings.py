@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,9 @@ INSTALLED_APPS = [
     'gallery',
     'shop',
     'orders',
+    'imaging',
+    'outbox',
+    'feed',
 ]
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'shop.middleware.CartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -95,6 +100,9 @@ DATABASES: Dict[str, Dict[str, Any]] = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Тестовая БД — файл, а не память: её должны видеть процессы пулов (imaging.workers).
+        # Лежит во временном каталоге, чтобы прерванный прогон не оставлял файл в репозитории
+        'TEST': {'NAME': Path(tempfile.gettempdir()) / 'website_test_db.sqlite3'},
     }
 }
 
@@ -156,4 +164,38 @@ MEDIA_URL = '/media/'
 CSRF_TRUSTED_ORIGINS = [
     "https://yarei.eu.pythonanywhere.com",
     "https://*.pythonanywhere.com",
-]
\ No newline at end of file
+]
+
+# Thumbnails are generated by `manage.py run_thumbnail_worker` from a DB-backed queue.
+# Use 'imaging.queue.ImmediateQueue' to build them right after the upload commits instead.
+THUMBNAIL_QUEUE_BACKEND = 'imaging.queue.DatabaseQueue'
+
+# Responsive renditions built by the same worker (see imaging/renditions.py).
+# Formats are listed in <picture> source order; JPEG is the <img> fallback.
+IMAGE_RENDITION_WIDTHS = (320, 640, 960, 1280)
+IMAGE_RENDITION_FORMATS = ('avif', 'webp', 'jpeg')
+
+# Outgoing mail is queued in the outbox table and sent by `manage.py send_outbox`.
+# For local debugging run the worker with
+# `--backend django.core.mail.backends.console.EmailBackend`.
+
+# Where carts are kept between requests (see shop/cart_stores.py): a signed cookie
+# by default, so browsing and cart changes cause no session writes.
+# 'shop.cart_stores.CacheCartStore' needs a cache shared by all workers.
+CART_STORE = 'shop.cart_stores.CookieCartStore'
+
+# Activity feed (feed/timeline.py): posts are copied into followers' timelines on write
+# by `manage.py fan_out_posts`, except posts published while their author had more
+# followers than this — those are merged in on read (Post.feed_fan_out).
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+# Entries kept per timeline by `manage.py trim_timelines`.
+FEED_TIMELINE_LENGTH = 500
+
+# Follow buttons (accounts/follow_graph.py): ids a user follows are cached as one sorted
+# array for users following at most this many people; 0 turns the cache off.
+FOLLOW_SET_MAX_SIZE = 5000
+# "People you may know" on the own profile page comes from a table rebuilt offline
+# by `manage.py build_suggestions` (accounts/recommendations.py); run it e.g. nightly.
+
+# Notifications (new followers, ...) are queued and delivered in aggregated batches
+# by `manage.py deliver_notifications`; `manage.py prune_notifications` removes old read ones.